@@ -0,0 +1,216 @@
+# batch_render.py
+# Render the variables of core dumps to JSON without an interactive session.
+#
+# Every core is opened in its own process, with the formatter modules loaded,
+# and every variable of every frame of every thread whose type has a formatter
+# registered is rendered: type, summary, shape of the underlying buffer and,
+# optionally, statistics, the first children and a .npy export of the buffer.
+#
+#   python3 LLDB/batch_render.py ./app core.1234                  JSON on stdout
+#   python3 LLDB/batch_render.py ./app cores/* -j 8 -o triage/     one <core>.json per core
+#   python3 LLDB/batch_render.py ./app core --stats --children 16 --export dumps/
+#
+# The lldb module is taken from the Python path, or else from `lldb -P`.
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import re
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+lldb = None
+
+class TimeBudgetExceeded(BaseException):
+    """Raised when a core runs out of time; not an Exception, so that the
+    formatters' own error handling does not swallow it."""
+
+def load_lldb():
+    """Import the lldb module, locating it with `lldb -P` if needed."""
+    global lldb
+    if lldb is None:
+        try:
+            import lldb as module
+        except ImportError:
+            path = subprocess.run(["lldb", "-P"], capture_output=True, text=True).stdout.strip()
+            if not path:
+                raise
+            sys.path.append(path)
+            import lldb as module
+        lldb = module
+    return lldb
+
+def load_formatters(debugger, stats):
+    """Load the formatters into `debugger`."""
+    debugger.HandleCommand(f"command script import {os.path.join(HERE, 'lldb_formatters.py')}")
+    import formatter_utils
+    # Summaries are rendered once: compute their statistics inline
+    formatter_utils.ASYNC_SUMMARY = False
+    formatter_utils.STATS_SUMMARY = stats
+    formatter_utils.POINT_SUMMARY = stats
+
+def matches(sbtype):
+    import lldb_formatters
+    names = {sbtype.GetName(), sbtype.GetDisplayTypeName(), sbtype.GetCanonicalType().GetName()}
+    return any(lldb_formatters.lookup(name) != (None, None) for name in names if name)
+
+def formatted_value(valobj):
+    """`valobj`, or what it points/refers to, if its type has a formatter; else None."""
+    sbtype = valobj.GetType()
+    if matches(sbtype):
+        return valobj
+    if sbtype.IsPointerType() or sbtype.IsReferenceType():
+        target = valobj.Dereference()
+        if target.IsValid() and matches(target.GetType()):
+            return target
+    return None
+
+def render_value(valobj, options, export_name):
+    import buffer_io
+    import opencv_formatters
+    entry = {
+        "name": valobj.GetName(),
+        "type": valobj.GetType().GetDisplayTypeName(),
+        "summary": valobj.GetSummary(),
+        "value": valobj.GetValue(),
+        "num_children": valobj.GetNumChildren(),
+    }
+    try:
+        view = opencv_formatters.get_buffer_view(valobj)
+    except Exception:
+        view = None
+    if view is not None:
+        entry["shape"] = {"rows": view.rows, "cols": view.cols, "channels": view.channels,
+                          "format": view.fmt, "address": view.address, "bytes": view.nbytes}
+    if options.children:
+        children = []
+        for index in range(min(options.children, entry["num_children"])):
+            child = valobj.GetChildAtIndex(index)
+            children.append({"name": child.GetName(), "value": child.GetValue(), "summary": child.GetSummary()})
+        entry["children"] = children
+    if options.export and view is not None and view.address and view.nbytes:
+        path = os.path.join(options.export, export_name + ".npy")
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            buffer_io.write_npy(valobj.GetProcess(), view, path, valobj.GetTarget().GetByteOrder())
+            entry["export"] = path
+        except (buffer_io.ExportError, OSError) as e:
+            entry["export_error"] = str(e)
+    return entry
+
+def render_frame(frame, options, export_prefix, deadline):
+    line = frame.GetLineEntry()
+    record = {
+        "index": frame.GetFrameID(),
+        "function": frame.GetDisplayFunctionName(),
+        "pc": frame.GetPC(),
+        "file": line.GetFileSpec().fullpath if line.IsValid() else None,
+        "line": line.GetLine() if line.IsValid() else None,
+        "variables": [],
+    }
+    variables = frame.GetVariables(True, True, options.statics, True)
+    for index in range(variables.GetSize()):
+        if time.monotonic() > deadline:
+            raise TimeBudgetExceeded()
+        variable = variables.GetValueAtIndex(index)
+        valobj = formatted_value(variable)
+        if valobj is None:
+            continue
+        name = re.sub(r"[^\w.-]", "_", variable.GetName() or str(index))
+        record["variables"].append(render_value(valobj, options, f"{export_prefix}_f{record['index']}_{name}"))
+    return record
+
+def on_alarm(signum, frame):
+    raise TimeBudgetExceeded()
+
+def render_core(binary, core, options):
+    """JSON-able report of one core; runs in a worker process."""
+    load_lldb()
+    report = {"core": core, "binary": binary, "threads": [], "truncated": False}
+    start = time.monotonic()
+    deadline = start + options.timeout
+    # Hard stop for a formatter stuck in one call, a little after the budget
+    if math.isfinite(options.timeout) and hasattr(signal, "setitimer"):
+        signal.signal(signal.SIGALRM, on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, options.timeout * 1.1 + 1.0)
+    debugger = lldb.SBDebugger.Create(False)
+    debugger.SetAsync(False)
+    try:
+        load_formatters(debugger, options.stats)
+        target = debugger.CreateTarget(binary)
+        if not target.IsValid():
+            report["error"] = f"cannot load {binary}"
+            return report
+        process = target.LoadCore(core)
+        if not process.IsValid():
+            report["error"] = f"cannot load core {core}"
+            return report
+        export_prefix = os.path.join(os.path.basename(core), "")
+        for thread in process:
+            record = {"id": thread.GetThreadID(), "index": thread.GetIndexID(), "name": thread.GetName(),
+                      "stop_reason": thread.GetStopDescription(256), "frames": []}
+            report["threads"].append(record)
+            for frame in thread:
+                if options.frames and frame.GetFrameID() >= options.frames:
+                    break
+                record["frames"].append(render_frame(
+                    frame, options, f"{export_prefix}t{thread.GetIndexID()}", deadline))
+    except TimeBudgetExceeded:
+        # Keep what was rendered so far
+        report["truncated"] = True
+    finally:
+        if hasattr(signal, "setitimer"):
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        lldb.SBDebugger.Destroy(debugger)
+    report["seconds"] = time.monotonic() - start
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the formatted variables of core dumps to JSON.")
+    parser.add_argument("binary", help="executable the cores were produced by")
+    parser.add_argument("cores", nargs="+", help="core files")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="cores processed in parallel")
+    parser.add_argument("-o", "--output", help="write <core>.json files to this directory instead of stdout")
+    parser.add_argument("--timeout", type=float, default=300.0, help="time budget per core in seconds (0 = none)")
+    parser.add_argument("--frames", type=int, default=0, help="only the innermost frames of each thread (0 = all)")
+    parser.add_argument("--statics", action="store_true", help="include static and global variables")
+    parser.add_argument("--stats", action="store_true", help="append buffer and point cloud statistics to summaries")
+    parser.add_argument("--children", type=int, default=0, help="also render the first N children of each variable")
+    parser.add_argument("--export", help="write the buffer of each matrix, image or list to a .npy file under this directory")
+    options = parser.parse_args(argv)
+    if options.timeout <= 0:
+        options.timeout = float("inf")
+
+    failed = 0
+    reports = []
+    # lldb is not fork safe: every worker starts a fresh interpreter
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max(1, options.jobs), mp_context=context) as pool:
+        futures = dict((pool.submit(render_core, options.binary, core, options), core) for core in options.cores)
+        for future in as_completed(futures):
+            core = futures[future]
+            try:
+                report = future.result()
+            except Exception as e:
+                report = {"core": core, "binary": options.binary, "error": str(e)}
+            failed += "error" in report
+            status = "error: " + report["error"] if "error" in report else ("truncated" if report["truncated"] else "ok")
+            print(f"{core}: {status}", file=sys.stderr)
+            if options.output:
+                os.makedirs(options.output, exist_ok=True)
+                with open(os.path.join(options.output, os.path.basename(core) + ".json"), "w") as f:
+                    json.dump(report, f, indent=2)
+            else:
+                reports.append(report)
+    if not options.output:
+        print(json.dumps(reports, indent=2))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
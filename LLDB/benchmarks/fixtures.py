@@ -0,0 +1,271 @@
+# fixtures.py
+# Builders for Eigen, OpenCV and SEACAVE values in the fake lldb address space.
+# Layouts mirror what the formatters read, not the full C++ classes.
+import struct
+from array import array
+
+import lldb
+
+class Target:
+    """A fake target/process pair plus the types the scenarios need."""
+    def __init__(self):
+        self.debugger = lldb.SBDebugger()
+        self.target = self.debugger.CreateTarget("benchmark")
+        self.process = self.target.process
+        self.memory = self.process.memory
+        self.mat_type = None
+
+    def type(self, name):
+        return self.target.FindFirstType(name)
+
+    def buffer(self, raw):
+        """Copy `raw` into a fresh allocation; returns its address."""
+        address = self.memory.alloc(len(raw))
+        self.memory.write(address, raw)
+        return address
+
+    def new_value(self, name, sbtype, raw):
+        value = self.target.new_value(name, sbtype)
+        self.memory.write(value.GetLoadAddress(), raw)
+        return value
+
+    # -- Eigen ------------------------------------------------------------------
+    def eigen_fixed_type(self, scalar, rows, cols, options=0):
+        scalar = self.type(scalar)
+        name = "Eigen::Matrix<%s, %d, %d, %d, %d, %d>" % (scalar.name, rows, cols, options, rows, cols)
+        found = self.type(name)
+        if found.IsValid():
+            return found
+        plain = lldb.struct_type("Eigen::internal::plain_array<%s, %d, %d, 16>" % (scalar.name, rows * cols, options),
+                                 [("array", lldb.array_type(scalar, rows * cols))])
+        storage = lldb.struct_type("Eigen::DenseStorage<%s, %d, %d, %d, %d>" % (scalar.name, rows * cols, rows, cols, options),
+                                   [("m_data", plain)])
+        return self.target.add_type(lldb.struct_type(name, [("m_storage", storage)]))
+
+    def eigen_dynamic_type(self, scalar, options=0):
+        scalar = self.type(scalar)
+        name = "Eigen::Matrix<%s, -1, -1, %d, -1, -1>" % (scalar.name, options)
+        found = self.type(name)
+        if found.IsValid():
+            return found
+        storage = lldb.struct_type("Eigen::DenseStorage<%s, -1, -1, -1, %d>" % (scalar.name, options),
+                                   [("m_data", lldb.pointer_type(scalar)),
+                                    ("m_rows", self.type("long")), ("m_cols", self.type("long"))])
+        return self.target.add_type(lldb.struct_type(name, [("m_storage", storage)]))
+
+    def eigen_fixed(self, name, scalar, rows, cols, values):
+        sbtype = self.eigen_fixed_type(scalar, rows, cols)
+        return self.new_value(name, sbtype, array(self.type(scalar).code, values).tobytes())
+
+    def eigen_dynamic(self, name, scalar, rows, cols, values):
+        sbtype = self.eigen_dynamic_type(scalar)
+        data = self.buffer(array(self.type(scalar).code, values).tobytes())
+        return self.new_value(name, sbtype, struct.pack("<Qqq", data, rows, cols))
+
+    def eigen_index(self, name):
+        """Eigen::internal::variable_if_dynamic<long, -1>, unwrapped via m_value."""
+        found = self.type(name)
+        if found.IsValid():
+            return found
+        return self.target.add_type(lldb.struct_type(name, [("m_value", self.type("long"))]))
+
+    def eigen_block(self, name, matrix, start_row, start_col, rows, cols):
+        """Eigen::Block<MatrixX, -1, -1, false> of the dynamic `matrix` value."""
+        xpr_type = matrix.GetType()
+        pointer = matrix.GetValueForExpressionPath(".m_storage.m_data")
+        scalar = pointer.GetType().GetPointeeType()
+        base = pointer.GetValueAsUnsigned()
+        outer = matrix.GetValueForExpressionPath(".m_storage.m_rows").GetValueAsUnsigned()
+        index = self.eigen_index("Eigen::internal::variable_if_dynamic<long, -1>")
+        sbtype = self.type("Eigen::Block<%s, -1, -1, false>" % xpr_type.name)
+        if not sbtype.IsValid():
+            sbtype = self.target.add_type(lldb.struct_type("Eigen::Block<%s, -1, -1, false>" % xpr_type.name, [
+                ("m_data", lldb.pointer_type(scalar)), ("m_rows", index), ("m_cols", index),
+                ("m_xpr", lldb.pointer_type(xpr_type)),
+                ("m_startRow", index), ("m_startCol", index), ("m_outerStride", self.type("long"))]))
+        data = base + (start_row + start_col * outer) * scalar.GetByteSize()
+        return self.new_value(name, sbtype, struct.pack("<QqqQqqq", data, rows, cols, matrix.GetLoadAddress(),
+                                                        start_row, start_col, outer))
+
+    # -- OpenCV -----------------------------------------------------------------
+    def cv_mat_type(self):
+        if self.mat_type is None:
+            size_t = self.type("size_t")
+            uchar = self.type("unsigned char")
+            step = lldb.struct_type("cv::MatStep", [("p", lldb.pointer_type(size_t)),
+                                                    ("buf", lldb.array_type(size_t, 2))])
+            size = lldb.struct_type("cv::MatSize", [("p", lldb.pointer_type(self.type("int")))])
+            self.mat_type = self.target.add_type(lldb.struct_type("cv::Mat", [
+                ("flags", self.type("int")), ("dims", self.type("int")),
+                ("rows", self.type("int")), ("cols", self.type("int")),
+                ("data", lldb.pointer_type(uchar)), ("datastart", lldb.pointer_type(uchar)),
+                ("dataend", lldb.pointer_type(uchar)), ("datalimit", lldb.pointer_type(uchar)),
+                ("allocator", lldb.pointer_type(uchar)), ("u", lldb.pointer_type(uchar)),
+                ("size", size), ("step", step)]))
+        return self.mat_type
+
+    def cv_mat(self, name, rows, cols, depth, channels, raw, step=None):
+        """A 2D cv::Mat over `raw` (rows of `step` bytes; continuous by default)."""
+        sbtype = self.cv_mat_type()
+        elem_size = (1, 1, 2, 2, 4, 4, 8, 2)[depth]
+        row_bytes = cols * channels * elem_size
+        step = step or row_bytes
+        data = self.buffer(raw)
+        flags = 0x42FF0000 | depth | ((channels - 1) << 3) | (1 << 14 if step == row_bytes else 0)
+        value = self.target.new_value(name, sbtype)
+        fields = dict((f[0], f[2]) for f in sbtype.fields)
+        base = value.GetLoadAddress()
+        self.memory.write(base + fields["flags"], struct.pack("<iiii", flags, 2, rows, cols))
+        self.memory.write(base + fields["data"], struct.pack("<QQQ", data, data, data + rows * step))
+        self.memory.write(base + fields["step"], struct.pack("<QQQ", base + fields["step"] + 8, step,
+                                                             channels * elem_size))
+        return value
+
+    # -- SEACAVE ----------------------------------------------------------------
+    def clist(self, name, element, count, raw=None):
+        """A SEACAVE::cList<element> of `count` elements (zero filled unless `raw`)."""
+        element = self.type(element) if isinstance(element, str) else element
+        index_type = self.type("size_t")
+        sbtype = self.target.add_type(lldb.struct_type(
+            "SEACAVE::cList<%s, const %s &, 0, 16, unsigned long>" % (element.name, element.name),
+            [("_size", index_type), ("_vectorSize", index_type), ("_vector", lldb.pointer_type(element))]))
+        data = self.buffer(raw) if raw is not None else self.memory.alloc(count * element.size)
+        return self.new_value(name, sbtype, struct.pack("<QQQ", count, count, data))
+
+    # -- mve / Open3D -----------------------------------------------------------
+    def std_vector_type(self, element):
+        """A libstdc++ std::vector<element>."""
+        element = self.type(element) if isinstance(element, str) else element
+        name = "std::vector<%s, std::allocator<%s> >" % (element.name, element.name)
+        found = self.type(name)
+        if found.IsValid():
+            return found
+        pointer = lldb.pointer_type(element)
+        impl = lldb.struct_type("std::_Vector_base<%s, std::allocator<%s> >::_Vector_impl" % (element.name, element.name),
+                                [("_M_start", pointer), ("_M_finish", pointer), ("_M_end_of_storage", pointer)])
+        return self.target.add_type(lldb.struct_type(name, [("_M_impl", impl)], template_args=[element]))
+
+    def mve_image(self, name, scalar, width, height, channels, raw=None):
+        """An mve::Image<scalar> (zero filled unless `raw`)."""
+        element = self.type(scalar)
+        base_name = "mve::TypedImageBase<%s>" % element.name
+        base = self.type(base_name)
+        if not base.IsValid():
+            image_base = lldb.struct_type("mve::ImageBase", [("w", self.type("int")), ("h", self.type("int")),
+                                                             ("c", self.type("int"))])
+            base = self.target.add_type(lldb.struct_type(base_name, [("data", self.std_vector_type(element))],
+                                                         bases=[(image_base, 0)], template_args=[element]))
+        sbtype = self.type("mve::Image<%s>" % element.name)
+        if not sbtype.IsValid():
+            sbtype = self.target.add_type(lldb.struct_type("mve::Image<%s>" % element.name, [], bases=[(base, 0)],
+                                                           template_args=[element]))
+        size = width * height * channels * element.size
+        data = self.buffer(raw) if raw is not None else self.memory.alloc(size)
+        return self.new_value(name, sbtype, struct.pack("<iiiiQQQ", width, height, channels, 0,
+                                                        data, data + size, data + size))
+
+    def open3d_image(self, name, width, height, channels, bytes_per_channel, raw=None):
+        """An open3d::geometry::Image (zero filled unless `raw`)."""
+        sbtype = self.type("open3d::geometry::Image")
+        if not sbtype.IsValid():
+            int_type = self.type("int")
+            sbtype = self.target.add_type(lldb.struct_type("open3d::geometry::Image", [
+                ("width_", int_type), ("height_", int_type), ("num_of_channels_", int_type),
+                ("bytes_per_channel_", int_type), ("data_", self.std_vector_type("unsigned char"))]))
+        size = width * height * channels * bytes_per_channel
+        data = self.buffer(raw) if raw is not None else self.memory.alloc(size)
+        return self.new_value(name, sbtype, struct.pack("<iiiiQQQ", width, height, channels, bytes_per_channel,
+                                                        data, data + size, data + size))
+
+    # -- pmp ----------------------------------------------------------------------
+    def pmp_types(self):
+        """pmp::SurfaceMesh and the handle types."""
+        mesh = self.type("pmp::SurfaceMesh")
+        if mesh.IsValid():
+            return mesh
+        index = self.type("unsigned int")
+        handle = self.target.add_type(lldb.struct_type("pmp::Handle", [("idx_", index)]))
+        for name in ("Vertex", "Halfedge", "Edge", "Face"):
+            self.target.add_type(lldb.struct_type("pmp::" + name, [], size=index.size, bases=[(handle, 0)]))
+        halfedge, vertex, face = self.type("pmp::Halfedge"), self.type("pmp::Vertex"), self.type("pmp::Face")
+        elements = [
+            ("vconn_", "Vertex", lldb.struct_type("pmp::SurfaceMesh::VertexConnectivity", [("halfedge_", halfedge)])),
+            ("hconn_", "Halfedge", lldb.struct_type("pmp::SurfaceMesh::HalfedgeConnectivity", [
+                ("face_", face), ("vertex_", vertex), ("next_", halfedge), ("prev_", halfedge)])),
+            ("fconn_", "Face", lldb.struct_type("pmp::SurfaceMesh::FaceConnectivity", [("halfedge_", halfedge)])),
+            ("vpoint_", "Vertex", lldb.struct_type("pmp::Matrix<float, 3, 1>",
+                                                   [("data_", lldb.array_type(self.type("float"), 3))])),
+        ]
+        fields = []
+        for name, kind, element in elements:
+            parray = lldb.struct_type("pmp::PropertyArray<%s>" % element.name,
+                                      [("data_", self.std_vector_type(element))], template_args=[element])
+            fields.append((name, lldb.struct_type("pmp::%sProperty<%s>" % (kind, element.name),
+                                                  [("parray_", lldb.pointer_type(parray))])))
+        return self.target.add_type(lldb.struct_type("pmp::SurfaceMesh", fields))
+
+    def pmp_mesh(self, name, points, faces):
+        """A pmp::SurfaceMesh of `points` (x, y, z) and `faces` (vertex index
+        lists, consistently oriented), with boundary loops linked as pmp does."""
+        sbtype = self.pmp_types()
+        invalid = 0xFFFFFFFF
+        directed = {}   # (from, to) -> halfedge
+        hconn = []      # [face, vertex, next, prev]
+        fconn = []
+        for f, face in enumerate(faces):
+            loop = []
+            for i, u in enumerate(face):
+                w = face[(i + 1) % len(face)]
+                h = directed.get((u, w))
+                if h is None:
+                    h = len(hconn)
+                    hconn += [[invalid, w, invalid, invalid], [invalid, u, invalid, invalid]]
+                    directed[(u, w)], directed[(w, u)] = h, h + 1
+                hconn[h][0] = f
+                loop.append(h)
+            for i, h in enumerate(loop):
+                hconn[h][2] = loop[(i + 1) % len(loop)]
+                hconn[loop[(i + 1) % len(loop)]][3] = h
+            fconn.append(loop[0])
+        vconn = [invalid] * len(points)
+        outgoing = {}   # boundary halfedges by their from vertex
+        for h, (face, to, _, _) in enumerate(hconn):
+            start = hconn[h ^ 1][1]
+            if face == invalid:
+                outgoing[start] = h
+            if vconn[start] == invalid or face == invalid:
+                vconn[start] = h
+        for h, entry in enumerate(hconn):
+            if entry[0] == invalid:
+                entry[2] = outgoing[entry[1]]
+                hconn[entry[2]][3] = h
+        arrays = [struct.pack("<%dI" % len(vconn), *vconn),
+                  b"".join(struct.pack("<4I", *entry) for entry in hconn),
+                  struct.pack("<%dI" % len(fconn), *fconn),
+                  b"".join(struct.pack("<3f", *point) for point in points)]
+        raw = b""
+        for data in arrays:
+            start = self.buffer(data)
+            raw += struct.pack("<Q", self.buffer(struct.pack("<QQQ", start, start + len(data), start + len(data))))
+        return self.new_value(name, sbtype, raw)
+
+    # -- tinyxml2 (natvis only) -------------------------------------------------
+    def xml_element(self, name, children):
+        """A tinyxml2::XMLNode named `name` with `children` child nodes, linked
+        through firstChild/next."""
+        node = self.target.FindFirstType("tinyxml2::XMLNode")
+        if not node.IsValid():
+            char = lldb.pointer_type(self.type("char"))
+            pair = self.target.add_type(lldb.struct_type("tinyxml2::StrPair",
+                                                         [("flags", self.type("int")), ("start", char), ("end", char)]))
+            node = self.target.add_type(lldb.SBType("tinyxml2::XMLNode", 0, "struct", fields=[], bases=[],
+                                                    template_args=[]))
+            layout = lldb.struct_type("tinyxml2::XMLNode", [("value", pair), ("firstChild", lldb.pointer_type(node)),
+                                                            ("next", lldb.pointer_type(node))])
+            node.fields, node.size = layout.fields, layout.size
+        text = name.encode() + b"\0"
+        start = self.buffer(text)
+        first = 0
+        for index in range(children, 0, -1):
+            first = self.buffer(struct.pack("<iiQQQQ", 0, 0, start, start + len(text) - 1, 0, first))
+        return self.new_value(name, node, struct.pack("<iiQQQQ", 0, 0, start, start + len(text) - 1, first, 0))
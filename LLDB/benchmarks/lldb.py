@@ -0,0 +1,995 @@
+# lldb.py
+# In-memory stand-in for the subset of the lldb module used by the formatters.
+# Values are backed by byte buffers living in a flat fake address space, so the
+# formatters run unmodified on plain CPython without a debugger attached.
+import bisect
+import struct
+
+LLDB_INVALID_ADDRESS = 0xFFFFFFFFFFFFFFFF
+
+eByteOrderInvalid = 0
+eByteOrderBig = 1
+eByteOrderPDP = 2
+eByteOrderLittle = 4
+
+eTypeHasChildren = 1 << 0
+eTypeIsArray = 1 << 2
+eTypeIsClass = 1 << 4
+eTypeIsPointer = 1 << 12
+eTypeIsScalar = 1 << 14
+eTypeIsInteger = 1 << 15
+eTypeIsFloat = 1 << 16
+eTypeIsSigned = 1 << 18
+eTypeIsBuiltIn = 1 << 3
+eTypeIsEnumeration = 1 << 7
+
+eBasicTypeInvalid = 0
+eBasicTypeVoid = 1
+eBasicTypeChar = 2
+eBasicTypeSignedChar = 3
+eBasicTypeUnsignedChar = 4
+eBasicTypeShort = 9
+eBasicTypeUnsignedShort = 10
+eBasicTypeInt = 11
+eBasicTypeUnsignedInt = 12
+eBasicTypeLong = 13
+eBasicTypeUnsignedLong = 14
+eBasicTypeLongLong = 15
+eBasicTypeUnsignedLongLong = 16
+eBasicTypeBool = 20
+eBasicTypeHalf = 21
+eBasicTypeFloat = 22
+eBasicTypeDouble = 23
+
+eReturnStatusInvalid = 0
+eReturnStatusSuccessFinishNoResult = 1
+eReturnStatusSuccessFinishResult = 2
+eReturnStatusFailed = 6
+
+eStateStopped = 5
+eStateRunning = 6
+
+eFormatDefault = 0
+
+_BASIC = {
+    # basic type: (name, size, struct code, flags)
+    eBasicTypeChar: ("char", 1, "b", eTypeIsInteger | eTypeIsSigned),
+    eBasicTypeSignedChar: ("signed char", 1, "b", eTypeIsInteger | eTypeIsSigned),
+    eBasicTypeUnsignedChar: ("unsigned char", 1, "B", eTypeIsInteger),
+    eBasicTypeShort: ("short", 2, "h", eTypeIsInteger | eTypeIsSigned),
+    eBasicTypeUnsignedShort: ("unsigned short", 2, "H", eTypeIsInteger),
+    eBasicTypeInt: ("int", 4, "i", eTypeIsInteger | eTypeIsSigned),
+    eBasicTypeUnsignedInt: ("unsigned int", 4, "I", eTypeIsInteger),
+    eBasicTypeLong: ("long", 8, "q", eTypeIsInteger | eTypeIsSigned),
+    eBasicTypeUnsignedLong: ("unsigned long", 8, "Q", eTypeIsInteger),
+    eBasicTypeLongLong: ("long long", 8, "q", eTypeIsInteger | eTypeIsSigned),
+    eBasicTypeUnsignedLongLong: ("unsigned long long", 8, "Q", eTypeIsInteger),
+    eBasicTypeBool: ("bool", 1, "?", eTypeIsInteger),
+    eBasicTypeFloat: ("float", 4, "f", eTypeIsFloat | eTypeIsSigned),
+    eBasicTypeDouble: ("double", 8, "d", eTypeIsFloat | eTypeIsSigned),
+}
+
+_ALIASES = {
+    "uint8_t": eBasicTypeUnsignedChar, "uchar": eBasicTypeUnsignedChar,
+    "int8_t": eBasicTypeSignedChar, "schar": eBasicTypeSignedChar,
+    "uint16_t": eBasicTypeUnsignedShort, "ushort": eBasicTypeUnsignedShort,
+    "int16_t": eBasicTypeShort, "int32_t": eBasicTypeInt,
+    "uint32_t": eBasicTypeUnsignedInt, "int64_t": eBasicTypeLongLong,
+    "uint64_t": eBasicTypeUnsignedLongLong, "size_t": eBasicTypeUnsignedLong,
+}
+
+stats = {"read_calls": 0, "read_bytes": 0, "expression_values": 0}
+
+
+def reset_stats():
+    for key in stats:
+        stats[key] = 0
+
+
+class SBError:
+    def __init__(self, message=None):
+        self.message = message
+
+    def Success(self):
+        return self.message is None
+
+    def Fail(self):
+        return self.message is not None
+
+    def SetErrorString(self, message):
+        self.message = message
+
+    def GetCString(self):
+        return self.message
+
+    def __str__(self):
+        return self.message or "success"
+
+
+class Memory:
+    """Sparse flat address space made of non-overlapping mappings.
+
+    Allocations are carved out of arenas mapped with a 4 KiB granularity, like
+    a heap, so neighbouring values share pages and reads past an arena fail.
+    """
+
+    ARENA_BYTES = 16 * 1024 * 1024
+    MAP_ALIGN = 4096
+
+    def __init__(self, base=0x10000):
+        self.starts = []
+        self.buffers = []
+        self.next_addr = base
+        self.arena_next = 0
+        self.arena_end = 0
+
+    def alloc(self, size, align=16):
+        addr = (self.arena_next + align - 1) // align * align
+        if not self.arena_end or addr + size > self.arena_end:
+            arena_size = max(self.ARENA_BYTES, (size + self.MAP_ALIGN - 1) // self.MAP_ALIGN * self.MAP_ALIGN)
+            addr = (self.next_addr + self.MAP_ALIGN - 1) // self.MAP_ALIGN * self.MAP_ALIGN
+            self.map(addr, bytearray(arena_size))
+            self.arena_end = addr + arena_size
+        self.arena_next = addr + size
+        return addr
+
+    def map(self, addr, buffer):
+        """Expose an existing buffer (bytes, bytearray, mmap) at `addr`."""
+        index = bisect.bisect(self.starts, addr)
+        self.starts.insert(index, addr)
+        self.buffers.insert(index, buffer)
+        # leave an unmapped gap after every mapping
+        self.next_addr = max(self.next_addr, addr + len(buffer) + self.MAP_ALIGN)
+        return addr
+
+    def _find(self, addr, size):
+        index = bisect.bisect(self.starts, addr) - 1
+        if index >= 0:
+            start, buf = self.starts[index], self.buffers[index]
+            if addr + size <= start + len(buf):
+                return start, buf
+        return None, None
+
+    def read(self, addr, size):
+        start, buf = self._find(addr, size)
+        if buf is None:
+            return None
+        return bytes(buf[addr - start:addr - start + size])
+
+    def write(self, addr, data):
+        start, buf = self._find(addr, len(data))
+        if buf is None:
+            raise ValueError("write outside mapped memory: 0x%x" % addr)
+        buf[addr - start:addr - start + len(data)] = data
+
+
+class SBType:
+    def __init__(self, name, size, kind, **kw):
+        self.name = name
+        self.size = size
+        self.kind = kind  # scalar, pointer, array, struct
+        self.basic = kw.get("basic", eBasicTypeInvalid)
+        self.code = kw.get("code")
+        self.flags = kw.get("flags", 0)
+        self.pointee = kw.get("pointee")
+        self.element = kw.get("element")
+        self.count = kw.get("count", 0)
+        self.fields = kw.get("fields", [])  # (name, type, offset)
+        self.bases = kw.get("bases", [])  # (type, offset)
+        self.template_args = kw.get("template_args", [])
+        self.target = kw.get("target")
+
+    def IsValid(self):
+        return self.kind != "invalid"
+
+    def GetName(self):
+        return self.name
+
+    def GetDisplayTypeName(self):
+        return self.name
+
+    def GetCanonicalType(self):
+        return self
+
+    def GetUnqualifiedType(self):
+        return self
+
+    def GetByteSize(self):
+        return self.size
+
+    def GetBasicType(self):
+        return self.basic
+
+    def GetTypeFlags(self):
+        flags = self.flags
+        if self.kind == "pointer":
+            flags |= eTypeIsPointer
+        elif self.kind == "array":
+            flags |= eTypeIsArray | eTypeHasChildren
+        elif self.kind == "struct":
+            flags |= eTypeIsClass | eTypeHasChildren
+        elif self.kind == "scalar":
+            flags |= eTypeIsScalar | eTypeIsBuiltIn
+        return flags
+
+    def IsPointerType(self):
+        return self.kind == "pointer"
+
+    def IsArrayType(self):
+        return self.kind == "array"
+
+    def IsReferenceType(self):
+        return False
+
+    def GetEnumerationIntegerType(self):
+        return invalid_type()
+
+    def GetPointerType(self):
+        return pointer_type(self)
+
+    def GetPointeeType(self):
+        return self.pointee if self.kind == "pointer" else invalid_type()
+
+    def GetArrayElementType(self):
+        return self.element if self.kind == "array" else invalid_type()
+
+    def GetArrayType(self, count):
+        return array_type(self, count)
+
+    def GetNumberOfTemplateArguments(self):
+        return len(self.template_args)
+
+    def GetTemplateArgumentType(self, index):
+        if 0 <= index < len(self.template_args):
+            return self.template_args[index]
+        return invalid_type()
+
+    def GetNumberOfFields(self):
+        return len(self.fields)
+
+    def GetNumberOfDirectBaseClasses(self):
+        return len(self.bases)
+
+    def GetFieldAtIndex(self, index):
+        if 0 <= index < len(self.fields):
+            return SBTypeMember(*self.fields[index])
+        return SBTypeMember("", invalid_type(), 0)
+
+    def GetDirectBaseClassAtIndex(self, index):
+        if 0 <= index < len(self.bases):
+            base, offset = self.bases[index]
+            return SBTypeMember(base.name, base, offset)
+        return SBTypeMember("", invalid_type(), 0)
+
+    def __eq__(self, other):
+        return isinstance(other, SBType) and other.name == self.name
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def __repr__(self):
+        return "SBType(%s)" % self.name
+
+
+class SBTypeMember:
+    def __init__(self, name, sbtype, offset):
+        self.name = name
+        self.type = sbtype
+        self.offset = offset
+
+    def IsValid(self):
+        return self.type.IsValid()
+
+    def GetName(self):
+        return self.name
+
+    def GetType(self):
+        return self.type
+
+    def GetOffsetInBytes(self):
+        return self.offset
+
+
+_invalid = None
+
+
+def invalid_type():
+    global _invalid
+    if _invalid is None:
+        _invalid = SBType("", 0, "invalid")
+    return _invalid
+
+
+def basic_type(basic):
+    name, size, code, flags = _BASIC[basic]
+    return SBType(name, size, "scalar", basic=basic, code=code, flags=flags)
+
+
+_pointer_cache = {}
+
+
+def pointer_type(pointee):
+    key = pointee.name
+    if key not in _pointer_cache:
+        _pointer_cache[key] = SBType(pointee.name + " *", 8, "pointer", pointee=pointee, code="Q")
+    return _pointer_cache[key]
+
+
+def array_type(element, count):
+    return SBType("%s[%d]" % (element.name, count), element.size * count, "array",
+                  element=element, count=count)
+
+
+def struct_type(name, fields, size=None, bases=(), template_args=()):
+    """Build a struct type; `fields` is a list of (name, type) laid out in order."""
+    laid = []
+    offset = 0
+    for base_type, base_offset in bases:
+        offset = max(offset, base_offset + base_type.size)
+    for field in fields:
+        if len(field) == 3:
+            fname, ftype, offset = field
+        else:
+            fname, ftype = field
+            align = min(8, max(1, _align_of(ftype)))
+            offset = (offset + align - 1) // align * align
+        laid.append((fname, ftype, offset))
+        offset += ftype.size
+    if size is None:
+        align = max([min(8, _align_of(f[1])) for f in laid] + [b.size and 8 for b, _ in bases] + [1])
+        size = (offset + align - 1) // align * align if offset else 1
+    return SBType(name, size, "struct", fields=laid, bases=list(bases),
+                  template_args=list(template_args))
+
+
+def _align_of(t):
+    if t.kind == "array":
+        return _align_of(t.element)
+    if t.kind == "struct":
+        return max([_align_of(f[1]) for f in t.fields] or [1])
+    return t.size or 1
+
+
+class SBData:
+    def __init__(self, raw=b"", byte_order=eByteOrderLittle, addr_size=8):
+        self.raw = bytes(raw)
+        self.byte_order = byte_order
+        self.addr_size = addr_size
+
+    def IsValid(self):
+        return True
+
+    def SetData(self, error, buf, byte_order, addr_size):
+        self.raw = bytes(buf)
+        self.byte_order = byte_order
+        self.addr_size = addr_size
+
+    def GetByteSize(self):
+        return len(self.raw)
+
+    def ReadRawData(self, error, offset, size):
+        return self.raw[offset:offset + size]
+
+    def GetUnsignedInt64(self, error, offset):
+        return struct.unpack_from("<Q", self.raw, offset)[0]
+
+    def GetUnsignedInt32(self, error, offset):
+        return struct.unpack_from("<I", self.raw, offset)[0]
+
+    def GetDouble(self, error, offset):
+        return struct.unpack_from("<d", self.raw, offset)[0]
+
+    def GetFloat(self, error, offset):
+        return struct.unpack_from("<f", self.raw, offset)[0]
+
+    @staticmethod
+    def CreateDataFromUInt64Array(byte_order, addr_size, values):
+        return SBData(struct.pack("<%dQ" % len(values), *values), byte_order, addr_size)
+
+    @staticmethod
+    def CreateDataFromSInt64Array(byte_order, addr_size, values):
+        return SBData(struct.pack("<%dq" % len(values), *values), byte_order, addr_size)
+
+    @staticmethod
+    def CreateDataFromDoubleArray(byte_order, addr_size, values):
+        return SBData(struct.pack("<%dd" % len(values), *values), byte_order, addr_size)
+
+    @staticmethod
+    def CreateDataFromCString(byte_order, addr_size, text):
+        return SBData(text.encode() + b"\0", byte_order, addr_size)
+
+
+class SBValue:
+    """A typed view at an address in fake memory, or over detached bytes."""
+
+    def __init__(self, target=None, sbtype=None, name="", address=None, data=None):
+        self.target = target
+        self.type = sbtype
+        self.name = name
+        self.address = address
+        self.data = data
+
+    # -- validity / identity -------------------------------------------------
+    def IsValid(self):
+        return self.type is not None and self.type.IsValid()
+
+    def GetError(self):
+        return SBError() if self.IsValid() else SBError("invalid value")
+
+    def GetName(self):
+        return self.name
+
+    def GetType(self):
+        return self.type if self.type is not None else invalid_type()
+
+    def GetTypeName(self):
+        return self.GetType().GetName()
+
+    def GetByteSize(self):
+        return self.GetType().GetByteSize()
+
+    def GetTarget(self):
+        return self.target
+
+    def GetProcess(self):
+        return self.target.process if self.target else SBProcess()
+
+    def GetFrame(self):
+        return SBFrame()
+
+    def GetNonSyntheticValue(self):
+        return self
+
+    def GetStaticValue(self):
+        return self
+
+    def GetLoadAddress(self):
+        return self.address if self.address is not None else LLDB_INVALID_ADDRESS
+
+    def GetAddress(self):
+        return SBAddress(self.GetLoadAddress())
+
+    # -- raw data -------------------------------------------------------------
+    def _raw(self):
+        if not self.IsValid():
+            return None
+        if self.data is not None:
+            return self.data
+        return self.target.process.memory.read(self.address, self.type.size)
+
+    def GetData(self):
+        raw = self._raw()
+        return SBData(raw or b"")
+
+    def GetValueAsUnsigned(self, fail_value=0):
+        raw = self._raw()
+        if raw is None or self.type.kind not in ("scalar", "pointer"):
+            return fail_value
+        if self.type.code in ("f", "d"):
+            return int(struct.unpack("<" + self.type.code, raw)[0]) & ((1 << 64) - 1)
+        return int.from_bytes(raw[:self.type.size], "little")
+
+    def GetValueAsSigned(self, fail_value=0):
+        raw = self._raw()
+        if raw is None or self.type.kind not in ("scalar", "pointer"):
+            return fail_value
+        if self.type.code in ("f", "d"):
+            return int(struct.unpack("<" + self.type.code, raw)[0])
+        return int.from_bytes(raw[:self.type.size], "little", signed=True)
+
+    def GetValue(self):
+        raw = self._raw()
+        if raw is None:
+            return None
+        if self.type.kind == "pointer":
+            return "0x%016x" % int.from_bytes(raw, "little")
+        if self.type.kind != "scalar":
+            return None
+        value = struct.unpack("<" + self.type.code, raw[:self.type.size])[0]
+        if self.type.code == "?":
+            return "true" if value else "false"
+        if self.type.code in ("f", "d"):
+            return "%g" % value
+        if self.type.basic in (eBasicTypeChar, eBasicTypeSignedChar, eBasicTypeUnsignedChar):
+            return "'%s'" % chr(value & 0xff)
+        return str(value)
+
+    def GetSummary(self):
+        if self.data is not None and self.type.kind == "array" and self.type.element.size == 1:
+            return '"%s"' % self.data.split(b"\0", 1)[0].decode("utf-8", "replace")
+        return None
+
+    # -- children -------------------------------------------------------------
+    def _member(self, name):
+        t = self.type
+        for fname, ftype, offset in t.fields:
+            if fname == name:
+                return ftype, offset
+        for base, base_offset in t.bases:
+            found = SBValue(self.target, base, "", self._child_addr(base_offset),
+                            self._child_data(base_offset, base.size))._member(name)
+            if found is not None:
+                return found[0], found[1] + base_offset
+        return None
+
+    def _child_addr(self, offset):
+        return None if self.address is None else self.address + offset
+
+    def _child_data(self, offset, size):
+        return None if self.data is None else self.data[offset:offset + size]
+
+    def GetChildMemberWithName(self, name):
+        if not self.IsValid() or self.type.kind != "struct":
+            return SBValue()
+        found = self._member(name)
+        if found is None:
+            return SBValue()
+        ftype, offset = found
+        return SBValue(self.target, ftype, name, self._child_addr(offset),
+                       self._child_data(offset, ftype.size))
+
+    def GetNumChildren(self, max_count=None):
+        if not self.IsValid():
+            return 0
+        if self.type.kind == "array":
+            return self.type.count
+        if self.type.kind == "struct":
+            return len(self.type.fields) + len(self.type.bases)
+        if self.type.kind == "pointer":
+            return 1
+        return 0
+
+    def GetChildAtIndex(self, index, *args):
+        if not self.IsValid():
+            return SBValue()
+        t = self.type
+        if t.kind == "array":
+            if 0 <= index < t.count:
+                off = index * t.element.size
+                return SBValue(self.target, t.element, "[%d]" % index, self._child_addr(off),
+                               self._child_data(off, t.element.size))
+            return SBValue()
+        if t.kind == "struct":
+            children = [(b.name, b, off) for b, off in t.bases] + t.fields
+            if 0 <= index < len(children):
+                fname, ftype, off = children[index]
+                return SBValue(self.target, ftype, fname, self._child_addr(off),
+                               self._child_data(off, ftype.size))
+            return SBValue()
+        if t.kind == "pointer" and index == 0:
+            return self.Dereference()
+        return SBValue()
+
+    def GetIndexOfChildWithName(self, name):
+        if self.type.kind == "struct":
+            for i, (fname, _, _) in enumerate(self.type.fields):
+                if fname == name:
+                    return len(self.type.bases) + i
+        return 0xFFFFFFFF
+
+    def GetValueForExpressionPath(self, path):
+        value = self
+        for part in path.lstrip(".").replace("->", ".").split("."):
+            if not part:
+                continue
+            index = None
+            if "[" in part:
+                part, index = part.split("[", 1)
+                index = int(index.rstrip("]"))
+            if part:
+                value = value.GetChildMemberWithName(part)
+            if index is not None:
+                if value.type.kind == "pointer":
+                    value = SBValue(value.target, value.type.pointee, "[%d]" % index,
+                                    value.GetValueAsUnsigned() + index * value.type.pointee.size)
+                else:
+                    value = value.GetChildAtIndex(index)
+            if not value.IsValid():
+                return SBValue()
+        return value
+
+    def Dereference(self):
+        if not self.IsValid() or self.type.kind != "pointer":
+            return SBValue()
+        return SBValue(self.target, self.type.pointee, "*" + self.name,
+                       self.GetValueAsUnsigned())
+
+    def AddressOf(self):
+        if self.address is None:
+            return SBValue()
+        return SBValue(self.target, pointer_type(self.type), "&" + self.name,
+                       data=struct.pack("<Q", self.address))
+
+    def Cast(self, sbtype):
+        if not self.IsValid() or not sbtype.IsValid():
+            return SBValue()
+        data = None if self.data is None else self.data[:sbtype.size]
+        return SBValue(self.target, sbtype, self.name, self.address, data)
+
+    def CreateChildAtOffset(self, name, offset, sbtype):
+        if not self.IsValid():
+            return SBValue()
+        if self.type.kind == "pointer":
+            return SBValue(self.target, sbtype, name, self.GetValueAsUnsigned() + offset)
+        return SBValue(self.target, sbtype, name, self._child_addr(offset),
+                       self._child_data(offset, sbtype.size))
+
+    def CreateValueFromData(self, name, data, sbtype):
+        return SBValue(self.target, sbtype, name, data=data.raw[:sbtype.size])
+
+    def CreateValueFromAddress(self, name, address, sbtype):
+        return SBValue(self.target, sbtype, name, address)
+
+    def CreateValueFromExpression(self, name, expression):
+        stats["expression_values"] += 1
+        expression = expression.strip()
+        if expression.startswith('"'):
+            text = expression.strip('"').encode() + b"\0"
+            return SBValue(self.target, array_type(basic_type(eBasicTypeChar), len(text)),
+                           name, data=text)
+        return SBValue(self.target, basic_type(eBasicTypeLongLong), name,
+                       data=struct.pack("<q", int(expression)))
+
+    def __repr__(self):
+        return "SBValue(%s: %s)" % (self.name, self.type)
+
+
+class SBAddress:
+    def __init__(self, load_addr=LLDB_INVALID_ADDRESS, target=None):
+        self.load_addr = load_addr
+
+    def GetLoadAddress(self, target=None):
+        return self.load_addr
+
+    def IsValid(self):
+        return self.load_addr != LLDB_INVALID_ADDRESS
+
+
+class SBFileSpec:
+    def __init__(self, path=""):
+        self.fullpath = path
+
+    def IsValid(self):
+        return bool(self.fullpath)
+
+    def __str__(self):
+        return self.fullpath
+
+
+class SBProcess:
+    _next_id = 1
+
+    def __init__(self, target=None):
+        self.target = target
+        self.memory = Memory()
+        self.stop_id = 1
+        self.state = eStateStopped
+        self.unique_id = SBProcess._next_id
+        SBProcess._next_id += 1
+
+    def IsValid(self):
+        return self.target is not None
+
+    def GetTarget(self):
+        return self.target
+
+    def GetUniqueID(self):
+        return self.unique_id
+
+    def GetProcessID(self):
+        return self.unique_id
+
+    def GetSelectedThread(self):
+        return SBThread()
+
+    def GetStopID(self, include_expression_stops=False):
+        return self.stop_id
+
+    def GetState(self):
+        return self.state
+
+    def GetByteOrder(self):
+        return eByteOrderLittle
+
+    def GetAddressByteSize(self):
+        return 8
+
+    def step(self):
+        """Simulate a resume followed by a stop."""
+        self.stop_id += 1
+
+    def ReadMemory(self, addr, size, error):
+        stats["read_calls"] += 1
+        stats["read_bytes"] += size
+        data = self.memory.read(addr, size)
+        if data is None:
+            error.SetErrorString("memory read failed for 0x%x" % addr)
+        return data
+
+    def ReadUnsignedFromMemory(self, addr, size, error):
+        data = self.ReadMemory(addr, size, error)
+        return int.from_bytes(data, "little") if data else 0
+
+    def ReadPointerFromMemory(self, addr, error):
+        return self.ReadUnsignedFromMemory(addr, 8, error)
+
+    def ReadCStringFromMemory(self, addr, max_size, error):
+        out = bytearray()
+        while len(out) < max_size:
+            data = self.memory.read(addr + len(out), 1)
+            if data is None or data == b"\0":
+                break
+            out += data
+        return out.decode("utf-8", "replace")
+
+    def GetNumThreads(self):
+        return 0
+
+    def GetThreadAtIndex(self, index):
+        return SBThread()
+
+    def get_process_thread_list(self):
+        return []
+
+
+class SBTarget:
+    def __init__(self, debugger=None, executable="a.out"):
+        self.debugger = debugger
+        self.executable = executable
+        self.types = {}
+        self.process = SBProcess(self)
+        for basic in _BASIC:
+            t = basic_type(basic)
+            self.types.setdefault(t.name, t)
+        for alias, basic in _ALIASES.items():
+            self.types[alias] = basic_type(basic)
+
+    def IsValid(self):
+        return True
+
+    def GetProcess(self):
+        return self.process
+
+    def GetDebugger(self):
+        return self.debugger or SBDebugger()
+
+    def GetExecutable(self):
+        return SBFileSpec(self.executable)
+
+    def GetByteOrder(self):
+        return eByteOrderLittle
+
+    def GetAddressByteSize(self):
+        return 8
+
+    def add_type(self, sbtype):
+        self.types[sbtype.name] = sbtype
+        return sbtype
+
+    def FindFirstType(self, name):
+        return self.types.get(name.strip(), invalid_type())
+
+    def GetBasicType(self, basic):
+        return basic_type(basic)
+
+    def CreateValueFromAddress(self, name, address, sbtype):
+        return SBValue(self, sbtype, name, address.GetLoadAddress())
+
+    def CreateValueFromData(self, name, data, sbtype):
+        return SBValue(self, sbtype, name, data=data.raw[:sbtype.size])
+
+    # helpers for building fixtures
+    def value_at(self, name, sbtype, address):
+        return SBValue(self, sbtype, name, address)
+
+    def new_value(self, name, sbtype):
+        return SBValue(self, sbtype, name, self.process.memory.alloc(sbtype.size))
+
+
+class SBFrame:
+    def __init__(self, variables=None, target=None):
+        self.variables = variables or {}
+        self.target = target
+
+    def IsValid(self):
+        return bool(self.variables)
+
+    def GetVariables(self, *args):
+        return list(self.variables.values())
+
+    def FindVariable(self, name):
+        return self.variables.get(name, SBValue())
+
+    def GetValueForVariablePath(self, path):
+        return self.variables.get(path, SBValue())
+
+    def EvaluateExpression(self, expr):
+        return SBValue()
+
+    def GetThread(self):
+        return SBThread()
+
+
+class SBExecutionContext:
+    def __init__(self, target=None, frame=None):
+        self.target = target
+        self.frame = frame or SBFrame(target=target)
+
+    def GetTarget(self):
+        return self.target
+
+    def GetProcess(self):
+        return self.target.process
+
+    def GetFrame(self):
+        return self.frame
+
+
+class SBThread:
+    def IsValid(self):
+        return False
+
+    def GetSelectedFrame(self):
+        return SBFrame()
+
+
+class SBCommandReturnObject:
+    def __init__(self):
+        self.output = []
+        self.error = None
+        self.status = eReturnStatusSuccessFinishResult
+
+    def AppendMessage(self, message):
+        self.output.append(message)
+
+    def SetError(self, message):
+        self.error = str(message)
+        self.status = eReturnStatusFailed
+
+    def SetStatus(self, status):
+        self.status = status
+
+    def Succeeded(self):
+        return self.error is None
+
+    def GetOutput(self):
+        return "\n".join(self.output)
+
+
+class SBTypeNameSpecifier:
+    def __init__(self, name, is_regex=False):
+        self.name = name
+        self.is_regex = is_regex
+
+    def GetName(self):
+        return self.name
+
+    def IsRegex(self):
+        return self.is_regex
+
+
+class SBTypeSummary:
+    def __init__(self, kind=None, data=None, options=0):
+        self.kind = kind
+        self.data = data
+        self.options = options
+
+    @staticmethod
+    def CreateWithFunctionName(name, options=0):
+        return SBTypeSummary("function", name, options)
+
+    @staticmethod
+    def CreateWithSummaryString(text, options=0):
+        return SBTypeSummary("string", text, options)
+
+    def SetOptions(self, options):
+        self.options = options
+
+    def GetOptions(self):
+        return self.options
+
+
+class SBTypeSynthetic:
+    def __init__(self, name=None, options=0):
+        self.name = name
+        self.options = options
+
+    @staticmethod
+    def CreateWithClassName(name, options=0):
+        return SBTypeSynthetic(name, options)
+
+
+eTypeOptionNone = 0
+eTypeOptionCascade = 1 << 0
+eTypeOptionSkipPointers = 1 << 1
+eTypeOptionSkipReferences = 1 << 2
+eTypeOptionHideChildren = 1 << 3
+eTypeOptionHideValue = 1 << 4
+eTypeOptionShowOneLiner = 1 << 5
+eTypeOptionHideNames = 1 << 6
+eTypeOptionNonCacheable = 1 << 7
+eTypeOptionHideEmptyAggregates = 1 << 8
+eTypeOptionFrontEndWantsDereference = 1 << 9
+
+eFormatterMatchExact = 0
+eFormatterMatchRegex = 1
+eFormatterMatchCallback = 2
+
+
+class SBTypeCategory:
+    def __init__(self, name):
+        self.name = name
+        self.summaries = []
+        self.synthetics = []
+        self.enabled = False
+
+    def IsValid(self):
+        return True
+
+    def GetName(self):
+        return self.name
+
+    def AddTypeSummary(self, spec, summary):
+        self.summaries.append((spec, summary))
+        return True
+
+    def AddTypeSynthetic(self, spec, synthetic):
+        self.synthetics.append((spec, synthetic))
+        return True
+
+    def SetEnabled(self, enabled):
+        self.enabled = enabled
+
+    def GetEnabled(self):
+        return self.enabled
+
+
+class SBDebugger:
+    _next_id = 1
+
+    def __init__(self):
+        self.commands = []
+        self.categories = {}
+        self.targets = []
+        self.id = SBDebugger._next_id
+        SBDebugger._next_id += 1
+
+    @staticmethod
+    def Create(*args):
+        return SBDebugger()
+
+    def IsValid(self):
+        return True
+
+    def GetID(self):
+        return self.id
+
+    def HandleCommand(self, command):
+        self.commands.append(command)
+
+    def CreateTarget(self, executable="a.out"):
+        target = SBTarget(self, executable)
+        self.targets.append(target)
+        return target
+
+    def GetSelectedTarget(self):
+        return self.targets[-1] if self.targets else SBTarget(self)
+
+    def GetCategory(self, name):
+        return self.categories.get(name, _InvalidCategory())
+
+    def CreateCategory(self, name):
+        category = self.categories[name] = SBTypeCategory(name)
+        return category
+
+    def SetAsync(self, value):
+        pass
+
+
+class _InvalidCategory(SBTypeCategory):
+    def __init__(self):
+        SBTypeCategory.__init__(self, "")
+
+    def IsValid(self):
+        return False
+
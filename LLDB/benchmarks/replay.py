@@ -0,0 +1,157 @@
+# replay.py
+# Run the formatters on a snapshot taken with `formatter-snapshot`, without a
+# debugger: types are rebuilt for the fake lldb module next to this file and
+# memory reads are served from the memory-mapped snapshot, so buffers of any
+# size are paged in by the OS instead of being loaded.
+#
+#   python3 LLDB/benchmarks/replay.py capture.snap                 summaries and first children
+#   python3 LLDB/benchmarks/replay.py capture.snap -r 5 --profile  time 5 cold stops, per-formatter table
+import argparse
+import mmap
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE) # the fake lldb shadows any installed one
+
+import lldb
+import formatter_profiling
+import formatter_snapshot
+import lldb_formatters
+
+SCALAR_FLAGS = {"f": lldb.eTypeIsFloat | lldb.eTypeIsSigned, "d": lldb.eTypeIsFloat | lldb.eTypeIsSigned,
+                "e": lldb.eTypeIsFloat | lldb.eTypeIsSigned}
+
+def scalar_type(name, record):
+    fmt = record.get("format")
+    if fmt is None:
+        flags = 0
+    elif fmt in SCALAR_FLAGS:
+        flags = SCALAR_FLAGS[fmt]
+    else:
+        flags = lldb.eTypeIsInteger | (lldb.eTypeIsSigned if fmt.islower() else 0)
+    return lldb.SBType(name, record["size"], "scalar", basic=record.get("basic", lldb.eBasicTypeInvalid),
+                       code=fmt, flags=flags)
+
+def build_types(target, records):
+    """Fake SBTypes for the type records of a snapshot, added to `target`."""
+    built = {}
+    def get(name):
+        sbtype = built.get(name)
+        if sbtype is not None:
+            return sbtype
+        record = records.get(name)
+        if record is None:
+            return lldb.invalid_type()
+        if record["kind"] == "pointer":
+            sbtype = built[name] = lldb.pointer_type(get(record["pointee"]))
+        elif record["kind"] == "array":
+            sbtype = built[name] = lldb.array_type(get(record["element"]), record["count"])
+        elif record["kind"] == "scalar":
+            sbtype = built[name] = target.add_type(scalar_type(name, record))
+        else:
+            # Registered before its fields are resolved: types may refer to themselves
+            sbtype = built[name] = target.add_type(lldb.SBType(name, record["size"], "struct"))
+            sbtype.fields = [(field, get(type_name), offset) for field, type_name, offset in record["fields"] or []]
+            sbtype.bases = [(get(type_name), offset) for type_name, offset in record["bases"]]
+            sbtype.template_args = [get(type_name) for type_name in record["template_args"]]
+        return sbtype
+    for name in records:
+        get(name)
+    return built
+
+class Replay:
+    """Target and values of a snapshot; memory stays mapped until close()."""
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        header = formatter_snapshot.read_header(self.file)
+        if header["byte_order"] != "little":
+            raise formatter_snapshot.SnapshotError("only little endian snapshots can be replayed")
+        self.debugger = lldb.SBDebugger()
+        self.target = self.debugger.CreateTarget(os.path.basename(path))
+        self.process = self.target.GetProcess()
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+        for address, size, offset in header["ranges"]:
+            self.process.memory.map(address, self.view[offset:offset + size])
+        types = build_types(self.target, header["types"])
+        self.values = [self.target.value_at(value["name"], types[value["type"]], value["address"])
+                       for value in header["values"]]
+        self.bytes = sum(size for _, size, _ in header["ranges"])
+        lldb_formatters.register(self.debugger)
+
+    def close(self):
+        self.process.memory.starts.clear()
+        self.process.memory.buffers.clear()
+        self.view.release()
+        self.map.close()
+        self.file.close()
+
+def formatters_of(valobj):
+    """(summary function, synthetic provider class) registered for `valobj`, either None."""
+    found = []
+    for name in lldb_formatters.lookup(valobj.GetType().GetName()):
+        if name is None:
+            found.append(None)
+        else:
+            module, _, attribute = name.rpartition(".")
+            found.append(lldb_formatters.resolve(module, attribute))
+    return found
+
+def show(valobj, children=None):
+    """What LLDB computes to show `valobj`: (summary, number of children, children)."""
+    summary_function, provider_class = formatters_of(valobj)
+    summary = summary_function(valobj, {}) if summary_function is not None else None
+    count = 0
+    shown = []
+    if provider_class is not None:
+        provider = provider_class(valobj, {})
+        provider.update()
+        count = provider.num_children()
+        for index in range(count if children is None else min(children, count)):
+            shown.append(provider.get_child_at_index(index))
+    return summary, count, shown
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay the formatters on a formatter-snapshot file.")
+    parser.add_argument("snapshot", help="file written by formatter-snapshot")
+    parser.add_argument("--children", type=int, default=10, help="children to print per value")
+    parser.add_argument("-r", "--repeat", type=int, default=0,
+                        help="also time this many cold stops, each showing every child")
+    parser.add_argument("--profile", action="store_true", help="print the formatter-stats table of the timed runs")
+    args = parser.parse_args(argv)
+
+    try:
+        replay = Replay(args.snapshot)
+    except (formatter_snapshot.SnapshotError, OSError) as e:
+        print(f"replay: {e}", file=sys.stderr)
+        return 1
+    print(f"{args.snapshot}: {len(replay.values)} value(s), {replay.bytes} bytes of target memory")
+    for valobj in replay.values:
+        summary, count, shown = show(valobj, args.children)
+        print(f"{valobj.GetName()} ({valobj.GetType().GetName()}) = {summary}  [{count} children]")
+        for child in shown:
+            if child is not None:
+                print(f"    {child.GetName()} = {child.GetValue() or child.GetSummary()}")
+
+    if args.repeat:
+        if args.profile:
+            formatter_profiling.enable()
+        for valobj in replay.values:
+            times = []
+            for _ in range(args.repeat):
+                replay.process.step() # cold per-stop caches, as after a step in LLDB
+                start = time.perf_counter()
+                show(valobj)
+                times.append(time.perf_counter() - start)
+            print(f"{valobj.GetName()}: best {min(times):.4f}s median {statistics.median(times):.4f}s")
+        if args.profile:
+            print(formatter_profiling.format_table(formatter_profiling.table()))
+    replay.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
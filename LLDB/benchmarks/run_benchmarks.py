@@ -0,0 +1,346 @@
+# run_benchmarks.py
+# Offline throughput benchmarks of the LLDB formatters, run against the fake lldb
+# module next to this file so no debugger is needed.
+#
+#   python3 LLDB/benchmarks/run_benchmarks.py                      print results as JSON
+#   python3 LLDB/benchmarks/run_benchmarks.py -o new.json          write them to a file
+#   python3 LLDB/benchmarks/run_benchmarks.py --baseline old.json  exit 1 on regressions
+#   python3 LLDB/benchmarks/run_benchmarks.py -k eigen -r 3        subset, 3 repeats
+import argparse
+import json
+import os
+import platform
+import statistics
+import struct
+import sys
+import time
+from array import array
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE) # the fake lldb shadows any installed one
+
+import lldb
+import fixtures
+import formatter_async
+import formatter_utils
+import eigen_formatters
+import opencv_formatters
+import image_formatters
+import pmp_formatters
+import seacave_formatters
+import tinyxml2_formatters
+import natvis_compiler
+
+SCENARIOS = []
+
+def scenario(name, description):
+    """Register `setup(target) -> run`, where `run()` returns the number of items processed."""
+    def register(setup):
+        SCENARIOS.append((name, description, setup))
+        return setup
+    return register
+
+def expand(provider_class, valobj, limit=None):
+    """What LLDB does to show a variable: update, count, then fetch every child."""
+    provider = provider_class(valobj, {})
+    provider.update()
+    count = provider.num_children()
+    if limit is not None:
+        count = min(count, limit)
+    for index in range(count):
+        provider.get_child_at_index(index)
+    return count
+
+# Children on screen in an expanded variable, as fetched by an IDE
+VISIBLE_CHILDREN = 50
+
+def refresh(provider_class, valobj, visible=None):
+    """A step while the variable stays expanded: the `visible` children (the
+    first VISIBLE_CHILDREN by default) are rebuilt only if update() does not
+    report them as unchanged. Returns a `run()` for `scenario`."""
+    provider = provider_class(valobj, {})
+    def show():
+        for index in visible or range(min(provider.num_children(), VISIBLE_CHILDREN)):
+            provider.get_child_at_index(index)
+    provider.update()
+    show()
+    def run():
+        if provider.update():
+            return 0
+        show()
+        return provider.num_children()
+    return run
+
+# ------------------------------------------------------------------------------
+# Scenarios
+# ------------------------------------------------------------------------------
+@scenario("eigen.MatrixXd.1e6.expand", "children of a 1000 x 1000 MatrixXd")
+def eigen_matrixxd_expand(target):
+    valobj = target.eigen_dynamic("M", "double", 1000, 1000, range(1000 * 1000))
+    return lambda: expand(eigen_formatters.EigenMatrixSyntheticProvider, valobj)
+
+@scenario("eigen.MatrixXd.1e6.refresh", "step with an unchanged, expanded 1000 x 1000 MatrixXd")
+def eigen_matrixxd_refresh(target):
+    valobj = target.eigen_dynamic("M", "double", 1000, 1000, range(1000 * 1000))
+    return refresh(eigen_formatters.EigenMatrixSyntheticProvider, valobj)
+
+@scenario("eigen.MatrixXd.1e6.summary", "summary of a 1000 x 1000 MatrixXd")
+def eigen_matrixxd_summary(target):
+    valobj = target.eigen_dynamic("M", "double", 1000, 1000, range(1000 * 1000))
+    def run():
+        eigen_formatters.EigenMatrixSummaryProvider(valobj, {})
+        return 1
+    return run
+
+@scenario("eigen.Vector3d.10k.summary", "summaries of 10000 Vector3d locals")
+def eigen_vector3d_summary(target):
+    values = [target.eigen_fixed("v%d" % i, "double", 3, 1, (i, i + 1, i + 2)) for i in range(10000)]
+    def run():
+        for valobj in values:
+            eigen_formatters.EigenMatrixSummaryProvider(valobj, {})
+        return len(values)
+    return run
+
+@scenario("eigen.Vector3d.10k.expand", "children of 10000 Vector3d locals")
+def eigen_vector3d_expand(target):
+    values = [target.eigen_fixed("v%d" % i, "double", 3, 1, (i, i + 1, i + 2)) for i in range(10000)]
+    def run():
+        return sum(expand(eigen_formatters.EigenMatrixSyntheticProvider, valobj) for valobj in values)
+    return run
+
+@scenario("eigen.Block.250k.expand", "children of a 500 x 500 block of a 1000 x 1000 MatrixXd")
+def eigen_block_expand(target):
+    matrix = target.eigen_dynamic("M", "double", 1000, 1000, range(1000 * 1000))
+    valobj = target.eigen_block("B", matrix, 250, 250, 500, 500)
+    return lambda: expand(eigen_formatters.EigenMatrixSyntheticProvider, valobj)
+
+@scenario("cv.Mat.4K.expand", "rows of a 3840 x 2160 CV_8UC3 Mat")
+def cv_mat_expand(target):
+    rows, cols = 2160, 3840
+    valobj = target.cv_mat("img", rows, cols, 0, 3, bytes(rows * cols * 3))
+    return lambda: expand(opencv_formatters.CVMatSyntheticProvider, valobj)
+
+@scenario("cv.Mat.4K.refresh", "step with an unchanged, expanded 3840 x 2160 CV_8UC3 Mat")
+def cv_mat_refresh(target):
+    rows, cols = 2160, 3840
+    valobj = target.cv_mat("img", rows, cols, 0, 3, bytes(rows * cols * 3))
+    return refresh(opencv_formatters.CVMatSyntheticProvider, valobj)
+
+@scenario("mve.Image.4K.expand", "rows of a 3840 x 2160 x 3 mve::Image<float>")
+def mve_image_expand(target):
+    width, height = 3840, 2160
+    valobj = target.mve_image("img", "float", width, height, 3)
+    return lambda: expand(image_formatters.ImageSyntheticProvider, valobj)
+
+@scenario("cv.Mat.4K.stats", "summary with statistics of a 3840 x 2160 CV_32FC1 Mat")
+def cv_mat_stats(target):
+    rows, cols = 2160, 3840
+    valobj = target.cv_mat("depth", rows, cols, 5, 1, bytes(rows * cols * 4))
+    def run():
+        formatter_utils.STATS_SUMMARY = True
+        formatter_utils.ASYNC_SUMMARY = False
+        try:
+            opencv_formatters.CVMatSummaryProvider(valobj, {})
+        finally:
+            formatter_utils.STATS_SUMMARY = False
+            formatter_utils.ASYNC_SUMMARY = True
+        return 1
+    return run
+
+@scenario("cv.Mat.4K.stats.async", "background statistics of a 3840 x 2160 CV_32FC1 Mat, until ready")
+def cv_mat_stats_async(target):
+    rows, cols = 2160, 3840
+    valobj = target.cv_mat("depth", rows, cols, 5, 1, bytes(rows * cols * 4))
+    def run():
+        formatter_utils.STATS_SUMMARY = True
+        try:
+            opencv_formatters.CVMatSummaryProvider(valobj, {})
+        finally:
+            formatter_utils.STATS_SUMMARY = False
+        formatter_async.wait()
+        return 1
+    return run
+
+@scenario("bufdiff.Mat.100MB", "bufdiff of an unchanged 5000 x 5000 CV_32FC1 Mat against its snapshot")
+def bufdiff_mat(target):
+    rows, cols = 5000, 5000
+    valobj = target.cv_mat("depth", rows, cols, 5, 1, bytes(rows * cols * 4))
+    exe_ctx = lldb.SBExecutionContext(target.target, lldb.SBFrame({"depth": valobj}))
+    opencv_formatters.bufdiff_command(target.debugger, "depth", exe_ctx, lldb.SBCommandReturnObject(), {})
+    def run():
+        result = lldb.SBCommandReturnObject()
+        opencv_formatters.bufdiff_command(target.debugger, "depth", exe_ctx, result, {})
+        return rows * cols * 4
+    return run
+
+@scenario("seacave.cList.10M.expand", "children of a 10M element cList<float>")
+def clist_expand(target):
+    valobj = target.clist("list", "float", 10 * 1000 * 1000)
+    return lambda: expand(seacave_formatters.cListSyntheticProvider, valobj)
+
+@scenario("seacave.cList.10M.refresh", "step with an unchanged, expanded 10M element cList<float>")
+def clist_refresh(target):
+    valobj = target.clist("list", "float", 10 * 1000 * 1000)
+    return refresh(seacave_formatters.cListSyntheticProvider, valobj)
+
+@scenario("seacave.cList.10k.refresh.changed", "step after an element past the first 64 KiB of an expanded "
+          "cList<double> changed (fails if the child is stale)")
+def clist_refresh_changed(target):
+    count, changed = 10 * 1000, 9950
+    visible = range(count - VISIBLE_CHILDREN, count) # scrolled to the end
+    valobj = target.clist("list", "double", count)
+    address = valobj.GetChildMemberWithName("_vector").GetValueAsUnsigned(0)
+    provider = seacave_formatters.cListSyntheticProvider(valobj, {})
+    children = {}
+    def show():
+        for index in visible:
+            children[index] = provider.get_child_at_index(index)
+    provider.update()
+    show()
+    steps = [0]
+    def run():
+        steps[0] += 1
+        target.memory.write(address + changed * 8, struct.pack("<d", steps[0]))
+        target.process.step()
+        if not provider.update():
+            show()
+        value = children[changed].GetValue()
+        if value != "%g" % steps[0]:
+            raise AssertionError("stale child [%d] after a step: %s instead of %g" % (changed, value, steps[0]))
+        return len(visible)
+    return run
+
+@scenario("seacave.cList.points.1M.summary", "point cloud summary of a 1M element cList<Eigen::Vector3f>")
+def clist_points_summary(target):
+    count = 1000 * 1000
+    valobj = target.clist("cloud", target.eigen_fixed_type("float", 3, 1), count)
+    def run():
+        formatter_utils.POINT_SUMMARY = True
+        formatter_utils.ASYNC_SUMMARY = False
+        try:
+            seacave_formatters.cList_summary(valobj, {})
+        finally:
+            formatter_utils.POINT_SUMMARY = False
+            formatter_utils.ASYNC_SUMMARY = True
+        return count
+    return run
+
+@scenario("pmp.Vertex.10k.one_ring", "summaries and one-rings of 10k vertices of a 200 x 200 grid pmp::SurfaceMesh")
+def pmp_one_ring(target):
+    size = 200
+    points = [(x, y, 0) for y in range(size) for x in range(size)]
+    faces = []
+    for y in range(size - 1):
+        for x in range(size - 1):
+            v = y * size + x
+            faces += [(v, v + 1, v + size + 1), (v, v + size + 1, v + size)]
+    mesh = target.pmp_mesh("mesh", points, faces)
+    exe_ctx = lldb.SBExecutionContext(target.target, lldb.SBFrame({"mesh": mesh}))
+    pmp_formatters.pmp_mesh_command(target.debugger, "mesh", exe_ctx, lldb.SBCommandReturnObject(), {})
+    count = 10 * 1000
+    vertex = target.type("pmp::Vertex")
+    handles = target.buffer(array("I", range(0, 4 * count, 4)).tobytes())
+    values = [target.target.value_at("v", vertex, handles + 4 * i) for i in range(count)]
+    def run():
+        target.process.step()
+        for valobj in values:
+            pmp_formatters.HandleSummary(valobj, {})
+            pmp_formatters.HandleSyntheticProvider(valobj, {}).update()
+        return count
+    return run
+
+@scenario("tinyxml2.XMLNode.10k.expand", "children of a tinyxml2 node with 10k children (sibling index)")
+def xml_expand(target):
+    valobj = target.xml_element("root", 10 * 1000)
+    return lambda: expand(tinyxml2_formatters.XMLNodeSyntheticProvider, valobj)
+
+@scenario("natvis.XMLNode.10k.expand", "children of a tinyxml2 node with 10k children (natvis LinkedListItems)")
+def natvis_xml_expand(target):
+    valobj = target.xml_element("root", 10 * 1000)
+    module = natvis_compiler.load(os.path.join(natvis_compiler.NATVIS_DIRS[0], "TinyXML2.natvis"))
+    return lambda: expand(module.Synthetic1, valobj)
+
+# ------------------------------------------------------------------------------
+# Runner
+# ------------------------------------------------------------------------------
+def measure(name, description, setup, repeat):
+    target = fixtures.Target()
+    run = setup(target)
+    times = []
+    for _ in range(repeat):
+        # Every repeat is a new stop: per-stop caches start cold, layouts stay warm
+        target.process.step()
+        lldb.reset_stats()
+        start = time.perf_counter()
+        items = run()
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    return {
+        "name": name,
+        "description": description,
+        "items": items,
+        "best_s": best,
+        "median_s": statistics.median(times),
+        "items_per_s": items / best if best else 0.0,
+        "read_calls": lldb.stats["read_calls"],
+        "read_bytes": lldb.stats["read_bytes"],
+        "expression_values": lldb.stats["expression_values"],
+    }
+
+def compare(results, baseline, tolerance):
+    """Names of scenarios whose best time grew more than `tolerance` over the baseline."""
+    previous = dict((entry["name"], entry) for entry in baseline["results"])
+    regressions = []
+    for entry in results:
+        old = previous.get(entry["name"])
+        if old is not None and entry["best_s"] > old["best_s"] * (1.0 + tolerance):
+            regressions.append(f"{entry['name']}: {old['best_s']:.4f}s -> {entry['best_s']:.4f}s")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the LLDB formatters against a fake lldb module.")
+    parser.add_argument("-k", dest="filter", default="", help="only run scenarios whose name contains this")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="repeats per scenario (best and median are reported)")
+    parser.add_argument("-o", "--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--baseline", help="JSON results to compare against; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown over the baseline (0.25 = 25%%)")
+    parser.add_argument("--no-numpy", action="store_true", help="run the pure Python code paths")
+    parser.add_argument("--list", action="store_true", help="list the scenarios and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, description, _ in SCENARIOS:
+            print(f"{name:<32} {description}")
+        return 0
+    if args.no_numpy:
+        formatter_utils.numpy = None
+
+    results = []
+    for name, description, setup in SCENARIOS:
+        if args.filter in name:
+            results.append(measure(name, description, setup, max(1, args.repeat)))
+            print(f"{name:<32} {results[-1]['best_s']:9.4f}s", file=sys.stderr)
+    report = {
+        "python": platform.python_version(),
+        "numpy": formatter_utils.numpy is not None,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+# buffer_io.py
+# Streaming access to 2D scalar buffers in target memory, writers for .npy/.pfm/.png
+# and tile hashes to compare a buffer across stops.
+import lldb
+import hashlib
+import math
+import mmap
+import struct
+import zlib
+from array import array
+
+import formatter_utils
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Unsigned array typecode of each element size, used to move elements around untouched
+SIZE_CODES = {1: "B", 2: "H", 4: "I", 8: "Q"}
+
+class BufferView:
+    """A rows x cols x channels buffer of `fmt` scalars in target memory.
+
+    Row-major buffers start row `r` at `address + r * step`; column-major ones
+    (Eigen default) start column `c` at `address + c * col_step`. `bgr` marks
+    OpenCV channel order, swapped to RGB by the image writers.
+    """
+    def __init__(self, address, rows, cols, channels, fmt, step=0, col_major=False, col_step=0, bgr=False):
+        self.address = address
+        self.rows = rows
+        self.cols = cols
+        self.channels = channels
+        self.fmt = fmt
+        self.elem_size = struct.calcsize(fmt)
+        self.row_bytes = cols * channels * self.elem_size
+        self.step = max(step, self.row_bytes)
+        self.col_major = col_major
+        self.col_step = max(col_step, rows * self.elem_size)
+        self.bgr = bgr
+
+    @property
+    def nbytes(self):
+        return self.rows * self.row_bytes
+
+    @property
+    def span(self):
+        """Bytes from the first element to the end of the last one, padding included."""
+        if not self.rows or not self.cols:
+            return 0
+        if self.col_major:
+            return (self.cols - 1) * self.col_step + self.rows * self.elem_size
+        return (self.rows - 1) * self.step + self.row_bytes
+
+    @property
+    def contiguous(self):
+        if self.col_major:
+            return self.col_step == self.rows * self.elem_size
+        return self.step == self.row_bytes
+
+    def storage_chunks(self, process):
+        """Yield packed chunks in storage order (row-major, or column-major)."""
+        if not self.col_major:
+            for _, raw in formatter_utils.iter_chunks(process, self.address, self.rows, self.row_bytes,
+                                                      self.step, self.channels * self.elem_size):
+                yield raw
+            return
+        for _, raw in formatter_utils.iter_chunks(process, self.address, self.cols, self.rows * self.elem_size,
+                                                  self.col_step, self.elem_size):
+            yield raw
+
+    def row_chunks(self, process):
+        """Yield (first_row, packed rows) in row-major order, whatever the storage order."""
+        if not self.col_major:
+            yield from formatter_utils.iter_chunks(process, self.address, self.rows, self.row_bytes,
+                                                   self.step, self.channels * self.elem_size)
+            return
+        # Gather bands of rows: one read per column segment, interleaved with
+        # extended slice assignment so no Python loop runs per element
+        code = SIZE_CODES[self.elem_size]
+        band = max(1, formatter_utils.CHUNK_BYTES // max(1, self.row_bytes))
+        for first in range(0, self.rows, band):
+            count = min(band, self.rows - first)
+            out = array(code, bytes(count * self.cols * self.elem_size))
+            for c in range(self.cols):
+                raw = formatter_utils.read_memory(
+                    process, self.address + c * self.col_step + first * self.elem_size, count * self.elem_size,
+                    cache=False)
+                if raw is None:
+                    yield first, None
+                    return
+                out[c::self.cols] = array(code, raw)
+            yield first, out.tobytes()
+
+# ------------------------------------------------------------------------------
+# Chunk conversion
+# ------------------------------------------------------------------------------
+def convert_chunk(raw, view, out_fmt, big_endian, swap_rb, byte_order):
+    """Decode a chunk of `view.fmt` scalars and re-encode it as `out_fmt`,
+    optionally swapping the first and third channel (BGR <-> RGB)."""
+    values = formatter_utils.decode_array(raw, view.fmt, byte_order)
+    channels = view.channels
+    if formatter_utils.numpy is not None:
+        numpy = formatter_utils.numpy
+        values = values.astype(numpy.dtype(out_fmt).newbyteorder(">" if big_endian else "<"))
+        if swap_rb and channels >= 3:
+            values = values.reshape(-1, channels)[:, [2, 1, 0] + list(range(3, channels))]
+        return values.tobytes()
+    if out_fmt == view.fmt and isinstance(values, array):
+        out = values
+    else:
+        out = array(out_fmt, values)
+    if swap_rb and channels >= 3:
+        out[0::channels], out[2::channels] = out[2::channels], out[0::channels]
+    host_big = array("H", b"\x00\x01")[0] == 1
+    if big_endian != host_big:
+        out.byteswap()
+    return out.tobytes()
+
+# ------------------------------------------------------------------------------
+# Writers
+# ------------------------------------------------------------------------------
+class ExportError(Exception):
+    pass
+
+def _mapped_output(path, header, data_size):
+    """Create `path` with `header` followed by `data_size` bytes, and map it."""
+    f = open(path, "w+b")
+    f.write(header)
+    f.truncate(len(header) + data_size)
+    if data_size == 0:
+        return f, None
+    return f, mmap.mmap(f.fileno(), len(header) + data_size)
+
+def npy_descr(fmt, byte_order):
+    kind = "f" if fmt in "efd" else ("u" if fmt.isupper() else "i")
+    endian = "|" if struct.calcsize(fmt) == 1 else (">" if byte_order == lldb.eByteOrderBig else "<")
+    return f"{endian}{kind}{struct.calcsize(fmt)}"
+
+def write_npy(process, view, path, byte_order):
+    """Write a .npy file; data is streamed chunk by chunk into the mapped output."""
+    shape = (view.rows, view.cols) if view.channels == 1 else (view.rows, view.cols, view.channels)
+    header = "{'descr': '%s', 'fortran_order': %s, 'shape': %s, }" % (
+        npy_descr(view.fmt, byte_order), view.col_major and view.channels == 1, shape)
+    # Pad so the data starts on a 64 byte boundary, as numpy does
+    header = header.ljust((len(header) + 10 + 1 + 63) // 64 * 64 - 10 - 1) + "\n"
+    header = b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+    f, mm = _mapped_output(path, header, view.nbytes)
+    try:
+        offset = len(header)
+        for raw in view.storage_chunks(process):
+            if raw is None:
+                raise ExportError("failed to read target memory")
+            mm[offset:offset + len(raw)] = raw
+            offset += len(raw)
+    finally:
+        if mm is not None:
+            mm.close()
+        f.close()
+
+def write_pfm(process, view, path, byte_order):
+    """Write a .pfm file (1 or 3 float channels, rows stored bottom to top)."""
+    if view.channels not in (1, 3):
+        raise ExportError("PFM needs 1 or 3 channels")
+    header = b"%s\n%d %d\n-1.0\n" % (b"PF" if view.channels == 3 else b"Pf", view.cols, view.rows)
+    row_out = view.cols * view.channels * 4
+    f, mm = _mapped_output(path, header, view.rows * row_out)
+    try:
+        for first, raw in view.row_chunks(process):
+            if raw is None:
+                raise ExportError("failed to read target memory")
+            out = convert_chunk(raw, view, "f", False, view.bgr, byte_order)
+            # Rows are flipped, so place each row of the chunk individually
+            for i in range(len(out) // row_out):
+                offset = len(header) + (view.rows - 1 - first - i) * row_out
+                mm[offset:offset + row_out] = out[i * row_out:(i + 1) * row_out]
+    finally:
+        if mm is not None:
+            mm.close()
+        f.close()
+
+PNG_COLOR_TYPES = {1: 0, 2: 4, 3: 2, 4: 6} # gray, gray+alpha, RGB, RGBA
+
+def _png_chunk(f, tag, data):
+    f.write(struct.pack(">I", len(data)) + tag + data)
+    f.write(struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff))
+
+def write_png(process, view, path, byte_order):
+    """Write an 8 or 16 bit .png, compressing rows as they are read."""
+    if view.fmt not in ("B", "H"):
+        raise ExportError("PNG needs an unsigned 8 or 16 bit buffer")
+    if view.channels not in PNG_COLOR_TYPES:
+        raise ExportError("PNG needs 1 to 4 channels")
+    bits = 8 * view.elem_size
+    compressor = zlib.compressobj()
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        _png_chunk(f, b"IHDR", struct.pack(">IIBBBBB", view.cols, view.rows, bits,
+                                           PNG_COLOR_TYPES[view.channels], 0, 0, 0))
+        for first, raw in view.row_chunks(process):
+            if raw is None:
+                raise ExportError("failed to read target memory")
+            out = convert_chunk(raw, view, view.fmt, True, view.bgr, byte_order)
+            # Each scanline is prefixed with filter type 0 (None)
+            rows = [out[i:i + view.row_bytes] for i in range(0, len(out), view.row_bytes)]
+            data = compressor.compress(b"\x00" + b"\x00".join(rows))
+            if data:
+                _png_chunk(f, b"IDAT", data)
+        _png_chunk(f, b"IDAT", compressor.flush())
+        _png_chunk(f, b"IEND", b"")
+
+WRITERS = {".npy": write_npy, ".pfm": write_pfm, ".png": write_png}
+
+# ------------------------------------------------------------------------------
+# Tile snapshots
+# ------------------------------------------------------------------------------
+def _digest(raw):
+    if xxhash is not None:
+        return xxhash.xxh3_64_digest(raw)
+    return hashlib.blake2b(raw, digest_size=16).digest()
+
+def iter_tiles(chunks, tile_bytes):
+    """Re-cut a stream of byte chunks into tiles of `tile_bytes` (the last one may
+    be shorter). A None chunk (failed read) is passed through and ends the stream."""
+    carry = b""
+    for raw in chunks:
+        if raw is None:
+            yield None
+            return
+        if carry:
+            raw = carry + raw
+        whole = len(raw) // tile_bytes * tile_bytes
+        for offset in range(0, whole, tile_bytes):
+            yield raw[offset:offset + tile_bytes]
+        carry = raw[whole:]
+    if carry:
+        yield carry
+
+class TileSnapshot:
+    """Digest and value range of every tile of a buffer, in storage order.
+
+    Only these are kept, not the data, so a later stop can be compared against
+    a 100 MB buffer without a second copy of it.
+    """
+    def __init__(self, view, tile_bytes):
+        self.view = view
+        self.tile_bytes = tile_bytes
+        self.digests = []
+        self.ranges = []    # (min, max, mean) of the finite values (see tile_range), or None
+
+    def same_layout(self, other):
+        a, b = self.view, other.view
+        return (a.address, a.rows, a.cols, a.channels, a.fmt, a.col_major, self.tile_bytes) == \
+               (b.address, b.rows, b.cols, b.channels, b.fmt, b.col_major, other.tile_bytes)
+
+    def span(self, tile):
+        """(label, first, last) rows, or columns of column-major buffers, touched by `tile`."""
+        view = self.view
+        line = view.rows * view.elem_size if view.col_major else view.row_bytes
+        start = tile * self.tile_bytes
+        end = min(start + self.tile_bytes, view.nbytes)
+        return ("cols" if view.col_major else "rows"), start // line, (end - 1) // line
+
+    def changed(self, other):
+        """Indices of the tiles whose digests differ."""
+        return [tile for tile, (a, b) in enumerate(zip(self.digests, other.digests)) if a != b]
+
+def tile_range(raw, fmt, byte_order):
+    """(min, max, mean) of the finite values of a tile, or None if it has none."""
+    values = formatter_utils.decode_array(raw, fmt, byte_order)
+    numpy = formatter_utils.numpy
+    if numpy is not None:
+        if values.dtype.kind == "f":
+            values = values[numpy.isfinite(values)]
+        if not values.size:
+            return None
+        return values.min().item(), values.max().item(), float(values.mean(dtype=numpy.float64))
+    if not len(values):
+        return None
+    total = sum(values)
+    if fmt in "efd" and not math.isfinite(total):
+        # A finite sum means no NaN or Inf, so only filter when it is not
+        values = [v for v in values if math.isfinite(v)]
+        if not values:
+            return None
+        total = math.fsum(values)
+    return min(values), max(values), total / len(values)
+
+def snapshot(process, view, tile_bytes, byte_order, previous=None):
+    """Hash `view` tile by tile, streaming it in CHUNK_BYTES reads. Tiles whose
+    digest matches the same tile of a `previous` snapshot of the same layout
+    keep its value range instead of decoding it again."""
+    tile_bytes = max(view.elem_size, tile_bytes // view.elem_size * view.elem_size)
+    snap = TileSnapshot(view, tile_bytes)
+    if previous is not None and not previous.same_layout(snap):
+        previous = None
+    for tile, raw in enumerate(iter_tiles(view.storage_chunks(process), tile_bytes)):
+        if raw is None:
+            raise ExportError("failed to read target memory")
+        digest = _digest(raw)
+        snap.digests.append(digest)
+        if previous is not None and tile < len(previous.digests) and previous.digests[tile] == digest:
+            snap.ranges.append(previous.ranges[tile])
+        else:
+            snap.ranges.append(tile_range(raw, view.fmt, byte_order))
+    return snap
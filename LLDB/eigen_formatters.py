@@ -1,26 +1,18 @@
 import lldb
+import bisect
 import re
+import struct
+from itertools import accumulate
+from array import array
 
-def __lldb_init_module(debugger, internal_dict):
-    # Register formatters for Eigen::Matrix and Eigen::Array
-    # Regex covers: Eigen::Matrix<...>, Eigen::Array<...>, Eigen::Vector3d, etc.
-    # Note: Typedefs like Vector3d usually resolve to Eigen::Matrix<double, 3, 1, ...> in LLDB.
-    debugger.HandleCommand('type synthetic add -x "^Eigen::Matrix<.+>$" --python-class eigen_formatters.EigenMatrixSyntheticProvider')
-    debugger.HandleCommand('type summary add -x "^Eigen::Matrix<.+>$" --python-function eigen_formatters.EigenMatrixSummaryProvider')
-    
-    debugger.HandleCommand('type synthetic add -x "^Eigen::Array<.+>$" --python-class eigen_formatters.EigenMatrixSyntheticProvider')
-    debugger.HandleCommand('type summary add -x "^Eigen::Array<.+>$" --python-function eigen_formatters.EigenMatrixSummaryProvider')
-
-    # Eigen::Map
-    debugger.HandleCommand('type synthetic add -x "^Eigen::Map<.+>$" --python-class eigen_formatters.EigenMatrixSyntheticProvider')
-    debugger.HandleCommand('type summary add -x "^Eigen::Map<.+>$" --python-function eigen_formatters.EigenMatrixSummaryProvider')
-
-    # Eigen::Quaternion
-    debugger.HandleCommand('type summary add -x "^Eigen::Quaternion<.+>$" --python-function eigen_formatters.EigenQuaternionSummaryProvider')
-    debugger.HandleCommand('type synthetic add -x "^Eigen::Quaternion<.+>$" --python-class eigen_formatters.EigenQuaternionSyntheticProvider')
+import formatter_async
+import formatter_profiling
+import formatter_utils
+import lldb_formatters
 
-    # Eigen::SparseMatrix
-    debugger.HandleCommand('type summary add -x "^Eigen::SparseMatrix<.+>$" --python-function eigen_formatters.EigenSparseMatrixSummaryProvider')
+def __lldb_init_module(debugger, internal_dict):
+    # Formatters are listed in lldb_formatters.FORMATTERS
+    lldb_formatters.register(debugger, __name__)
 
 # ------------------------------------------------------------------------------
 # Helpers
@@ -48,106 +40,366 @@ def get_child_value_int(valobj, *names):
     return None
 
 # ------------------------------------------------------------------------------
-# Eigen::Matrix / Array / Map
+# Eigen::Matrix / Array / Map / Ref / Block
 # ------------------------------------------------------------------------------
+TEMPLATE_PREFIX_RE = re.compile(r"^Eigen::(Matrix|Array|Map|Ref|Block)<")
+INT_ARG_RE = re.compile(r"^-?\d+$")
+# Eigen::Stride<Outer, Inner>, Eigen::OuterStride<Outer>, Eigen::InnerStride<Inner>
+STRIDE_RE = re.compile(r"^Eigen::(Stride|OuterStride|InnerStride)<(.*)>$")
+
+def template_args(type_name):
+    """Top level template arguments of `type_name`, e.g.
+    'Eigen::Map<Eigen::Matrix<double, 3, 1>, 0, Eigen::Stride<0, 0> >' ->
+    ['Eigen::Matrix<double, 3, 1>', '0', 'Eigen::Stride<0, 0>']."""
+    start = type_name.find("<")
+    end = type_name.rfind(">")
+    if start < 0 or end < start:
+        return []
+    args = []
+    depth = 0
+    first = start + 1
+    for i in range(start + 1, end):
+        ch = type_name[i]
+        if ch in "<(":
+            depth += 1
+        elif ch in ">)":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            args.append(type_name[first:i].strip())
+            first = i + 1
+    args.append(type_name[first:end].strip())
+    return args
+
+def parse_stride(arg):
+    """(outer, inner) compile-time strides of a StrideType argument: 0 means
+    the natural stride, -1 (Dynamic) a runtime value held in m_stride."""
+    match = STRIDE_RE.match(arg or "")
+    if match is None:
+        return 0, 0
+    values = [-1 if "Dynamic" in v or "-1" in v else int(v) for v in template_args(arg)]
+    kind = match.group(1)
+    if kind == "Stride" and len(values) == 2:
+        return values[0], values[1]
+    if kind == "OuterStride" and values:
+        return values[0], 0
+    if kind == "InnerStride" and values:
+        return 0, values[0]
+    return 0, 0
+
+def find_member_path(valobj, *names):
+    """Like get_child_val, but returns the member path that matched (or None)."""
+    for name in names:
+        child = valobj.GetValueForExpressionPath(f".{name}")
+        if child.IsValid():
+            # Unwrap Eigen::internal::variable_if_dynamic
+            if child.GetChildMemberWithName("m_value").IsValid():
+                return f"{name}.m_value"
+            return name
+    return None
+
+class EigenMatrixLayout:
+    """Facts about one Eigen dense type that do not depend on the value.
+    Built once per type and target, then shared through formatter_utils.layout_cache."""
+    def __init__(self):
+        self.rows = -1              # template rows (-1 if Dynamic)
+        self.cols = -1              # template cols (-1 if Dynamic)
+        self.options = 0
+        self.rows_path = None       # member path of the runtime row count
+        self.cols_path = None       # member path of the runtime column count
+        self.data_path = None       # member path of the coefficient storage
+        self.data_inline = False    # coefficients live in an array inside the object
+        self.data_offset = None     # offset of the inline array from the object address
+        self.scalar_type = None
+        self.element_size = 0
+        self.kind = "Matrix"        # Matrix, Array, Map, Ref or Block
+        self.stride_outer = 0       # compile-time strides of Map/Ref (see parse_stride)
+        self.stride_inner = 0
+        self.outer_path = None      # member paths of runtime strides
+        self.inner_path = None
+        self.xpr_path = None        # Block: the expression the block is taken from
+
+def build_matrix_layout(valobj, type_name):
+    layout = EigenMatrixLayout()
+
+    # --- 1. Template arguments: Scalar, Rows, Cols, Options ---
+    match = TEMPLATE_PREFIX_RE.match(type_name)
+    if match is not None:
+        layout.kind = match.group(1)
+    args = template_args(type_name)
+    if layout.kind in ("Map", "Ref") and args:
+        # Map/Ref<PlainObjectType, MapOptions, StrideType>: shape of the plain type
+        if len(args) > 2:
+            layout.stride_outer, layout.stride_inner = parse_stride(args[2])
+        elif layout.kind == "Ref":
+            layout.stride_outer = -1 # default OuterStride<>
+        args = template_args(args[0].replace("const ", "", 1))
+    elif layout.kind == "Block" and len(args) >= 3:
+        # Block<XprType, BlockRows, BlockCols, InnerPanel>: strides and storage
+        # order come from the expression, which is decoded at runtime
+        layout.xpr_path = find_member_path(valobj, "m_xpr")
+        args = [args[0], args[1], args[2]]
+    if len(args) >= 2:
+        idx_start = 1
+        for i, arg in enumerate(args):
+            if INT_ARG_RE.match(arg) or "Dynamic" in arg:
+                idx_start = i
+                break
+        try:
+            layout.rows = -1 if "Dynamic" in args[idx_start] else int(args[idx_start])
+            layout.cols = -1 if "Dynamic" in args[idx_start+1] else int(args[idx_start+1])
+            if len(args) > idx_start + 2:
+                layout.options = int(args[idx_start+2])
+        except:
+            pass
+
+    if layout.rows == -1:
+        layout.rows_path = find_member_path(valobj, "m_rows", "m_storage.m_rows")
+    if layout.cols == -1:
+        layout.cols_path = find_member_path(valobj, "m_cols", "m_storage.m_cols")
+    if layout.stride_outer == -1:
+        layout.outer_path = find_member_path(valobj, "m_stride.m_outer")
+    if layout.stride_inner == -1:
+        layout.inner_path = find_member_path(valobj, "m_stride.m_inner")
+
+    # --- 2. Coefficient storage ---
+    # Dynamic storage holds a pointer (m_data); fixed size storage holds a struct
+    # named 'm_data' containing a member 'array' (e.g. double[9]).
+    layout.data_path = find_member_path(valobj, "m_data", "m_storage.m_data")
+    if layout.data_path is not None:
+        data = valobj.GetValueForExpressionPath(f".{layout.data_path}")
+        array_member = data.GetChildMemberWithName("array")
+        if array_member.IsValid():
+            layout.data_path += ".array"
+            data = array_member
+        if data.GetType().IsArrayType():
+            layout.data_inline = True
+            layout.scalar_type = data.GetType().GetArrayElementType()
+            base = valobj.GetLoadAddress()
+            if base != lldb.LLDB_INVALID_ADDRESS and data.GetLoadAddress() != lldb.LLDB_INVALID_ADDRESS:
+                layout.data_offset = data.GetLoadAddress() - base
+        else:
+            layout.scalar_type = data.GetType().GetPointeeType()
+    elif layout.rows != -1 and layout.cols != -1:
+        # Fixed size Eigen matrices usually start memory at offset 0 of the object
+        layout.data_inline = True
+        layout.data_offset = 0
+        target = valobj.GetTarget()
+        # Try to find the scalar type from the first template argument,
+        # falling back to common types for aliases like 'Vector3d' -> 'double'
+        type_obj = formatter_utils.find_type(target, args[0])
+        if not type_obj.IsValid():
+            if "double" in type_name: type_obj = formatter_utils.find_type(target, "double")
+            elif "float" in type_name: type_obj = formatter_utils.find_type(target, "float")
+        if type_obj.IsValid():
+            layout.scalar_type = type_obj
+
+    if layout.scalar_type is not None and layout.scalar_type.IsValid():
+        layout.element_size = layout.scalar_type.GetByteSize()
+    else:
+        layout.scalar_type = None
+    return layout
+
+class EigenMatrixState:
+    """Decoded header (shape, data address) of one Eigen dense value at one stop.
+    Shared by the summary and synthetic providers through formatter_utils.value_cache."""
+    def __init__(self):
+        self.rows = 0
+        self.cols = 0
+        self.size = 0
+        self.is_row_major = False
+        self.scalar_type = None
+        self.element_size = 0
+        self.data_addr = 0
+        self.inline_data = None # coefficients of values that have no address
+        self.reader = None
+        self.kind = "Matrix"
+        self.row_stride = 0     # elements between (r, c) and (r + 1, c)
+        self.col_stride = 0     # elements between (r, c) and (r, c + 1)
+        self.lines = None       # RowPager over the outer vectors of strided views
+
+    @property
+    def has_data(self):
+        return bool(self.data_addr) or self.inline_data is not None
+
+    @property
+    def contiguous(self):
+        """Coefficients are packed in storage order (the natural strides)."""
+        if self.rows <= 1 or self.cols <= 1:
+            return (self.col_stride if self.rows <= 1 else self.row_stride) == 1 or self.size <= 1
+        if self.is_row_major:
+            return self.col_stride == 1 and self.row_stride == self.cols
+        return self.row_stride == 1 and self.col_stride == self.rows
+
+    @property
+    def span_bytes(self):
+        """Bytes from the first to the last coefficient, gaps included."""
+        if not self.size:
+            return 0
+        return ((self.rows - 1) * self.row_stride + (self.cols - 1) * self.col_stride + 1) * self.element_size
+
+    def position(self, index):
+        """(row, col) of the child `index`, children being in storage order."""
+        if self.is_row_major:
+            return index // self.cols, index % self.cols
+        return index % self.rows, index // self.rows
+
+    def coefficient_address(self, r, c):
+        return self.data_addr + (r * self.row_stride + c * self.col_stride) * self.element_size
+
+    def packed_lines(self):
+        """(count, line_bytes, step) of the outer vectors when each of them is
+        packed (inner stride 1), None otherwise."""
+        es = self.element_size
+        if self.is_row_major and (self.col_stride == 1 or self.cols <= 1):
+            return self.rows, self.cols * es, max(self.row_stride * es, self.cols * es)
+        if not self.is_row_major and (self.row_stride == 1 or self.rows <= 1):
+            return self.cols, self.rows * es, max(self.col_stride * es, self.rows * es)
+        return None
+
+    def element_bytes(self, process, index):
+        """Raw bytes of coefficient `index`, served from windowed bulk reads."""
+        if index < 0 or index >= self.size:
+            return None
+        if self.inline_data is not None:
+            return self.inline_data[index * self.element_size:(index + 1) * self.element_size]
+        if not self.data_addr or not self.element_size:
+            return None
+        if not self.contiguous:
+            return self.strided_bytes(process, *self.position(index))
+        if self.reader is None:
+            self.reader = formatter_utils.BulkReader(process, self.data_addr, self.element_size, self.size)
+        return self.reader.element_bytes(index)
+
+    def strided_bytes(self, process, r, c):
+        """Coefficient (r, c) of a strided view. The dimension with the larger
+        stride is walked as lines (outer vectors), each page of lines fetched
+        with one coalesced read; elements are then sliced out of their line."""
+        es = self.element_size
+        if self.col_stride >= self.row_stride:
+            line, item, count, line_stride, item_stride, lines = c, r, self.rows, self.col_stride, self.row_stride, self.cols
+        else:
+            line, item, count, line_stride, item_stride, lines = r, c, self.cols, self.row_stride, self.col_stride, self.rows
+        line_bytes = ((count - 1) * item_stride + 1) * es
+        if lines > 1 and line_bytes > line_stride * es:
+            # Lines overlap (aliasing strides): read the coefficient alone
+            return formatter_utils.read_memory(process, self.coefficient_address(r, c), es)
+        if self.lines is None:
+            self.lines = formatter_utils.RowPager(process, self.data_addr, lines, line_bytes, line_stride * es)
+        raw = self.lines.row(line)
+        if raw is None:
+            return None
+        offset = item * item_stride * es
+        return raw[offset:offset + es]
+
+    def fingerprint(self, process, span=None):
+        """Fingerprint of the header and of the coefficients in `span` (a
+        ShownSpan of byte offsets from data_addr), or of all of them."""
+        scalar = self.scalar_type.GetName() if self.scalar_type else None
+        header = (self.rows, self.cols, self.is_row_major, self.data_addr, scalar, self.row_stride, self.col_stride)
+        if self.inline_data is not None:
+            return formatter_utils.fingerprint(process, header, [self.inline_data])
+        region = span.region(self.data_addr) if span is not None else (self.data_addr, self.span_bytes)
+        return formatter_utils.fingerprint(process, header, [region])
+
+def read_dim(valobj, path):
+    if path is None:
+        return 0
+    return valobj.GetValueForExpressionPath(f".{path}").GetValueAsUnsigned(0)
+
+def resolve_data(valobj, layout):
+    """Address of the first coefficient, using the cached member path/offset."""
+    if layout.data_inline:
+        base = valobj.GetLoadAddress()
+        if layout.data_offset is not None and base != lldb.LLDB_INVALID_ADDRESS:
+            return base + layout.data_offset
+        if layout.data_path is None:
+            return 0
+        addr = valobj.GetValueForExpressionPath(f".{layout.data_path}").GetLoadAddress()
+        return 0 if addr == lldb.LLDB_INVALID_ADDRESS else addr
+    return valobj.GetValueForExpressionPath(f".{layout.data_path}").GetValueAsUnsigned(0)
+
+def decode_matrix(valobj):
+    state = EigenMatrixState()
+    try:
+        layout = formatter_utils.get_layout(valobj, "eigen.matrix", build_matrix_layout)
+
+        # Read runtime dimensions if dynamic
+        state.rows = layout.rows
+        state.cols = layout.cols
+        if state.rows == -1:
+            state.rows = read_dim(valobj, layout.rows_path)
+        if state.cols == -1:
+            state.cols = read_dim(valobj, layout.cols_path)
+
+        state.size = state.rows * state.cols
+        state.is_row_major = (layout.options & 1) == 1
+        state.scalar_type = layout.scalar_type
+        state.element_size = layout.element_size
+        state.kind = layout.kind
+        if layout.xpr_path is not None:
+            # Block: same strides and storage order as the expression it views
+            xpr = valobj.GetValueForExpressionPath(f".{layout.xpr_path}")
+            if xpr.GetType().IsReferenceType() or xpr.GetType().IsPointerType():
+                xpr = xpr.Dereference()
+            parent = get_matrix_state(xpr)
+            if parent.scalar_type is None:
+                state.scalar_type = None
+                return state
+            state.is_row_major = parent.is_row_major
+            state.row_stride, state.col_stride = parent.row_stride, parent.col_stride
+        else:
+            inner = layout.stride_inner
+            outer = layout.stride_outer
+            if inner == -1:
+                inner = read_dim(valobj, layout.inner_path)
+            if outer == -1:
+                outer = read_dim(valobj, layout.outer_path)
+            inner = inner or 1
+            # A zero outer stride means packed outer vectors
+            outer = outer or (state.cols if state.is_row_major else state.rows) * inner
+            state.row_stride, state.col_stride = (outer, inner) if state.is_row_major else (inner, outer)
+        if state.scalar_type is not None:
+            state.data_addr = resolve_data(valobj, layout)
+            if not state.data_addr and layout.data_inline:
+                # Values synthesized from data (e.g. cList elements) have no
+                # address, but fixed size coefficients are part of their data
+                storage = valobj
+                if layout.data_path is not None:
+                    storage = valobj.GetValueForExpressionPath(f".{layout.data_path}")
+                state.inline_data = formatter_utils.read_value_bytes(storage, state.size * state.element_size)
+    except Exception as e:
+        pass
+    return state
+
+def get_matrix_state(valobj):
+    """Decoded state of an Eigen dense value, computed once per value and stop."""
+    return formatter_utils.get_value_state(valobj.GetNonSyntheticValue(), "eigen.matrix", decode_matrix)
+
 class EigenMatrixSyntheticProvider:
     def __init__(self, valobj, internal_dict):
         self.valobj = valobj
+        self.state = EigenMatrixState()
         self.rows = 0
         self.cols = 0
         self.size = 0
-        self.data_ptr = None
         self.scalar_type = None
         self.element_size = 0
         self.is_row_major = False
+        self.data_addr = 0
+        self.span = formatter_utils.ShownSpan()
+        self.fingerprint = None
 
     def update(self):
-        try:
-            # --- 1. Dimensions Parsing (Keep existing logic) ---
-            type_name = self.valobj.GetType().GetCanonicalType().GetName()
-            short_name = re.sub(r"^Eigen::(Matrix|Array|Map)<", "", type_name)
-            args = [x.strip() for x in short_name.rsplit('>', 1)[0].split(',')]
-
-            R_template = -1
-            C_template = -1
-            Options = 0 # Default ColMajor
-
-            # Attempt to parse template args
-            if len(args) >= 2:
-                idx_start = 1
-                for i, arg in enumerate(args):
-                    if re.match(r"^-?\d+$", arg) or "Dynamic" in arg:
-                        idx_start = i
-                        break
-                try:
-                    R_template = -1 if "Dynamic" in args[idx_start] else int(args[idx_start])
-                    C_template = -1 if "Dynamic" in args[idx_start+1] else int(args[idx_start+1])
-                    if len(args) > idx_start + 2:
-                        Options = int(args[idx_start+2])
-                except:
-                    pass
-
-            self.rows = R_template
-            self.cols = C_template
-            
-            # Read runtime dimensions if dynamic
-            if self.rows == -1:
-                self.rows = get_child_value_int(self.valobj, "m_rows", "m_storage.m_rows") or 0
-            if self.cols == -1:
-                self.cols = get_child_value_int(self.valobj, "m_cols", "m_storage.m_cols") or 0
-            
-            self.size = self.rows * self.cols
-            self.is_row_major = (Options & 1) == 1
-
-            # --- 2. Data Pointer Detection (THE FIX) ---
-            
-            # Strategy A: Try standard path (m_data)
-            self.data_ptr = get_child_val(self.valobj, "m_data", "m_storage.m_data")
-
-            # Strategy B: Fixed size matrices often store data in a struct named 'm_data' 
-            # which contains a member 'array'. We need the address of that array.
-            if self.data_ptr.IsValid():
-                # Check if this is the "compressed" storage struct
-                array_member = self.data_ptr.GetChildMemberWithName("array")
-                if array_member.IsValid():
-                    self.data_ptr = array_member
-
-                # If we have an array (e.g. double[9]), we need to decay it to a pointer
-                # so CreateChildAtOffset works correctly.
-                if self.data_ptr.GetType().IsArrayType():
-                    self.data_ptr = self.data_ptr.GetChildAtIndex(0)
-                    # GetChildAtIndex(0) returns the first element. 
-                    # We want the address of the first element to act as our base pointer.
-                    self.data_ptr = self.data_ptr.AddressOf()
-
-            # Strategy C: If logic above failed, fallback to the address of the matrix object itself.
-            # (Fixed size Eigen matrices usually start memory at offset 0 of the object)
-            if (not self.data_ptr.IsValid() or self.data_ptr.GetValueAsUnsigned() == 0) and self.size > 0:
-                if R_template != -1 and C_template != -1:
-                    # It is fixed size, assume data starts at 'this'
-                    self.data_ptr = self.valobj.AddressOf()
-                    # Cast 'this' to scalar pointer
-                    scalar_type_name = args[0] # Roughly the first template arg
-                    target = self.valobj.GetTarget()
-                    
-                    # Try to find the type from the string name
-                    # If that fails, guess based on common types
-                    type_obj = target.FindFirstType(scalar_type_name)
-                    if not type_obj.IsValid():
-                        # Fallback for aliases like 'Vector3d' -> 'double'
-                        if "double" in type_name: type_obj = target.FindFirstType("double")
-                        elif "float" in type_name: type_obj = target.FindFirstType("float")
-                    
-                    if type_obj.IsValid():
-                        self.data_ptr = self.data_ptr.Cast(type_obj.GetPointerType())
-
-            # --- 3. Final Type Setup ---
-            if self.data_ptr.IsValid():
-                self.scalar_type = self.data_ptr.GetType().GetPointeeType()
-                self.element_size = self.scalar_type.GetByteSize()
-
-        except Exception as e:
-            pass
+        self.state = get_matrix_state(self.valobj)
+        self.rows = self.state.rows
+        self.cols = self.state.cols
+        self.size = self.state.size
+        self.scalar_type = self.state.scalar_type
+        self.element_size = self.state.element_size
+        self.is_row_major = self.state.is_row_major
+        self.data_addr = self.state.data_addr
+        return formatter_utils.unchanged(
+            self, self.state.fingerprint(self.valobj.GetProcess(), self.span), [self.span])
 
     def num_children(self):
         return self.size
@@ -177,8 +429,6 @@ class EigenMatrixSyntheticProvider:
         else:
             c = index // self.rows
             r = index % self.rows
-            
-        offset = index * self.element_size
         
         # Name: [i] if vector, [r, c] if matrix
         if self.rows == 1 or self.cols == 1:
@@ -186,39 +436,94 @@ class EigenMatrixSyntheticProvider:
         else:
             name = f"[{r}, {c}]"
 
-        return self.data_ptr.CreateChildAtOffset(name, offset, self.scalar_type)
+        # Bulk mode: decode the child from a window of the coefficient buffer
+        # fetched with a single ReadMemory, instead of one round trip per child.
+        if formatter_utils.BULK_READ or self.state.inline_data is not None:
+            raw = self.state.element_bytes(self.valobj.GetProcess(), index)
+            if raw is not None:
+                child = formatter_utils.create_value_from_bytes(self.valobj, name, raw, self.scalar_type)
+                if child is not None and child.IsValid():
+                    if self.state.inline_data is None:
+                        self.span.add(self.state.coefficient_address(r, c) - self.data_addr, self.element_size)
+                    return child
 
+        if not self.data_addr:
+            return None
+        return self.valobj.CreateValueFromAddress(name, self.state.coefficient_address(r, c), self.scalar_type)
+
+def get_matrix_stats(valobj, state):
+    """Coefficient statistics text, computed once per stop in the background
+    (see formatter_utils.STATS_SUMMARY), a placeholder while it runs, or None."""
+    fmt = formatter_utils.scalar_format(state.scalar_type)
+    lines = state.packed_lines()
+    if fmt is None or lines is None:
+        return None
+    process = valobj.GetProcess()
+    byte_order = valobj.GetTarget().GetByteOrder()
+    count, line_bytes, step = lines
+    def compute(job):
+        return formatter_utils.buffer_stats(
+            process, state.data_addr, count, line_bytes, step, fmt, 1, byte_order,
+            formatter_utils.ASYNC_TIME_LIMIT if formatter_utils.ASYNC_SUMMARY else None, job.cancelled)
+    header = (state.rows, state.cols, state.data_addr, state.scalar_type.GetName(), step)
+    stats = formatter_async.result(valobj, "eigen.matrix.stats", header, compute)
+    if stats is formatter_async.PENDING:
+        return formatter_async.PLACEHOLDER
+    return stats.summary() if stats is not None else None
+
+@formatter_profiling.summary
 def EigenMatrixSummaryProvider(valobj, internal_dict):
-    # Reuse synthetic provider logic to get dimensions
-    synth = EigenMatrixSyntheticProvider(valobj, internal_dict)
-    synth.update()
+    # Share the decoded state with the synthetic provider
+    state = get_matrix_state(valobj)
     
     # Identify specific types
     t_name = valobj.GetType().GetName()
     
-    layout = "RowMajor" if synth.is_row_major else "ColMajor"
-    shape = f"{synth.rows} x {synth.cols}"
+    layout = "RowMajor" if state.is_row_major else "ColMajor"
+    shape = f"{state.rows} x {state.cols}"
     
-    if "Array" in t_name:
-        return f"Array [{shape}] {layout}"
-    if "Map" in t_name:
-        return f"Map [{shape}] {layout}"
-        
-    return f"Matrix [{shape}] {layout}"
+    if state.kind in ("Block", "Ref"):
+        summary = f"{state.kind} [{shape}] {layout}"
+    elif "Array" in t_name:
+        summary = f"Array [{shape}] {layout}"
+    elif "Map" in t_name:
+        summary = f"Map [{shape}] {layout}"
+    else:
+        summary = f"Matrix [{shape}] {layout}"
+    if state.has_data and not state.contiguous:
+        summary += f" stride=({state.row_stride}, {state.col_stride})"
+
+    if formatter_utils.STATS_SUMMARY and state.data_addr and state.size:
+        stats = get_matrix_stats(valobj, state)
+        if stats is not None:
+            summary += " " + stats
+    return summary
 
 # ------------------------------------------------------------------------------
 # Eigen::Quaternion
 # ------------------------------------------------------------------------------
+QUATERNION_NAMES = ["x", "y", "z", "w"]
+
+def get_quaternion_state(valobj):
+    # m_coeffs is an Eigen::Matrix<T, 4, 1>, decoded (and cached) like any matrix
+    coeffs = valobj.GetNonSyntheticValue().GetChildMemberWithName("m_coeffs")
+    if not coeffs.IsValid():
+        return None
+    return get_matrix_state(coeffs)
+
 class EigenQuaternionSyntheticProvider:
     def __init__(self, valobj, internal_dict):
         self.valobj = valobj
-        self.coeffs = None
+        self.state = None
+        self.fingerprint = None
 
     def update(self):
-        self.coeffs = self.valobj.GetChildMemberWithName("m_coeffs")
+        self.state = get_quaternion_state(self.valobj)
+        current = self.state.fingerprint(self.valobj.GetProcess()) if self.state is not None else None
+        return formatter_utils.unchanged(self, current)
 
     def num_children(self):
-        return 4 if self.coeffs.IsValid() else 0
+        return 4 if self.state is not None and self.state.has_data else 0
 
     def get_child_index(self, name):
         if name == "x": return 0
@@ -228,41 +533,31 @@ class EigenQuaternionSyntheticProvider:
         return -1
 
     def get_child_at_index(self, index):
-        if not self.coeffs.IsValid(): return None
-        
-        # m_coeffs is usually an Eigen::Matrix<T, 4, 1>
-        # We need to access its data. Using the SyntheticProvider for Matrix recursively 
-        # is hard, so we just dig for data manually.
-        
-        # Try to find data ptr of coeffs
-        data_ptr = get_child_val(self.coeffs, "m_data", "m_storage.m_data")
-        
-        # Unwrap array if needed (fixed size)
-        if data_ptr.IsValid():
-             array_member = data_ptr.GetChildMemberWithName("array")
-             if array_member.IsValid():
-                 data_ptr = array_member
-             if data_ptr.GetType().IsArrayType():
-                 data_ptr = data_ptr.GetChildAtIndex(0).GetAddress()
-        
-        if not data_ptr.IsValid(): return None
+        if index < 0 or index >= self.num_children(): return None
 
-        type_obj = data_ptr.GetType().GetPointeeType()
-        size = type_obj.GetByteSize()
-        offset = index * size
-        
-        names = ["x", "y", "z", "w"]
-        return data_ptr.CreateChildAtOffset(names[index], offset, type_obj)
+        name = QUATERNION_NAMES[index]
+        if formatter_utils.BULK_READ or self.state.inline_data is not None:
+            raw = self.state.element_bytes(self.valobj.GetProcess(), index)
+            if raw is not None:
+                child = formatter_utils.create_value_from_bytes(self.valobj, name, raw, self.state.scalar_type)
+                if child is not None and child.IsValid():
+                    return child
 
+        if not self.state.data_addr:
+            return None
+        offset = index * self.state.element_size
+        return self.valobj.CreateValueFromAddress(name, self.state.data_addr + offset, self.state.scalar_type)
+
+@formatter_profiling.summary
 def EigenQuaternionSummaryProvider(valobj, internal_dict):
-    synth = EigenQuaternionSyntheticProvider(valobj, internal_dict)
-    synth.update()
+    state = get_quaternion_state(valobj)
     
     try:
-        x = synth.get_child_at_index(0).GetValue()
-        y = synth.get_child_at_index(1).GetValue()
-        z = synth.get_child_at_index(2).GetValue()
-        w = synth.get_child_at_index(3).GetValue()
+        # One read for all four coefficients, decoded on the host
+        fmt = formatter_utils.scalar_format(state.scalar_type)
+        raw = b"".join(state.element_bytes(valobj.GetProcess(), i) for i in range(4))
+        values = formatter_utils.decode_scalars(raw, fmt, valobj.GetTarget().GetByteOrder())
+        x, y, z, w = (formatter_utils.format_scalar(v, fmt) for v in values)
         return f"(x={x}, y={y}, z={z}, w={w})"
     except:
         return "Quaternion"
@@ -270,15 +565,190 @@ def EigenQuaternionSummaryProvider(valobj, internal_dict):
 # ------------------------------------------------------------------------------
 # Eigen::SparseMatrix
 # ------------------------------------------------------------------------------
+class EigenSparseState:
+    """Decoded header of an Eigen::SparseMatrix at one stop.
+
+    Nonzeros are enumerated in storage order: nonzero `k` belongs to the outer
+    vector `j` with starts[j] <= k < starts[j + 1]. For compressed storage
+    `starts` is m_outerIndex itself; for uncompressed storage it is the prefix
+    sum of m_innerNonZeros, and the values of `j` begin at m_outerIndex[j].
+    """
+    def __init__(self):
+        self.rows = 0
+        self.cols = 0
+        self.outer_size = 0
+        self.is_row_major = False
+        self.compressed = True
+        self.nnz = 0
+        self.scalar_type = None
+        self.outer_index = None # TargetArray, outer_size + 1 entries
+        self.inner_index = None # TargetArray over m_data.m_indices
+        self.starts = None      # enumeration prefix, outer_size + 1 entries
+        self.values = None      # BulkReader over m_data.m_values
+
+    def position(self, k):
+        """(outer, storage position) of the k-th nonzero."""
+        j = bisect.bisect_right(self.starts, k) - 1
+        if self.compressed:
+            return j, k
+        return j, self.outer_index[j] + (k - self.starts[j])
+
+    def find(self, outer, inner):
+        """Enumeration index of the nonzero at (outer, inner), or -1.
+        Binary searches the sorted inner indices of a single outer vector."""
+        if outer < 0 or outer >= self.outer_size:
+            return -1
+        begin = self.outer_index[outer]
+        end = begin + (self.starts[outer + 1] - self.starts[outer])
+        p = bisect.bisect_left(self.inner_index, inner, begin, end)
+        if p == end or self.inner_index[p] != inner:
+            return -1
+        return p if self.compressed else self.starts[outer] + (p - begin)
+
+    def fingerprint(self, process, outer, inner, values):
+        """Fingerprint of the header and of the bytes in the ShownSpans `outer`,
+        `inner` and `values` of m_outerIndex, m_indices and m_values."""
+        header = (self.rows, self.cols, self.is_row_major, self.compressed, self.nnz,
+                  formatter_utils.MAX_CHILDREN)
+        regions = []
+        if not self.compressed:
+            regions.append(self.starts.tobytes()) # counts read at this stop
+        for reader, span in ((getattr(self.outer_index, "reader", None), outer),
+                             (getattr(self.inner_index, "reader", None), inner), (self.values, values)):
+            if reader is not None:
+                regions.append(span.region(reader.address))
+        return formatter_utils.fingerprint(process, header, regions)
+
+def decode_sparse(valobj):
+    state = EigenSparseState()
+    try:
+        process = valobj.GetProcess()
+        byte_order = valobj.GetTarget().GetByteOrder()
+        state.is_row_major = (formatter_utils.get_layout(valobj, "eigen.sparse", build_sparse_layout) & 1) == 1
+        outer = get_child_value_int(valobj, "m_outerSize") or 0
+        inner = get_child_value_int(valobj, "m_innerSize") or 0
+        state.outer_size = outer
+        state.rows, state.cols = (outer, inner) if state.is_row_major else (inner, outer)
+
+        outer_ptr = valobj.GetChildMemberWithName("m_outerIndex")
+        data = valobj.GetChildMemberWithName("m_data")
+        values_ptr = data.GetChildMemberWithName("m_values")
+        indices_ptr = data.GetChildMemberWithName("m_indices")
+        nnz_ptr = valobj.GetChildMemberWithName("m_innerNonZeros")
+        index_fmt = formatter_utils.scalar_format(outer_ptr.GetType().GetPointeeType())
+        if not outer or index_fmt is None or not outer_ptr.GetValueAsUnsigned(0):
+            return state
+
+        state.outer_index = formatter_utils.TargetArray(
+            process, outer_ptr.GetValueAsUnsigned(0), index_fmt, outer + 1, byte_order)
+        state.compressed = nnz_ptr.GetValueAsUnsigned(0) == 0
+        if state.compressed:
+            state.starts = state.outer_index
+        else:
+            # Uncompressed (being filled): bulk read the per-vector counts once
+            counts = formatter_utils.read_memory(
+                process, nnz_ptr.GetValueAsUnsigned(0), outer * struct.calcsize(index_fmt))
+            if counts is None:
+                return state
+            counts = formatter_utils.decode_array(counts, index_fmt, byte_order)
+            state.starts = array("q", accumulate((int(c) for c in counts), initial=0))
+        state.nnz = int(state.starts[outer])
+
+        state.scalar_type = values_ptr.GetType().GetPointeeType()
+        state.inner_index = formatter_utils.TargetArray(
+            process, indices_ptr.GetValueAsUnsigned(0), index_fmt,
+            get_child_value_int(data, "m_size") or 0, byte_order)
+        state.values = formatter_utils.BulkReader(
+            process, values_ptr.GetValueAsUnsigned(0), state.scalar_type.GetByteSize(), len(state.inner_index))
+    except Exception as e:
+        pass
+    return state
+
+def build_sparse_layout(valobj, type_name):
+    # Eigen::SparseMatrix<Scalar, Options, StorageIndex>
+    args = [x.strip() for x in type_name.rsplit('>', 1)[0].split(',')]
+    try:
+        return int(args[1])
+    except:
+        return 0
+
+def get_sparse_state(valobj):
+    return formatter_utils.get_value_state(valobj.GetNonSyntheticValue(), "eigen.sparse", decode_sparse)
+
+class EigenSparseMatrixSyntheticProvider:
+    """Nonzeros of a SparseMatrix as [r, c] = v, in storage order."""
+    def __init__(self, valobj, internal_dict):
+        self.valobj = valobj
+        self.state = EigenSparseState()
+        self.spans = (formatter_utils.ShownSpan(), formatter_utils.ShownSpan(), formatter_utils.ShownSpan())
+        self.fingerprint = None
+
+    def update(self):
+        self.state = get_sparse_state(self.valobj)
+        return formatter_utils.unchanged(
+            self, self.state.fingerprint(self.valobj.GetProcess(), *self.spans), self.spans)
+
+    def shown(self):
+        return min(self.state.nnz, formatter_utils.MAX_CHILDREN)
+
+    def num_children(self, max_count=None):
+        count = self.shown()
+        if count < self.state.nnz:
+            count += 1 # "[more]" marker
+        if max_count is not None:
+            count = min(count, max_count)
+        return count
+
+    def get_child_index(self, name):
+        if name == "[more]":
+            return self.shown()
+        try:
+            r, c = map(int, name.strip("[]").split(","))
+            index = self.state.find(r, c) if self.state.is_row_major else self.state.find(c, r)
+        except (ValueError, IndexError):
+            return -1
+        # Nonzeros past MAX_CHILDREN are not children
+        return index if index < self.shown() else -1
+
+    def get_child_at_index(self, index):
+        shown = self.shown()
+        if index == shown and shown < self.state.nnz:
+            return formatter_utils.create_string(
+                self.valobj, "[more]", f"... {self.state.nnz - shown} more nonzeros")
+        if index < 0 or index >= shown:
+            return None
+        try:
+            outer, pos = self.state.position(index)
+            inner = self.state.inner_index[pos]
+            raw = self.state.values.element_bytes(pos)
+        except IndexError:
+            return None
+        if raw is None:
+            return None
+        # Record what the child was decoded from: the enumeration prefix up to
+        # its outer vector (compressed) or the start of that vector, its inner
+        # index and its value
+        outer_span, inner_span, values_span = self.spans
+        index_size = self.state.outer_index.reader.elem_size
+        if self.state.compressed:
+            outer_span.add(0, (outer + 2) * index_size)
+        else:
+            outer_span.add(outer * index_size, index_size)
+        inner_span.add(pos * index_size, index_size)
+        values_span.add(pos * len(raw), len(raw))
+        r, c = (outer, inner) if self.state.is_row_major else (inner, outer)
+        return formatter_utils.create_value_from_bytes(self.valobj, f"[{r}, {c}]", raw, self.state.scalar_type)
+
+@formatter_profiling.summary
 def EigenSparseMatrixSummaryProvider(valobj, internal_dict):
-    rows = get_child_value_int(valobj, "m_rows", "m_storage.m_rows")
-    cols = get_child_value_int(valobj, "m_cols", "m_storage.m_cols")
-    
-    # Non-zeros usually in m_data.size() or similar, but structure varies.
-    # Compressed storage usually has `m_data` (Values), `m_innerIndices`, `m_outerIndexPtr`.
-    # A safe summary is just dimensions.
-    
-    if rows is None or cols is None:
+    state = get_sparse_state(valobj)
+    if state.outer_index is None and not (state.rows or state.cols):
         return "SparseMatrix"
-        
-    return f"SparseMatrix [{rows} x {cols}]"
+
+    layout = "RowMajor" if state.is_row_major else "ColMajor"
+    summary = f"SparseMatrix [{state.rows} x {state.cols}] {layout} nnz={state.nnz}"
+    if state.rows and state.cols:
+        summary += f" ({100.0 * state.nnz / (state.rows * state.cols):.3g}%)"
+    if not state.compressed:
+        summary += " uncompressed"
+    return summary
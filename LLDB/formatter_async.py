@@ -0,0 +1,101 @@
+# formatter_async.py
+# Background computation of the expensive parts of summaries (statistics,
+# checksums, bounding boxes over large buffers).
+#
+# A summary asks for such a part with `result()`: the first call queues the work
+# on a small thread pool and returns PENDING, so the summary shows PLACEHOLDER next
+# to its cheap shape description, and LLDB shows the result the next time it
+# refreshes the value. Results are cached per value, header and stop; queued and
+# running work is abandoned as soon as the process resumes.
+import lldb
+from concurrent.futures import ThreadPoolExecutor
+
+import formatter_utils
+
+PLACEHOLDER = "computing…"
+# Returned by result() while the work is queued or running
+PENDING = object()
+
+_executor = None
+_pending = {}   # key -> Future
+_results = formatter_utils.LRUCache(1024)
+_stop = None
+
+class Cancelled(Exception):
+    pass
+
+class Job:
+    """Handed to the background function: tells it when its stop is over."""
+    def __init__(self, process, stop_id):
+        self.process = process
+        self.stop_id = stop_id
+
+    def cancelled(self):
+        return (self.process.GetStopID(True) != self.stop_id
+                or self.process.GetState() != lldb.eStateStopped)
+
+def _executor_instance():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=max(1, formatter_utils.ASYNC_WORKERS),
+                                       thread_name_prefix="lldb-formatters")
+    return _executor
+
+def _run(job, compute):
+    if job.cancelled():
+        raise Cancelled()
+    try:
+        return compute(job)
+    except Cancelled:
+        raise
+    except Exception:
+        return None
+
+def _sync(process):
+    """Forget the work of the previous stop, cancelling what has not started."""
+    global _stop
+    stop = (process.GetUniqueID(), process.GetStopID(True))
+    if stop != _stop:
+        for future in _pending.values():
+            future.cancel()
+        _pending.clear()
+        _results.clear()
+        _stop = stop
+
+def result(valobj, kind, header, compute):
+    """Result of `compute(job)` for this value, computed once per stop.
+
+    `header` identifies what is being reduced (dimensions, data pointer, ...).
+    With formatter_utils.ASYNC_SUMMARY set, returns PENDING while the work runs
+    in the background; `compute` must then poll `job.cancelled()` between reads
+    and only read target memory uncached. Values without an address are always
+    computed inline.
+    """
+    process = valobj.GetProcess()
+    address = valobj.GetLoadAddress()
+    job = Job(process, process.GetStopID(True))
+    if not formatter_utils.ASYNC_SUMMARY or address == lldb.LLDB_INVALID_ADDRESS:
+        return compute(job)
+    _sync(process)
+    key = (kind, address, header)
+    done = _results.get(key)
+    if done is not None:
+        return done[0]
+    future = _pending.get(key)
+    if future is None:
+        _pending[key] = _executor_instance().submit(_run, job, compute)
+        return PENDING
+    if not future.done():
+        return PENDING
+    del _pending[key]
+    done = (None if future.cancelled() or future.exception() is not None else future.result(),)
+    _results.put(key, done)
+    return done[0]
+
+def wait(timeout=None):
+    """Block until the queued work is finished (for scripts and batch use)."""
+    for future in list(_pending.values()):
+        try:
+            future.result(timeout)
+        except Exception:
+            pass
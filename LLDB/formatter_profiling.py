@@ -0,0 +1,191 @@
+# formatter_profiling.py
+# Opt-in instrumentation of the formatters: call counts, latency and bytes read.
+#
+#   formatter-stats enable      start recording
+#   formatter-stats             print the table
+#   formatter-stats json [file] dump the table as JSON
+#   formatter-stats reset       clear the table
+#   formatter-stats disable     stop recording
+import lldb
+import functools
+import json
+import shlex
+import sys
+import threading
+import time
+
+# Set by `formatter-stats enable`; summaries only test this flag while it is off.
+ENABLED = False
+# Durations kept per entry to estimate the 95th percentile.
+SAMPLES = 1024
+# Synthetic provider methods wrapped while profiling is enabled.
+PROVIDER_METHODS = ("update", "num_children", "get_child_at_index")
+
+class Entry:
+    """Counters of one (formatter, method) pair."""
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.bytes = 0
+        self.samples = []
+
+    def add(self, duration):
+        if len(self.samples) < SAMPLES:
+            self.samples.append(duration)
+        else:
+            self.samples[self.calls % SAMPLES] = duration
+        self.calls += 1
+        self.total += duration
+
+    def p95(self):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+entries = {}    # (formatter, method) -> Entry
+_local = threading.local() # .active: entries being measured on this thread, innermost last
+_patched = {}   # (class, method) -> original attribute, or None if inherited
+
+def _active():
+    active = getattr(_local, "active", None)
+    if active is None:
+        active = _local.active = []
+    return active
+
+def _measure(key, func, args):
+    entry = entries.get(key)
+    if entry is None:
+        entry = entries[key] = Entry()
+    active = _active()
+    active.append(entry)
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        entry.add(time.perf_counter() - start)
+        active.pop()
+
+def count_bytes(size):
+    """Attribute `size` bytes read from the target to the formatter being measured."""
+    active = _active()
+    if active:
+        active[-1].bytes += size
+
+def summary(func):
+    """Decorator for summary functions. LLDB keeps a reference to the function it
+    first resolved, so the wrapper is installed up front and only tests ENABLED."""
+    name = f"{func.__module__}.{func.__name__}"
+    key = (name, "summary")
+    @functools.wraps(func)
+    def wrapper(valobj, internal_dict):
+        if not ENABLED:
+            return func(valobj, internal_dict)
+        return _measure(key, func, (valobj, internal_dict))
+    return wrapper
+
+def _provider_classes():
+    import lldb_formatters
+    for kind, regex, name in lldb_formatters.registered:
+        if kind != "synthetic":
+            continue
+        module_name, _, class_name = name.rpartition(".")
+        cls = getattr(sys.modules.get(module_name), class_name, None)
+        if cls is not None:
+            yield name, cls
+
+def enable():
+    """Wrap the methods of every registered synthetic provider class. LLDB looks
+    methods up on each call, so nothing is wrapped while profiling is off."""
+    global ENABLED
+    for name, cls in _provider_classes():
+        for method in PROVIDER_METHODS:
+            if (cls, method) in _patched or not hasattr(cls, method):
+                continue
+            # A method inherited from a provider wrapped already is wrapped again
+            # around its original, so each call is measured once, for this class
+            original = getattr(cls, method)
+            original = getattr(original, "_profiled", original)
+            _patched[(cls, method)] = cls.__dict__.get(method)
+            key = (name, method)
+            def wrapper(self, *args, _original=original, _key=key):
+                return _measure(_key, _original, (self,) + args)
+            wrapper = functools.wraps(original)(wrapper)
+            wrapper._profiled = original
+            setattr(cls, method, wrapper)
+    ENABLED = True
+
+def disable():
+    global ENABLED
+    ENABLED = False
+    for (cls, method), original in _patched.items():
+        if original is None:
+            delattr(cls, method)
+        else:
+            setattr(cls, method, original)
+    _patched.clear()
+
+def reset():
+    entries.clear()
+
+def table():
+    """Rows of the statistics table, slowest formatters first."""
+    import lldb_formatters
+    regexes = {}
+    for kind, regex, name in lldb_formatters.registered:
+        regexes.setdefault(name, [])
+        if regex not in regexes[name]:
+            regexes[name].append(regex)
+    rows = []
+    for (name, method), entry in entries.items():
+        rows.append({
+            "formatter": name,
+            "method": method,
+            "regex": regexes.get(name, []),
+            "calls": entry.calls,
+            "total_ms": entry.total * 1e3,
+            "mean_us": entry.total / entry.calls * 1e6 if entry.calls else 0.0,
+            "p95_us": entry.p95() * 1e6,
+            "bytes_read": entry.bytes,
+        })
+    rows.sort(key=lambda row: row["total_ms"], reverse=True)
+    return rows
+
+def format_table(rows):
+    lines = [f"{'formatter':<52} {'method':<18} {'calls':>8} {'total ms':>10} {'mean us':>10} {'p95 us':>10} {'bytes':>12}"]
+    for row in rows:
+        lines.append(f"{row['formatter']:<52} {row['method']:<18} {row['calls']:>8} {row['total_ms']:>10.2f}"
+                     f" {row['mean_us']:>10.1f} {row['p95_us']:>10.1f} {row['bytes_read']:>12}")
+        for regex in row["regex"]:
+            lines.append(f"    {regex}")
+    return "\n".join(lines)
+
+def formatter_stats_command(debugger, command, exe_ctx, result, internal_dict):
+    """Per-formatter latency and bytes read.
+    Usage: formatter-stats [enable|disable|reset|show|json [file]]"""
+    args = shlex.split(command)
+    action = args[0] if args else "show"
+    if action == "enable":
+        enable()
+        result.AppendMessage("formatter profiling enabled")
+    elif action == "disable":
+        disable()
+        result.AppendMessage("formatter profiling disabled")
+    elif action == "reset":
+        reset()
+        result.AppendMessage("formatter statistics cleared")
+    elif action == "show":
+        if not entries:
+            result.AppendMessage("no formatter statistics" + ("" if ENABLED else " (run 'formatter-stats enable')"))
+        else:
+            result.AppendMessage(format_table(table()))
+    elif action == "json":
+        text = json.dumps(table(), indent=2)
+        if len(args) > 1:
+            with open(args[1], "w") as f:
+                f.write(text)
+            result.AppendMessage(f"formatter statistics written to {args[1]}")
+        else:
+            result.AppendMessage(text)
+    else:
+        result.SetError("usage: formatter-stats [enable|disable|reset|show|json [file]]")
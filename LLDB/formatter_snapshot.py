@@ -0,0 +1,267 @@
+# formatter_snapshot.py
+# Capture what the formatters see of a value, to replay it without a debugger:
+#
+#   formatter-snapshot [--full] [--children N] <file.snap> <variable> [<variable> ...]
+#
+# A snapshot holds the layout of the value's type (fields, offsets, pointees,
+# template arguments), the bytes of the value and of the objects its pointers
+# refer to, and every target memory range the formatters read while showing
+# it. With --full the whole pixel/coefficient/element buffer is stored too, so
+# the replay can run any code path. LLDB/benchmarks/replay.py memory-maps the
+# file and runs the formatters on it against the fake lldb module.
+#
+# File layout (little endian):
+#   MAGIC
+#   memory ranges, each starting at a multiple of ALIGN (so they can be mapped)
+#   header: UTF-8 JSON {"version", "byte_order", "types", "values", "ranges"}
+#   u64 header offset, u64 header size, MAGIC
+import lldb
+import json
+import os
+import shlex
+import struct
+
+import formatter_utils
+
+MAGIC = b"LLDBSNAP"
+VERSION = 1
+ALIGN = 4096
+TRAILER = struct.Struct("<QQ8s")
+# Types reachable through more than this many pointers are stored without fields
+TYPE_DEPTH = 3
+# Objects pointed to by the value (and by those objects) are stored up to this depth...
+POINTEE_DEPTH = 2
+# ...when they are at most this large.
+POINTEE_BYTES = 64 * 1024
+
+class SnapshotError(Exception):
+    pass
+
+# ------------------------------------------------------------------------------
+# Types
+# ------------------------------------------------------------------------------
+def type_record(sbtype, types, depth=0):
+    """Add `sbtype` (and the types it refers to) to `types`; returns its name."""
+    sbtype = sbtype.GetCanonicalType()
+    name = sbtype.GetName()
+    record = types.get(name)
+    if record is not None and (record["kind"] != "struct" or record["fields"] is not None or depth > TYPE_DEPTH):
+        return name
+    size = sbtype.GetByteSize()
+    flags = sbtype.GetTypeFlags()
+    if sbtype.IsPointerType() or sbtype.IsReferenceType():
+        record = {"kind": "pointer", "size": size}
+        types[name] = record
+        record["pointee"] = type_record(sbtype.GetPointeeType(), types, depth + 1)
+    elif sbtype.IsArrayType():
+        element = sbtype.GetArrayElementType()
+        record = {"kind": "array", "size": size, "count": size // max(1, element.GetByteSize())}
+        types[name] = record
+        record["element"] = type_record(element, types, depth)
+    elif flags & (lldb.eTypeIsScalar | lldb.eTypeIsEnumeration) or not flags & lldb.eTypeHasChildren:
+        fmt = formatter_utils.scalar_format(sbtype)
+        if fmt is None and flags & lldb.eTypeIsEnumeration:
+            fmt = formatter_utils.scalar_format(sbtype.GetEnumerationIntegerType())
+        types[name] = {"kind": "scalar", "size": size, "basic": sbtype.GetBasicType(), "format": fmt}
+    else:
+        record = {"kind": "struct", "size": size, "fields": None, "bases": [], "template_args": []}
+        types[name] = record
+        if depth <= TYPE_DEPTH:
+            fields = []
+            for i in range(sbtype.GetNumberOfDirectBaseClasses()):
+                base = sbtype.GetDirectBaseClassAtIndex(i)
+                record["bases"].append([type_record(base.GetType(), types, depth), base.GetOffsetInBytes()])
+            for i in range(sbtype.GetNumberOfFields()):
+                field = sbtype.GetFieldAtIndex(i)
+                fields.append([field.GetName(), type_record(field.GetType(), types, depth), field.GetOffsetInBytes()])
+            for i in range(sbtype.GetNumberOfTemplateArguments()):
+                argument = sbtype.GetTemplateArgumentType(i)
+                if argument.IsValid():
+                    record["template_args"].append(type_record(argument, types, depth + 1))
+            record["fields"] = fields
+    return name
+
+# ------------------------------------------------------------------------------
+# Memory
+# ------------------------------------------------------------------------------
+class RangeSet:
+    """Target memory ranges to store, merged when they touch or overlap."""
+    def __init__(self):
+        self.ranges = {}    # address -> size
+
+    def add(self, address, size):
+        if size > 0 and address:
+            self.ranges[address] = max(size, self.ranges.get(address, 0))
+
+    def add_read(self, address, data):
+        """formatter_utils.read_hook: keep what the formatters read."""
+        self.add(address, len(data))
+
+    def merged(self):
+        result = []
+        for address in sorted(self.ranges):
+            end = address + self.ranges[address]
+            if result and address <= result[-1][1]:
+                result[-1][1] = max(result[-1][1], end)
+            else:
+                result.append([address, end])
+        return [(start, end - start) for start, end in result]
+
+def add_pointees(valobj, sbtype, address, ranges, depth):
+    """Add the objects that the pointers stored in the object at `address` point to."""
+    if depth > POINTEE_DEPTH:
+        return
+    process = valobj.GetProcess()
+    sbtype = sbtype.GetCanonicalType()
+    if sbtype.IsPointerType() or sbtype.IsReferenceType():
+        pointee = sbtype.GetPointeeType()
+        target = formatter_utils.read_unsigned(process, address, sbtype.GetByteSize(),
+                                               valobj.GetTarget().GetByteOrder())
+        size = pointee.GetByteSize()
+        if target and 0 < size <= POINTEE_BYTES:
+            ranges.add(target, size)
+            add_pointees(valobj, pointee, target, ranges, depth + 1)
+        return
+    for i in range(sbtype.GetNumberOfDirectBaseClasses()):
+        base = sbtype.GetDirectBaseClassAtIndex(i)
+        add_pointees(valobj, base.GetType(), address + base.GetOffsetInBytes(), ranges, depth)
+    for i in range(sbtype.GetNumberOfFields()):
+        field = sbtype.GetFieldAtIndex(i)
+        add_pointees(valobj, field.GetType(), address + field.GetOffsetInBytes(), ranges, depth)
+
+def run_formatters(valobj, children):
+    """Show `valobj` the way LLDB would: summary, update, then `children` children."""
+    import lldb_formatters
+    summary, synthetic = lldb_formatters.lookup(valobj.GetType().GetCanonicalType().GetName())
+    if summary is not None:
+        module, _, name = summary.rpartition(".")
+        lldb_formatters.resolve(module, name)(valobj, {})
+    if synthetic is not None:
+        module, _, name = synthetic.rpartition(".")
+        provider = lldb_formatters.resolve(module, name)(valobj.GetNonSyntheticValue(), {})
+        provider.update()
+        for index in range(min(children, provider.num_children())):
+            provider.get_child_at_index(index)
+
+def capture(values, path, full=False, children=None):
+    """Write a snapshot of `values` (SBValues with an address) to `path`.
+    Returns (number of ranges, bytes of target memory stored)."""
+    import opencv_formatters
+    if children is None:
+        children = formatter_utils.MAX_CHILDREN
+    process = values[0].GetProcess()
+    types = {}
+    ranges = RangeSet()
+    records = []
+    for valobj in values:
+        valobj = valobj.GetNonSyntheticValue()
+        if valobj.GetType().IsPointerType() or valobj.GetType().IsReferenceType():
+            valobj = valobj.Dereference()
+        address = valobj.GetLoadAddress()
+        if address == lldb.LLDB_INVALID_ADDRESS:
+            raise SnapshotError(f"'{valobj.GetName()}' has no address")
+        records.append({"name": valobj.GetName(), "type": type_record(valobj.GetType(), types), "address": address})
+        ranges.add(address, valobj.GetByteSize())
+        add_pointees(valobj, valobj.GetType(), address, ranges, 1)
+        if full:
+            view = opencv_formatters.get_buffer_view(valobj)
+            if view is not None and view.address:
+                ranges.add(view.address, view.span)
+        # Record what the formatters read, starting from cold caches
+        formatter_utils.page_cache.clear()
+        formatter_utils.value_cache.entries.clear()
+        async_summary = formatter_utils.ASYNC_SUMMARY
+        formatter_utils.ASYNC_SUMMARY = False
+        formatter_utils.read_hook = ranges.add_read
+        try:
+            run_formatters(valobj, children)
+        finally:
+            formatter_utils.read_hook = None
+            formatter_utils.ASYNC_SUMMARY = async_summary
+
+    index = []
+    stored = 0
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        for address, size in ranges.merged():
+            offset = (f.tell() + ALIGN - 1) // ALIGN * ALIGN
+            f.seek(offset)
+            written = 0
+            # Stream large buffers so they never need to fit in memory
+            for _, raw in formatter_utils.iter_chunks(process, address, 1, size, size):
+                if raw is None:
+                    break
+                f.write(raw)
+                written += len(raw)
+            if written:
+                index.append([address, written, offset])
+                stored += written
+        header = json.dumps({
+            "version": VERSION,
+            "byte_order": "big" if values[0].GetTarget().GetByteOrder() == lldb.eByteOrderBig else "little",
+            "types": types,
+            "values": records,
+            "ranges": index,
+        }).encode("utf-8")
+        header_offset = f.tell()
+        f.write(header)
+        f.write(TRAILER.pack(header_offset, len(header), MAGIC))
+    return len(index), stored
+
+def read_header(f):
+    """Header of the snapshot file `f` (opened in binary mode)."""
+    f.seek(0, os.SEEK_END)
+    if f.tell() < len(MAGIC) + TRAILER.size:
+        raise SnapshotError("not a formatter snapshot")
+    f.seek(-TRAILER.size, os.SEEK_END)
+    header_offset, header_size, magic = TRAILER.unpack(f.read(TRAILER.size))
+    f.seek(0)
+    if magic != MAGIC or f.read(len(MAGIC)) != MAGIC:
+        raise SnapshotError("not a formatter snapshot")
+    f.seek(header_offset)
+    header = json.loads(f.read(header_size).decode("utf-8"))
+    if header.get("version") != VERSION:
+        raise SnapshotError(f"unsupported snapshot version {header.get('version')}")
+    return header
+
+# ------------------------------------------------------------------------------
+# Command
+# ------------------------------------------------------------------------------
+def snapshot_command(debugger, command, exe_ctx, result, internal_dict):
+    """Capture type layouts and the memory the formatters read for offline replay.
+    Usage: formatter-snapshot [--full] [--children N] <file.snap> <variable> [<variable> ...]"""
+    usage = "usage: formatter-snapshot [--full] [--children N] <file.snap> <variable> [<variable> ...]"
+    try:
+        args = shlex.split(command)
+    except ValueError as e:
+        result.SetError(str(e))
+        return
+    full = False
+    children = None
+    while args and args[0].startswith("--"):
+        option = args.pop(0)
+        if option == "--full":
+            full = True
+        elif option == "--children" and args and args[0].isdigit():
+            children = int(args.pop(0))
+        else:
+            result.SetError(usage)
+            return
+    if len(args) < 2:
+        result.SetError(usage)
+        return
+    import opencv_formatters
+    path = os.path.expanduser(args[0])
+    values = []
+    for expr in args[1:]:
+        valobj = opencv_formatters.find_value(exe_ctx, expr)
+        if not valobj.IsValid():
+            result.SetError(f"cannot find variable '{expr}'")
+            return
+        values.append(valobj)
+    try:
+        count, stored = capture(values, path, full, children)
+    except (SnapshotError, OSError) as e:
+        result.SetError(f"formatter-snapshot: {e}")
+        return
+    result.AppendMessage(f"Wrote {len(values)} value(s), {count} memory range(s), {stored} bytes to {path}")
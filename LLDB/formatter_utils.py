@@ -0,0 +1,830 @@
+# formatter_utils.py
+# Shared helpers for the LLDB formatter modules (bulk memory reads, value creation).
+import lldb
+import math
+import struct
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+
+import formatter_profiling
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# ------------------------------------------------------------------------------
+# Settings (change from the LLDB prompt, e.g. `script formatter_utils.BULK_READ = False`)
+# ------------------------------------------------------------------------------
+# Build children from one bulk ReadMemory instead of one CreateChildAtOffset each.
+BULK_READ = True
+# Largest window of target memory fetched by a single bulk read.
+BULK_WINDOW_BYTES = 256 * 1024
+# Number of bulk read windows kept per value.
+BULK_WINDOW_CACHE = 4
+# Containers show at most this many children, followed by a "[more]" marker.
+MAX_CHILDREN = 10000
+# Number of distinct types whose parsed layout is kept in the layout cache.
+LAYOUT_CACHE_SIZE = 512
+# Number of decoded values kept in the per-stop value cache.
+VALUE_CACHE_SIZE = 4096
+# Target memory is read in aligned pages of this size and kept until the process
+# resumes, shared by all formatters...
+PAGE_BYTES = 64 * 1024
+# ...up to this many bytes (0 disables the page cache).
+PAGE_CACHE_BYTES = 32 * 1024 * 1024
+# Image rows are materialized in pages of at most this many rows...
+ROWS_PER_PAGE = 256
+# ...and at most this many bytes, each page filled with a single read.
+ROW_PAGE_BYTES = 4 * 1024 * 1024
+# Number of row pages kept per image.
+ROW_PAGE_CACHE = 4
+# Append min/max/mean/NaN/Inf/zero statistics to image and matrix summaries.
+STATS_SUMMARY = False
+# Append bounding box, centroid and invalid/degenerate point counts to summaries
+# of lists of 2D-4D points (e.g. cList<TPoint3f>, cList<Eigen::Vector3d>).
+POINT_SUMMARY = False
+# Buffers larger than this are sampled (whole chunks at a regular stride).
+# Without NumPy the budget is divided by 16 to keep pure Python decoding fast.
+STATS_BYTE_BUDGET = 16 * 1024 * 1024
+# Size of one read while computing statistics or streaming a buffer.
+CHUNK_BYTES = 1024 * 1024
+# Statistics stop (and are marked partial) after this many seconds...
+STATS_TIME_LIMIT = 0.1
+# ...unless they are computed in the background (see formatter_async): the
+# summary shows a placeholder until the result is ready.
+ASYNC_SUMMARY = True
+ASYNC_WORKERS = 2
+ASYNC_TIME_LIMIT = 10.0
+# bufdiff hashes buffers in tiles of this many bytes.
+DIFF_TILE_BYTES = 64 * 1024
+# update() hashes the bytes a provider's children were decoded from to tell
+# LLDB whether they can be kept across a step; children shown from more than
+# this many bytes of a buffer are rebuilt at every stop (0 rebuilds them always).
+FINGERPRINT_BYTES = 1024 * 1024
+
+# ------------------------------------------------------------------------------
+# Caches
+# ------------------------------------------------------------------------------
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry."""
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        value = self.entries.get(key, default)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+# Per-type facts (template arguments, member paths, SBTypes) shared by all modules.
+layout_cache = LRUCache(LAYOUT_CACHE_SIZE)
+
+def target_key(target):
+    """Identity of a target that stays stable across SBTarget wrapper objects."""
+    return (target.GetDebugger().GetID(), target.GetExecutable().fullpath)
+
+def get_layout(valobj, kind, build):
+    """Return the cached layout of `valobj`'s canonical type, calling
+    `build(valobj, type_name)` the first time the type is seen in this target."""
+    type_name = valobj.GetType().GetCanonicalType().GetName()
+    key = (kind, target_key(valobj.GetTarget()), type_name)
+    layout = layout_cache.get(key)
+    if layout is None:
+        layout = build(valobj, type_name)
+        if layout is not None:
+            layout_cache.put(key, layout)
+    return layout
+
+def find_type(target, name):
+    """Cached `SBTarget.FindFirstType`; returns an invalid SBType if not found."""
+    key = ("type", target_key(target), name)
+    sbtype = layout_cache.get(key)
+    if sbtype is None:
+        sbtype = target.FindFirstType(name)
+        if sbtype.IsValid():
+            layout_cache.put(key, sbtype)
+    return sbtype
+
+def member_offset(sbtype, names):
+    """Offset in `sbtype` of its first field named one of `names`, base classes
+    included; None if there is none."""
+    sbtype = sbtype.GetCanonicalType()
+    for i in range(sbtype.GetNumberOfFields()):
+        field = sbtype.GetFieldAtIndex(i)
+        if field.GetName() in names:
+            return field.GetOffsetInBytes()
+    for i in range(sbtype.GetNumberOfDirectBaseClasses()):
+        base = sbtype.GetDirectBaseClassAtIndex(i)
+        offset = member_offset(base.GetType(), names)
+        if offset is not None:
+            return base.GetOffsetInBytes() + offset
+    return None
+
+class StopCache:
+    """Decoded per-value state, valid for a single process stop.
+
+    Entries are keyed by (kind, load address, canonical type name). The whole
+    cache is dropped as soon as the process or its stop ID changes, so summary
+    and synthetic providers can share one decode of the same value per stop.
+    """
+    def __init__(self, capacity):
+        self.entries = LRUCache(capacity)
+        self.stop = None
+
+    def sync(self, process):
+        stop = (process.GetUniqueID(), process.GetStopID(True))
+        if stop != self.stop:
+            self.entries.clear()
+            self.stop = stop
+
+    def get(self, valobj, kind, build):
+        address = valobj.GetLoadAddress()
+        if address == lldb.LLDB_INVALID_ADDRESS:
+            # Values without an address (registers, synthesized data) are not cached
+            return build(valobj)
+        self.sync(valobj.GetProcess())
+        key = (kind, address, valobj.GetType().GetCanonicalType().GetName())
+        state = self.entries.get(key)
+        if state is None:
+            state = build(valobj)
+            if state is not None:
+                self.entries.put(key, state)
+        return state
+
+value_cache = StopCache(VALUE_CACHE_SIZE)
+
+def get_value_state(valobj, kind, build):
+    """Return `build(valobj)`, computed at most once per value and process stop."""
+    return value_cache.get(valobj, kind, build)
+
+# ------------------------------------------------------------------------------
+# Change detection
+# ------------------------------------------------------------------------------
+# A synthetic provider's update() returns True to tell LLDB that the children it
+# built before are still valid. Providers fingerprint their decoded header plus
+# the bytes their children were decoded from (a ShownSpan of each data buffer),
+# so a step that leaves the visible part of a big matrix untouched costs one
+# small read instead of rebuilding every child.
+class ShownSpan:
+    """Bytes [lo, hi) of a data buffer that children were decoded from since
+    LLDB last rebuilt them."""
+    def __init__(self):
+        self.lo = 0
+        self.hi = 0
+
+    def add(self, offset, size):
+        if self.hi <= self.lo:
+            self.lo, self.hi = offset, offset + size
+        else:
+            self.lo = min(self.lo, offset)
+            self.hi = max(self.hi, offset + size)
+
+    def clear(self):
+        self.lo = self.hi = 0
+
+    def region(self, address):
+        """(address, size) of the shown bytes of the buffer at `address`."""
+        return (address + self.lo, self.hi - self.lo)
+
+def fingerprint(process, header, regions=()):
+    """`header` plus a CRC32 of each region, given as host bytes or as an
+    (address, size) pair; None if reuse is disabled, a read fails or a region
+    in memory is larger than FINGERPRINT_BYTES."""
+    if FINGERPRINT_BYTES <= 0:
+        return None
+    crcs = []
+    for region in regions:
+        if isinstance(region, tuple):
+            address, size = region
+            raw = b""
+            if address and size > 0:
+                if size > FINGERPRINT_BYTES:
+                    return None
+                raw = read_memory(process, address, size)
+                if raw is None:
+                    return None
+            crcs.append((address, size, zlib.crc32(raw)))
+        else:
+            crcs.append(zlib.crc32(region))
+    return (header, tuple(crcs))
+
+def unchanged(provider, current, spans=()):
+    """Store `current` as `provider.fingerprint`; True if it equals the previous
+    one. Otherwise LLDB rebuilds the children, so `spans` start over."""
+    previous = provider.fingerprint
+    provider.fingerprint = current
+    if current is not None and current == previous:
+        return True
+    for span in spans:
+        span.clear()
+    return False
+
+# ------------------------------------------------------------------------------
+# Memory access
+# ------------------------------------------------------------------------------
+# Called with (address, bytes) after every successful read_target (see formatter_snapshot)
+read_hook = None
+
+def read_target(process, address, size):
+    """One uncached `SBProcess.ReadMemory`; returns bytes or None on failure."""
+    if formatter_profiling.ENABLED:
+        formatter_profiling.count_bytes(size)
+    error = lldb.SBError()
+    data = process.ReadMemory(address, size, error)
+    if not error.Success() or data is None or len(data) != size:
+        return None
+    if read_hook is not None:
+        read_hook(address, data)
+    return data
+
+class PageCache:
+    """Target memory pages read during one process stop, shared by all formatters.
+
+    Reads are served from PAGE_BYTES aligned pages, and each run of missing pages
+    is fetched with a single ReadMemory, so neighbouring fields and elements cost
+    one round trip per stop. Least recently used pages are evicted beyond
+    PAGE_CACHE_BYTES, and the whole cache is dropped as soon as the process or
+    its stop ID changes. Pages that cannot be read as a whole (at the end of a
+    mapping) are remembered, and only the requested bytes are read from them.
+    """
+    def __init__(self):
+        self.pages = OrderedDict() # page address -> bytes
+        self.bytes = 0
+        self.unreadable = set()
+        self.stop = None
+
+    def sync(self, process):
+        stop = (process.GetUniqueID(), process.GetStopID(True))
+        if stop != self.stop:
+            self.clear()
+            self.stop = stop
+
+    def clear(self):
+        self.pages.clear()
+        self.unreadable.clear()
+        self.bytes = 0
+
+    def put(self, page, raw):
+        self.pages[page] = raw
+        self.bytes += len(raw)
+        while self.bytes > PAGE_CACHE_BYTES and self.pages:
+            self.bytes -= len(self.pages.popitem(last=False)[1])
+
+    def fetch(self, process, pos, end):
+        """Read the run of missing pages from the one holding `pos` up to `end`;
+        returns (start address, bytes), caching every whole page read."""
+        page = pos // PAGE_BYTES * PAGE_BYTES
+        last = page + PAGE_BYTES
+        while last < end and last not in self.pages and last not in self.unreadable:
+            last += PAGE_BYTES
+        if page not in self.unreadable and last - PAGE_BYTES not in self.unreadable:
+            raw = read_target(process, page, last - page)
+            if raw is not None:
+                for offset in range(0, len(raw), PAGE_BYTES):
+                    self.put(page + offset, raw[offset:offset + PAGE_BYTES])
+                return page, raw
+            self.unreadable.update((page, last - PAGE_BYTES))
+        # The run reaches past the end of a mapping: read only the bytes asked for
+        stop = min(last, end)
+        raw = read_target(process, pos, stop - pos)
+        if raw is not None:
+            first = -(-pos // PAGE_BYTES) * PAGE_BYTES
+            for page in range(first, stop - PAGE_BYTES + 1, PAGE_BYTES):
+                self.put(page, raw[page - pos:page - pos + PAGE_BYTES])
+        return pos, raw
+
+    def read(self, process, address, size):
+        self.sync(process)
+        end = address + size
+        pieces = []
+        pos = address
+        while pos < end:
+            start = pos // PAGE_BYTES * PAGE_BYTES
+            raw = self.pages.get(start)
+            if raw is not None:
+                self.pages.move_to_end(start)
+            else:
+                start, raw = self.fetch(process, pos, end)
+                if raw is None:
+                    return None
+            stop = min(end, start + len(raw))
+            pieces.append(raw[pos - start:stop - start])
+            pos = stop
+        return pieces[0] if len(pieces) == 1 else b"".join(pieces)
+
+page_cache = PageCache()
+
+def read_memory(process, address, size, cache=True):
+    """Read `size` bytes at `address`; returns bytes or None on failure.
+    Reads go through the per-stop page cache unless `cache` is False (streaming)
+    or they would take more than a quarter of it."""
+    if size <= 0 or not address or not process.IsValid():
+        return None
+    if cache and size <= PAGE_CACHE_BYTES // 4:
+        return page_cache.read(process, address, size)
+    return read_target(process, address, size)
+
+def read_unsigned(process, address, size, byte_order=lldb.eByteOrderLittle):
+    """Unsigned integer of `size` bytes at `address`, or None."""
+    raw = read_memory(process, address, size)
+    if raw is None:
+        return None
+    return int.from_bytes(raw, "big" if byte_order == lldb.eByteOrderBig else "little")
+
+def make_data(target, raw):
+    """Wrap host bytes into an SBData laid out like the target."""
+    data = lldb.SBData()
+    error = lldb.SBError()
+    data.SetData(error, raw, target.GetByteOrder(), target.GetAddressByteSize())
+    if not error.Success():
+        return None
+    return data
+
+def read_value_bytes(valobj, size):
+    """First `size` bytes of a value's own data (for values that have no address)."""
+    error = lldb.SBError()
+    raw = valobj.GetData().ReadRawData(error, 0, size)
+    if not error.Success() or raw is None or len(raw) != size:
+        return None
+    return raw
+
+def create_value_from_bytes(valobj, name, raw, sbtype):
+    """Create a child value of type `sbtype` from bytes already read from the target."""
+    data = make_data(valobj.GetTarget(), raw)
+    if data is None:
+        return None
+    return valobj.CreateValueFromData(name, data, sbtype)
+
+class BulkReader:
+    """Serves the elements of a contiguous target buffer from windowed bulk reads.
+
+    The buffer holds `count` elements of `elem_size` bytes starting at `address`.
+    Elements are fetched in aligned windows of at most BULK_WINDOW_BYTES, so
+    walking all children costs one ReadMemory per window instead of one per
+    element. The last BULK_WINDOW_CACHE windows are kept, so scrolling back and
+    forth does not read the same memory again.
+    """
+    def __init__(self, process, address, elem_size, count):
+        self.process = process
+        self.address = address
+        self.elem_size = elem_size
+        self.count = count
+        self.per_window = max(1, BULK_WINDOW_BYTES // max(1, elem_size))
+        self.windows = LRUCache(BULK_WINDOW_CACHE)
+
+    def read_window(self, window):
+        buffer = self.windows.get(window)
+        if buffer is None:
+            start = window * self.per_window
+            end = min(self.count, start + self.per_window)
+            buffer = read_memory(self.process, self.address + start * self.elem_size,
+                                 (end - start) * self.elem_size)
+            if buffer is not None:
+                self.windows.put(window, buffer)
+        return buffer
+
+    def element_bytes(self, index):
+        """Raw bytes of element `index`, or None if the memory is unreadable."""
+        if index < 0 or index >= self.count:
+            return None
+        window, index = divmod(index, self.per_window)
+        buffer = self.read_window(window)
+        if buffer is None:
+            return None
+        offset = index * self.elem_size
+        return buffer[offset:offset + self.elem_size]
+
+class TargetArray:
+    """Read-only sequence over a scalar array in target memory.
+
+    Items are decoded a window at a time (see BulkReader), so it can be indexed
+    randomly, e.g. binary searched with `bisect`, without reading the whole array.
+    """
+    def __init__(self, process, address, fmt, count, byte_order=lldb.eByteOrderLittle):
+        self.fmt = fmt
+        self.count = count
+        self.byte_order = byte_order
+        self.reader = BulkReader(process, address, struct.calcsize(fmt), count)
+        self.decoded = LRUCache(BULK_WINDOW_CACHE)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if index < 0 or index >= self.count:
+            raise IndexError(index)
+        window, offset = divmod(index, self.reader.per_window)
+        values = self.decoded.get(window)
+        if values is None:
+            raw = self.reader.read_window(window)
+            if raw is None:
+                raise IndexError(index)
+            values = decode_array(raw, self.fmt, self.byte_order)
+            self.decoded.put(window, values)
+        return values[offset]
+
+class RowPager:
+    """Serves the rows of a strided 2D target buffer from page-sized reads.
+
+    Row `r` starts at `address + r * step` and is `row_bytes` long. Rows are
+    fetched a page at a time (ROWS_PER_PAGE rows, fewer for wide rows) with one
+    coalesced ReadMemory spanning the page, so padding between rows of a
+    non-continuous image is read but never returned.
+    """
+    def __init__(self, process, address, rows, row_bytes, step):
+        self.process = process
+        self.address = address
+        self.rows = rows
+        self.row_bytes = row_bytes
+        self.step = max(step, row_bytes)
+        self.rows_per_page = max(1, min(ROWS_PER_PAGE, ROW_PAGE_BYTES // max(1, self.step)))
+        self.pages = LRUCache(ROW_PAGE_CACHE)
+
+    def page_of(self, row):
+        return row // self.rows_per_page
+
+    def _page(self, page):
+        buffer = self.pages.get(page)
+        if buffer is None:
+            first = page * self.rows_per_page
+            count = min(self.rows_per_page, self.rows - first)
+            span = (count - 1) * self.step + self.row_bytes
+            buffer = read_memory(self.process, self.address + first * self.step, span)
+            if buffer is not None:
+                self.pages.put(page, buffer)
+        return buffer
+
+    def row(self, row):
+        """Raw bytes of row `row` (without padding), or None if unreadable."""
+        if row < 0 or row >= self.rows or self.row_bytes <= 0:
+            return None
+        page = self.page_of(row)
+        buffer = self._page(page)
+        if buffer is None:
+            return None
+        offset = (row - page * self.rows_per_page) * self.step
+        return buffer[offset:offset + self.row_bytes]
+
+def iter_chunks(process, address, rows, row_bytes, step, item_size=1, chunk_bytes=None, every=1):
+    """Yield (first_row, bytes) chunks of a strided 2D buffer, padding removed.
+
+    Continuous buffers (step == row_bytes) are cut into chunks of about
+    `chunk_bytes` aligned to `item_size`; otherwise whole rows are grouped and
+    each group is fetched with one read spanning the rows, bypassing the page
+    cache since the data is streamed once. With `every` > 1
+    only every n-th chunk is read (strided sampling). An unreadable chunk is
+    yielded as (first_row, None) and ends the iteration.
+    """
+    chunk_bytes = chunk_bytes or CHUNK_BYTES
+    if rows <= 0 or row_bytes <= 0:
+        return
+    if step <= row_bytes:
+        total = rows * row_bytes
+        size = max(item_size, chunk_bytes // item_size * item_size)
+        for index, offset in enumerate(range(0, total, size)):
+            if index % every:
+                continue
+            raw = read_memory(process, address + offset, min(size, total - offset), cache=False)
+            yield offset // row_bytes, raw
+            if raw is None:
+                return
+        return
+    per_chunk = max(1, chunk_bytes // step)
+    for index, first in enumerate(range(0, rows, per_chunk)):
+        if index % every:
+            continue
+        count = min(per_chunk, rows - first)
+        raw = read_memory(process, address + first * step, (count - 1) * step + row_bytes, cache=False)
+        if raw is None:
+            yield first, None
+            return
+        if count > 1:
+            raw = b"".join(raw[i * step:i * step + row_bytes] for i in range(count))
+        yield first, raw
+
+# ------------------------------------------------------------------------------
+# Standard library containers
+# ------------------------------------------------------------------------------
+# (begin, end) member paths of std::vector in libstdc++, libc++ and the MSVC STL
+VECTOR_LAYOUTS = [
+    ("_M_impl._M_start", "_M_impl._M_finish"),
+    ("__begin_", "__end_"),
+    ("_Mypair._Myval2._Myfirst", "_Mypair._Myval2._Mylast"),
+]
+
+def vector_range(vector):
+    """(begin, end) addresses of the elements of a std::vector, or None when
+    the layout is not recognized. Reads the raw members, so it works whether or
+    not LLDB's own std::vector provider is attached to `vector`."""
+    vector = vector.GetNonSyntheticValue()
+    for begin_path, end_path in VECTOR_LAYOUTS:
+        begin = vector.GetValueForExpressionPath("." + begin_path)
+        if begin.IsValid():
+            end = vector.GetValueForExpressionPath("." + end_path)
+            begin = begin.GetValueAsUnsigned(0)
+            return begin, max(begin, end.GetValueAsUnsigned(0))
+    return None
+
+# ------------------------------------------------------------------------------
+# Host-side decoding
+# ------------------------------------------------------------------------------
+def scalar_format(sbtype):
+    """`struct` format character of a scalar SBType, or None if not a plain number."""
+    sbtype = sbtype.GetCanonicalType()
+    size = sbtype.GetByteSize()
+    flags = sbtype.GetTypeFlags()
+    if flags & lldb.eTypeIsFloat:
+        return {2: "e", 4: "f", 8: "d"}.get(size)
+    if flags & lldb.eTypeIsInteger:
+        code = {1: "b", 2: "h", 4: "i", 8: "q"}.get(size)
+        if code and not flags & lldb.eTypeIsSigned:
+            code = code.upper()
+        return code
+    return None
+
+def homogeneous_format(sbtype):
+    """(struct format, count) if `sbtype` is a scalar, or an array/struct made
+    only of scalars of one type without padding (e.g. Point3f, Vec4b); else None."""
+    sbtype = sbtype.GetCanonicalType()
+    fmt = scalar_format(sbtype)
+    if fmt is not None:
+        return fmt, 1
+    if sbtype.IsArrayType():
+        parts = [sbtype.GetArrayElementType()]
+    else:
+        parts = [sbtype.GetDirectBaseClassAtIndex(i).GetType() for i in range(sbtype.GetNumberOfDirectBaseClasses())]
+        parts += [sbtype.GetFieldAtIndex(i).GetType() for i in range(sbtype.GetNumberOfFields())]
+    formats = set()
+    for part in parts:
+        inner = homogeneous_format(part)
+        if inner is None:
+            return None
+        formats.add(inner[0])
+    if len(formats) != 1:
+        return None
+    fmt = formats.pop()
+    count, rest = divmod(sbtype.GetByteSize(), struct.calcsize(fmt))
+    if rest or not count:
+        return None
+    return fmt, count
+
+def decode_scalars(raw, fmt, byte_order=lldb.eByteOrderLittle):
+    """Unpack a buffer of equally typed scalars into a tuple of Python numbers."""
+    prefix = ">" if byte_order == lldb.eByteOrderBig else "<"
+    return struct.unpack(f"{prefix}{len(raw) // struct.calcsize(fmt)}{fmt}", raw)
+
+def format_scalar(value, fmt):
+    """Render a decoded scalar the way LLDB would (float keeps float precision)."""
+    if fmt == "f" or fmt == "e":
+        return f"{value:.9g}"
+    return str(value)
+
+def decode_array(raw, fmt, byte_order=lldb.eByteOrderLittle):
+    """Decode a scalar buffer into a NumPy array, an `array.array` or a tuple."""
+    if numpy is not None:
+        dtype = numpy.dtype(fmt).newbyteorder(">" if byte_order == lldb.eByteOrderBig else "<")
+        return numpy.frombuffer(raw, dtype=dtype)
+    if fmt in "bBhHiIqQfd" and array(fmt).itemsize == struct.calcsize(fmt):
+        values = array(fmt, raw)
+        if (byte_order == lldb.eByteOrderBig) != (array("H", b"\x00\x01")[0] == 1):
+            values.byteswap()
+        return values
+    return decode_scalars(raw, fmt, byte_order)
+
+# ------------------------------------------------------------------------------
+# Synthetic values
+# ------------------------------------------------------------------------------
+# Scalars and strings shown as synthetic children are encoded on the host and
+# wrapped with CreateValueFromData: CreateValueFromExpression would run the
+# expression evaluator for every child, and fails on core files.
+def basic_type(target, basic):
+    """Cached `SBTarget.GetBasicType`."""
+    key = ("basic", target_key(target), basic)
+    sbtype = layout_cache.get(key)
+    if sbtype is None:
+        sbtype = target.GetBasicType(basic)
+        if sbtype.IsValid():
+            layout_cache.put(key, sbtype)
+    return sbtype
+
+def create_scalar(valobj, name, value, basic=lldb.eBasicTypeInt):
+    """Child `name` holding the number `value` as the given basic type."""
+    target = valobj.GetTarget()
+    sbtype = basic_type(target, basic)
+    fmt = scalar_format(sbtype)
+    if fmt is None:
+        return None
+    prefix = ">" if target.GetByteOrder() == lldb.eByteOrderBig else "<"
+    if fmt not in "efd":
+        value = int(value)
+    try:
+        raw = struct.pack(prefix + fmt, value)
+    except struct.error:
+        return None
+    return create_value_from_bytes(valobj, name, raw, sbtype)
+
+def create_pointer(valobj, name, address, pointee):
+    """Child `name` holding `address` as a pointer to `pointee`."""
+    sbtype = pointee.GetPointerType()
+    prefix = ">" if valobj.GetTarget().GetByteOrder() == lldb.eByteOrderBig else "<"
+    raw = struct.pack(prefix + ("Q" if sbtype.GetByteSize() == 8 else "I"), address)
+    return create_value_from_bytes(valobj, name, raw, sbtype)
+
+def create_string(valobj, name, text):
+    """Child `name` holding `text` as a NUL terminated char array (shown as a string)."""
+    raw = text.encode("utf-8") + b"\0"
+    sbtype = basic_type(valobj.GetTarget(), lldb.eBasicTypeChar).GetArrayType(len(raw))
+    return create_value_from_bytes(valobj, name, raw, sbtype)
+
+# ------------------------------------------------------------------------------
+# Statistics
+# ------------------------------------------------------------------------------
+class BufferStats:
+    """Per-channel min/max/mean plus NaN, Inf and zero counts, accumulated by chunks."""
+    def __init__(self, channels):
+        self.channels = channels
+        self.count = [0] * channels     # finite values per channel
+        self.min = [None] * channels
+        self.max = [None] * channels
+        self.sum = [0.0] * channels
+        self.nan = 0
+        self.inf = 0
+        self.zeros = 0
+        self.values = 0                 # all values seen
+        self.sampled = False            # only part of the buffer was read
+        self.partial = False            # stopped by the time limit or a failed read
+
+    def add(self, raw, fmt, byte_order=lldb.eByteOrderLittle):
+        values = decode_array(raw, fmt, byte_order)
+        channels = self.channels
+        usable = len(values) - len(values) % channels
+        self.values += usable
+        if numpy is not None:
+            values = values[:usable].reshape(-1, channels)
+            self.zeros += int(numpy.count_nonzero(values == 0))
+            if values.dtype.kind == "f":
+                finite = numpy.isfinite(values)
+                nan = numpy.isnan(values)
+                self.nan += int(numpy.count_nonzero(nan))
+                self.inf += int(values.size - numpy.count_nonzero(finite) - numpy.count_nonzero(nan))
+            else:
+                finite = None
+            for c in range(channels):
+                column = values[:, c] if finite is None else values[:, c][finite[:, c]]
+                if column.size:
+                    self._merge(c, column.size, column.min().item(), column.max().item(), float(column.sum(dtype=numpy.float64)))
+            return
+        is_float = fmt in "efd"
+        for c in range(channels):
+            column = values[c:usable:channels]
+            self.zeros += column.count(0)
+            total = sum(column)
+            if is_float and not math.isfinite(total):
+                # Slow path only when the chunk holds NaN/Inf values
+                finite = [v for v in column if math.isfinite(v)]
+                nan = sum(1 for v in column if v != v)
+                self.nan += nan
+                self.inf += len(column) - len(finite) - nan
+                column = finite
+                total = math.fsum(column)
+            if len(column):
+                self._merge(c, len(column), min(column), max(column), total)
+
+    def _merge(self, c, count, lo, hi, total):
+        self.count[c] += count
+        self.min[c] = lo if self.min[c] is None else min(self.min[c], lo)
+        self.max[c] = hi if self.max[c] is None else max(self.max[c], hi)
+        self.sum[c] += total
+
+    def summary(self):
+        if not self.values:
+            return "no data"
+        def per_channel(values):
+            text = [("-" if v is None else f"{v:g}") for v in values]
+            return text[0] if len(text) == 1 else "(" + ", ".join(text) + ")"
+        means = [(s / n if n else None) for s, n in zip(self.sum, self.count)]
+        text = (f"min={per_channel(self.min)} max={per_channel(self.max)} mean={per_channel(means)}"
+                f" nan={self.nan} inf={self.inf} zero={100.0 * self.zeros / self.values:.1f}%")
+        if self.sampled or self.partial:
+            text += " ~sampled" if self.sampled and not self.partial else " ~partial"
+        return text
+
+class PointStats:
+    """Axis aligned bounding box and centroid of a point cloud (points with a
+    NaN/Inf coordinate are counted as invalid and left out), plus the number of
+    degenerate points (all coordinates zero), accumulated by chunks."""
+    def __init__(self, channels):
+        self.channels = channels
+        self.count = 0                  # valid points
+        self.min = [None] * channels
+        self.max = [None] * channels
+        self.sum = [0.0] * channels
+        self.invalid = 0
+        self.degenerate = 0
+        self.values = 0                 # all points seen
+        self.sampled = False
+        self.partial = False
+
+    def add(self, raw, fmt, byte_order=lldb.eByteOrderLittle):
+        values = decode_array(raw, fmt, byte_order)
+        channels = self.channels
+        points = len(values) // channels
+        self.values += points
+        if numpy is not None:
+            values = values[:points * channels].reshape(-1, channels)
+            self.degenerate += int(numpy.count_nonzero(~values.any(axis=1)))
+            if values.dtype.kind == "f":
+                valid = numpy.isfinite(values).all(axis=1)
+                self.invalid += int(points - numpy.count_nonzero(valid))
+                values = values[valid]
+            if len(values):
+                self._merge(len(values), values.min(axis=0).tolist(), values.max(axis=0).tolist(),
+                            values.sum(axis=0, dtype=numpy.float64).tolist())
+            return
+        columns = [values[c:points * channels:channels] for c in range(channels)]
+        self.degenerate += sum(1 for point in zip(*columns) if not any(point))
+        totals = [sum(column) for column in columns]
+        if fmt in "efd" and not all(math.isfinite(total) for total in totals):
+            # Slow path only when the chunk holds NaN/Inf coordinates
+            valid = [point for point in zip(*columns) if all(math.isfinite(v) for v in point)]
+            self.invalid += points - len(valid)
+            columns = [[point[c] for point in valid] for c in range(channels)]
+            totals = [math.fsum(column) for column in columns]
+        if len(columns[0]):
+            self._merge(len(columns[0]), [min(column) for column in columns],
+                        [max(column) for column in columns], totals)
+
+    def _merge(self, count, lo, hi, total):
+        self.count += count
+        for c in range(self.channels):
+            self.min[c] = lo[c] if self.min[c] is None else min(self.min[c], lo[c])
+            self.max[c] = hi[c] if self.max[c] is None else max(self.max[c], hi[c])
+            self.sum[c] += total[c]
+
+    def summary(self):
+        if not self.values:
+            return "no data"
+        def point(values):
+            return "(" + ", ".join(f"{v:g}" for v in values) + ")"
+        if self.count:
+            text = (f"aabb={point(self.min)}-{point(self.max)}"
+                    f" centroid={point(s / self.count for s in self.sum)}")
+        else:
+            text = "aabb=empty"
+        text += f" invalid={self.invalid} degenerate={self.degenerate}"
+        if self.sampled or self.partial:
+            text += " ~sampled" if self.sampled and not self.partial else " ~partial"
+        return text
+
+def reduce_buffer(stats, process, address, rows, row_bytes, step, fmt, channels,
+                  byte_order=lldb.eByteOrderLittle, time_limit=None, cancelled=None):
+    """Feed a strided 2D buffer to `stats` (BufferStats, PointStats) in chunks,
+    within STATS_BYTE_BUDGET and `time_limit` (STATS_TIME_LIMIT by default).
+    `cancelled()` is polled between chunks, and stops the reduction when it
+    returns True."""
+    item_size = struct.calcsize(fmt) * channels
+    total = rows * row_bytes
+    budget = STATS_BYTE_BUDGET if numpy is not None else STATS_BYTE_BUDGET // 16
+    # When sampling, use smaller chunks so the samples spread over the whole buffer
+    chunk_bytes = min(CHUNK_BYTES, max(item_size, budget // 8))
+    every = max(1, math.ceil(total / max(1, budget)))
+    stats.sampled = every > 1
+    deadline = time.perf_counter() + (STATS_TIME_LIMIT if time_limit is None else time_limit)
+    for _, raw in iter_chunks(process, address, rows, row_bytes, step, item_size, chunk_bytes, every):
+        if raw is None or time.perf_counter() > deadline or (cancelled is not None and cancelled()):
+            stats.partial = True
+            break
+        stats.add(raw, fmt, byte_order)
+    return stats
+
+def buffer_stats(process, address, rows, row_bytes, step, fmt, channels, byte_order=lldb.eByteOrderLittle,
+                 time_limit=None, cancelled=None):
+    """Statistics of a strided 2D scalar buffer (see reduce_buffer)."""
+    return reduce_buffer(BufferStats(channels), process, address, rows, row_bytes, step, fmt, channels,
+                         byte_order, time_limit, cancelled)
+
+def point_stats(process, address, count, fmt, channels, byte_order=lldb.eByteOrderLittle,
+                time_limit=None, cancelled=None):
+    """Bounding box, centroid and invalid points of `count` packed points of
+    `channels` coordinates each (see reduce_buffer)."""
+    size = struct.calcsize(fmt) * channels * count
+    return reduce_buffer(PointStats(channels), process, address, 1, size, size, fmt, channels,
+                         byte_order, time_limit, cancelled)
@@ -0,0 +1,116 @@
+# image_formatters.py
+# mve::Image / mve::TypedImageBase and open3d::geometry::Image, shown like a
+# cv::Mat: the header is decoded into an opencv_formatters.MatHeader, so the
+# summary, the paged pixel rows, the statistics and the cvdump / bufdiff
+# commands are those of cv::Mat. Pixels are read straight from the buffer of
+# the std::vector holding them.
+import lldb
+import re
+
+import formatter_profiling
+import formatter_utils
+import lldb_formatters
+import opencv_formatters
+
+def __lldb_init_module(debugger, internal_dict):
+    lldb_formatters.register(debugger, __name__)
+    print("Image LLDB Formatters loaded.")
+
+MVE_IMAGE_RE = re.compile(r"^mve::(TypedImageBase|Image)<.+>$")
+OPEN3D_IMAGE = "open3d::geometry::Image"
+
+# struct format -> (summary name, element C type, element size, struct format)
+IMAGE_DEPTHS = dict((entry[3], entry) for entry in opencv_formatters.MAT_DEPTHS.values())
+IMAGE_DEPTHS.update({
+    "I": ("UINT32", "uint32_t", 4, "I"),
+    "q": ("INT64", "int64_t", 8, "q"),
+    "Q": ("UINT64", "uint64_t", 8, "Q"),
+})
+
+# open3d bytes_per_channel_ -> struct format (as in Open3D.natvis)
+OPEN3D_FORMATS = {1: "B", 2: "H", 4: "f", 8: "d"}
+
+def get_member_int(valobj, name):
+    return max(0, valobj.GetChildMemberWithName(name).GetValueAsSigned(0))
+
+def decode_image(valobj):
+    """MatHeader of an mve or open3d image, or None for other types."""
+    valobj = valobj.GetNonSyntheticValue()
+    type_name = valobj.GetType().GetCanonicalType().GetName()
+    if MVE_IMAGE_RE.match(type_name):
+        return decode_mve(valobj)
+    if type_name == OPEN3D_IMAGE:
+        return decode_open3d(valobj)
+    return None
+
+def decode_mve(valobj):
+    fmt = formatter_utils.scalar_format(get_pixel_type(valobj))
+    return decode_vector_image(valobj, get_member_int(valobj, "h"), get_member_int(valobj, "w"),
+                               get_member_int(valobj, "c"), fmt, "data")
+
+def decode_open3d(valobj):
+    fmt = OPEN3D_FORMATS.get(get_member_int(valobj, "bytes_per_channel_"))
+    return decode_vector_image(valobj, get_member_int(valobj, "height_"), get_member_int(valobj, "width_"),
+                               get_member_int(valobj, "num_of_channels_"), fmt, "data_")
+
+def decode_vector_image(valobj, rows, cols, channels, fmt, data_name):
+    """Continuous rows x cols x channels image of `fmt` scalars stored in the
+    std::vector member `data_name`; rows past the end of the vector are dropped."""
+    image = opencv_formatters.MatHeader()
+    image.rows, image.cols, image.channels = rows, cols, max(1, channels)
+    if fmt not in IMAGE_DEPTHS:
+        return image # no pixel rows for element types without a scalar layout
+    image.depth_name, image.type_name, image.elem_size, image.fmt = IMAGE_DEPTHS[fmt]
+    image.row_bytes = image.step = image.cols * image.channels * image.elem_size
+    span = formatter_utils.vector_range(valobj.GetChildMemberWithName(data_name))
+    if span is not None and span[0]:
+        image.data_addr = span[0]
+        if image.row_bytes:
+            image.rows = min(image.rows, (span[1] - span[0]) // image.row_bytes)
+    return image
+
+def get_pixel_type(valobj):
+    """Template argument T of mve::Image<T>."""
+    return valobj.GetType().GetCanonicalType().GetTemplateArgumentType(0)
+
+def get_image_header(valobj):
+    return formatter_utils.get_value_state(valobj.GetNonSyntheticValue(), "image", decode_image)
+
+# ------------------------------------------------------------------------------
+# Summary: "{FLOAT32, 3 x 640 x 480}" (as cv::Mat, with the same statistics)
+# Children: rows, cols, channels, type, step, data, then the pixel rows [r]
+# ------------------------------------------------------------------------------
+@formatter_profiling.summary
+def ImageSummaryProvider(valobj, internal_dict):
+    image = get_image_header(valobj)
+    if image is None:
+        return "{invalid}"
+    summary = f"{{{image.depth_name}, {image.channels} x {image.cols} x {image.rows}}}"
+    if formatter_utils.STATS_SUMMARY and image.data_addr and image.row_bytes:
+        stats = opencv_formatters.get_mat_stats(valobj, image)
+        if stats is not None:
+            summary += " " + stats
+    return summary
+
+class ImageSyntheticProvider(opencv_formatters.CVMatSyntheticProvider):
+    """cv::Mat children over the std::vector buffer of an mve or open3d image."""
+    def get_header(self):
+        return get_image_header(self.valobj) or opencv_formatters.MatHeader()
+
+    def get_element_type(self):
+        if MVE_IMAGE_RE.match(self.valobj.GetType().GetCanonicalType().GetName()):
+            return get_pixel_type(self.valobj)
+        return formatter_utils.find_type(self.valobj.GetTarget(), self.type_name)
+
+    def get_row_type(self):
+        element = self.get_element_type()
+        if not element.IsValid():
+            return None
+        return element.GetArrayType(self.cols * self.channels)
+
+    def get_data(self):
+        element = self.get_element_type()
+        if not self.mat.data_addr or not element.IsValid():
+            return formatter_utils.create_scalar(self.valobj, "data", self.mat.data_addr,
+                                                 lldb.eBasicTypeUnsignedLongLong)
+        return formatter_utils.create_pointer(self.valobj, "data", self.mat.data_addr, element)
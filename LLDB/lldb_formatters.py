@@ -0,0 +1,217 @@
+# lldb_formatters.py
+# Single entry point of the LLDB formatters:
+#
+#   command script import /path/to/LLDB/lldb_formatters.py
+#
+# registers every summary, synthetic provider and command through the SB API
+# into the "visualizers" category (`type category disable visualizers` turns
+# them all off). The formatter modules are not imported here: LLDB is handed
+# small stubs that import their module the first time a value needs it.
+#
+# The formatter modules can still be imported one by one; each registers its
+# own rows of FORMATTERS into the same category.
+#
+# The natvis types without a hand-written formatter are then added from the
+# .natvis files, compiled by natvis_compiler.py (set natvis_compiler.NATVIS to
+# False before importing to skip them).
+import importlib
+import re
+
+import lldb
+
+CATEGORY = "visualizers"
+
+# (kind, regex, module, attribute, expand)
+# kind is "summary", "synthetic" or "summary-string" (attribute is then the
+# summary string); expand shows the children of a summarized value. Regexes
+# are anchored and start with a literal namespace where possible, so LLDB
+# rejects most type names after a few characters.
+FORMATTERS = [
+    # Eigen dense matrices, arrays and views
+    ("synthetic", "^Eigen::(Matrix|Array|Map|Ref|Block)<.+>$", "eigen_formatters", "EigenMatrixSyntheticProvider", False),
+    ("summary", "^Eigen::(Matrix|Array|Map|Ref|Block)<.+>$", "eigen_formatters", "EigenMatrixSummaryProvider", False),
+    ("summary", "^Eigen::Quaternion<.+>$", "eigen_formatters", "EigenQuaternionSummaryProvider", False),
+    ("synthetic", "^Eigen::Quaternion<.+>$", "eigen_formatters", "EigenQuaternionSyntheticProvider", False),
+    ("summary", "^Eigen::SparseMatrix<.+>$", "eigen_formatters", "EigenSparseMatrixSummaryProvider", False),
+    ("synthetic", "^Eigen::SparseMatrix<.+>$", "eigen_formatters", "EigenSparseMatrixSyntheticProvider", False),
+    # OpenCV
+    ("synthetic", "^cv::Mat$", "opencv_formatters", "CVMatSyntheticProvider", False),
+    ("summary", "^cv::Mat$", "opencv_formatters", "CVMatSummaryProvider", False),
+    ("summary", "^cv::Point_<.+>$", "opencv_formatters", "PointSummary", False),
+    ("summary", "^cv::Point3_<.+>$", "opencv_formatters", "Point3Summary", False),
+    ("summary", "^((SEACAVE|SFM)::)?TPoint2(<.+>)?$", "opencv_formatters", "PointSummary", False),
+    ("summary", "^((SEACAVE|SFM)::)?TPoint3(<.+>)?$", "opencv_formatters", "Point3Summary", False),
+    ("summary", "^cv::Size_<.+>$", "opencv_formatters", "SizeSummary", False),
+    ("summary", "^cv::Rect_<.+>$", "opencv_formatters", "RectSummary", False),
+    ("summary", "^cv::RotatedRect$", "opencv_formatters", "RotatedRectSummary", False),
+    ("summary", "^cv::Range$", "opencv_formatters", "RangeSummary", False),
+    ("synthetic", "^cv::(Scalar_|Vec)<.+>$", "opencv_formatters", "VecSyntheticProvider", False),
+    ("synthetic", "^(cv::Matx|((SEACAVE|SFM)::)?TMatrix)<.+>$", "opencv_formatters", "MatxSyntheticProvider", False),
+    ("summary", "^(cv::Matx|((SEACAVE|SFM)::)?TMatrix)<.+>$", "opencv_formatters", "MatxSummary", False),
+    ("synthetic", "^cv::Ptr<.+>$", "opencv_formatters", "PtrSyntheticProvider", False),
+    ("summary", "^cv::Ptr<.+>$", "opencv_formatters", "PtrSummary", False),
+    ("summary", "^cv::AutoBuffer<.+>$", "opencv_formatters", "AutoBufferSummary", False),
+    ("synthetic", "^cv::AutoBuffer<.+>$", "opencv_formatters", "AutoBufferSyntheticProvider", False),
+    ("summary", "^cv::Complex<.+>$", "opencv_formatters", "ComplexSummary", False),
+    ("summary-string", "^cv::Exception$", "opencv_formatters", "${var.msg}", False),
+    # mve and Open3D images
+    ("summary", "^mve::(TypedImageBase|Image)<.+>$", "image_formatters", "ImageSummaryProvider", False),
+    ("synthetic", "^mve::(TypedImageBase|Image)<.+>$", "image_formatters", "ImageSyntheticProvider", False),
+    ("summary", "^open3d::geometry::Image$", "image_formatters", "ImageSummaryProvider", False),
+    ("synthetic", "^open3d::geometry::Image$", "image_formatters", "ImageSyntheticProvider", False),
+    # SEACAVE
+    ("summary", "^SEACAVE::cList<.+>$", "seacave_formatters", "cList_summary", True),
+    ("synthetic", "^SEACAVE::cList<.+>$", "seacave_formatters", "cListSyntheticProvider", False),
+    ("summary", "^(SEACAVE|SFM)::(TDMatrix|TImage|TImageX)<.+>$", "seacave_formatters", "TDMatrix_summary", False),
+    ("synthetic", "^(SEACAVE|SFM)::(TDMatrix|TImage|TImageX)<.+>$", "seacave_formatters", "TDMatrixSyntheticProvider", False),
+    ("summary", "^SEACAVE::TAABB<.+>$", "seacave_formatters", "TAABB_summary", False),
+    ("synthetic", "^SEACAVE::TAABB<.+>$", "seacave_formatters", "TAABBSyntheticProvider", False),
+    # tinyxml2
+    ("summary", "^tinyxml2::StrPair$", "tinyxml2_formatters", "StrPairSummary", False),
+    ("summary", "^tinyxml2::XML(Node|Document|Text|Comment|Declaration|Unknown)$", "tinyxml2_formatters", "XMLNodeSummary", False),
+    ("synthetic", "^tinyxml2::XML(Node|Document|Text|Comment|Declaration|Unknown)$", "tinyxml2_formatters", "XMLNodeSyntheticProvider", False),
+    ("summary", "^tinyxml2::XMLElement$", "tinyxml2_formatters", "XMLElementSummary", False),
+    ("synthetic", "^tinyxml2::XMLElement$", "tinyxml2_formatters", "XMLElementSyntheticProvider", False),
+    ("summary", "^tinyxml2::XMLAttribute$", "tinyxml2_formatters", "XMLAttributeSummary", False),
+    ("synthetic", "^tinyxml2::XMLAttribute$", "tinyxml2_formatters", "XMLAttributeSyntheticProvider", False),
+    # pmp
+    ("summary", "^pmp::(Vertex|Halfedge|Edge|Face)$", "pmp_formatters", "HandleSummary", False),
+    ("synthetic", "^pmp::(Vertex|Halfedge|Edge|Face)$", "pmp_formatters", "HandleSyntheticProvider", False),
+]
+
+# (command, module, function, help)
+COMMANDS = [
+    ("cvdump", "opencv_formatters", "cvdump_command",
+     "Write a cv::Mat, Eigen matrix, SEACAVE::TImage, mve or Open3D image buffer to a .npy, .pfm or .png file."),
+    ("bufdiff", "opencv_formatters", "bufdiff_command",
+     "Report which tiles of a cv::Mat, Eigen matrix or cList buffer changed since the last call."),
+    ("pmp-mesh", "pmp_formatters", "pmp_mesh_command",
+     "Bind the pmp::SurfaceMesh that pmp handles are resolved through."),
+    ("formatter-stats", "formatter_profiling", "formatter_stats_command",
+     "Per-formatter latency and bytes read."),
+    ("formatter-snapshot", "formatter_snapshot", "snapshot_command",
+     "Capture type layouts and the memory the formatters read for offline replay."),
+]
+# Modules whose commands serve all formatter modules
+SHARED_MODULES = ("formatter_profiling", "formatter_snapshot")
+
+# (kind, regex, python name) of every formatter added to a debugger, by the
+# name of the formatter itself rather than of its stub
+registered = []
+
+_resolved = {}      # (module, attribute) -> function or class
+_decisions = {}     # type name -> (summary, synthetic) python names
+_patterns = None    # compiled regexes of `registered`
+_commands = set()   # (debugger id, command)
+
+def resolve(module, attribute):
+    """The formatter `module.attribute`, importing its module on first use."""
+    key = (module, attribute)
+    target = _resolved.get(key)
+    if target is None:
+        target = _resolved[key] = getattr(importlib.import_module(module), attribute)
+        import formatter_profiling
+        if formatter_profiling.ENABLED:
+            formatter_profiling.enable() # wrap the provider classes just loaded
+    return target
+
+def _stub(module, attribute):
+    """Stand-in handed to LLDB: a summary function, or a synthetic provider
+    factory (LLDB only calls the class to build an instance)."""
+    def stub(valobj, internal_dict):
+        return resolve(module, attribute)(valobj, internal_dict)
+    stub.__name__ = stub.__qualname__ = attribute
+    return stub
+
+def _command_stub(module, function):
+    def stub(debugger, command, exe_ctx, result, internal_dict):
+        return resolve(module, function)(debugger, command, exe_ctx, result, internal_dict)
+    stub.__name__ = stub.__qualname__ = function
+    return stub
+
+for _kind, _regex, _module, _attribute, _expand in FORMATTERS:
+    if _kind != "summary-string":
+        globals().setdefault(_attribute, _stub(_module, _attribute))
+for _name, _module, _function, _help in COMMANDS:
+    globals().setdefault(_function, _command_stub(_module, _function))
+
+def get_category(debugger):
+    category = debugger.GetCategory(CATEGORY)
+    if not category.IsValid():
+        category = debugger.CreateCategory(CATEGORY)
+    return category
+
+def add_formatter(category, kind, regex, name, expand=False, target=None):
+    """Add one formatter for the type names matching `regex` to `category`,
+    with the defaults of `type summary add` / `type synthetic add`. `target` is
+    the function or class `name` stands for, when `name` is a lazy stub."""
+    global _patterns
+    spec = lldb.SBTypeNameSpecifier(regex, True)
+    if kind == "synthetic":
+        category.AddTypeSynthetic(spec, lldb.SBTypeSynthetic.CreateWithClassName(name, lldb.eTypeOptionCascade))
+    else:
+        options = lldb.eTypeOptionCascade
+        if not expand:
+            options |= lldb.eTypeOptionHideChildren
+        if kind == "summary-string":
+            summary = lldb.SBTypeSummary.CreateWithSummaryString(name, options)
+        else:
+            summary = lldb.SBTypeSummary.CreateWithFunctionName(name, options)
+        category.AddTypeSummary(spec, summary)
+    entry = ("summary" if kind == "summary-string" else kind, regex, target or name)
+    if entry not in registered:
+        registered.append(entry)
+        _patterns = None
+        _decisions.clear()
+
+def add_command(debugger, command, function, help_text):
+    """Add a Python command once per debugger."""
+    if (debugger.GetID(), command) in _commands:
+        return
+    _commands.add((debugger.GetID(), command))
+    debugger.HandleCommand(f'command script add -h "{help_text}" -f {function} {command}')
+
+def register(debugger, module=None):
+    """Register the formatters and commands of `module`, by their own names, or
+    of all modules through the lazy stubs of this module."""
+    category = get_category(debugger)
+    for kind, regex, owner, attribute, expand in FORMATTERS:
+        if module is not None and owner != module:
+            continue
+        if kind == "summary-string":
+            add_formatter(category, kind, regex, attribute, expand)
+        else:
+            target = f"{owner}.{attribute}"
+            add_formatter(category, kind, regex, target if module is not None else f"{__name__}.{attribute}",
+                          expand, target)
+    for command, owner, function, help_text in COMMANDS:
+        if module is not None and owner != module and owner not in SHARED_MODULES:
+            continue
+        name = f"{owner}.{function}" if module is not None else f"{__name__}.{function}"
+        add_command(debugger, command, name, help_text)
+    if module is None:
+        import natvis_compiler
+        if natvis_compiler.NATVIS:
+            natvis_compiler.register(debugger)
+    category.SetEnabled(True)
+
+def lookup(type_name):
+    """(summary, synthetic) python names registered for `type_name`, either None;
+    memoized, for scripts matching many values (LLDB matches its own regexes)."""
+    global _patterns
+    decision = _decisions.get(type_name)
+    if decision is None:
+        if _patterns is None:
+            _patterns = [(kind, re.compile(regex), name) for kind, regex, name in registered]
+        summary = synthetic = None
+        for kind, pattern, name in _patterns:
+            if pattern.match(type_name):
+                if kind == "summary" and summary is None:
+                    summary = name
+                elif kind == "synthetic" and synthetic is None:
+                    synthetic = name
+        decision = _decisions[type_name] = (summary, synthetic)
+    return decision
+
+def __lldb_init_module(debugger, internal_dict):
+    register(debugger)
@@ -0,0 +1,589 @@
+# natvis_compiler.py
+# Compile the .natvis files of this repository into LLDB formatter modules.
+#
+# Every <Type> with a DisplayString or an Expand becomes a row of a generated
+# Python module: display strings, conditions, <Item>, <Synthetic>,
+# <ArrayItems> (with Rank and Direction), <LinkedListItems> and <ExpandedItem>
+# are translated once into Python expressions over natvis_runtime helpers,
+# which read members by path from the SBValue (no expression evaluator, so
+# they also work on core files). Types of the same template share one regex
+# and the most specific natvis type is chosen per value, as Visual Studio does.
+#
+# Generated modules are cached in NATVIS_CACHE, keyed by a hash of the source
+# file and of this compiler, and rebuilt only when one of them changes.
+# Types that a hand-written formatter of lldb_formatters.FORMATTERS already
+# handles keep the hand-written one.
+#
+#   python3 LLDB/natvis_compiler.py             compile and list what is covered
+#   python3 LLDB/natvis_compiler.py -v X.natvis also list skipped elements
+import glob
+import hashlib
+import importlib.util
+import os
+import re
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# ------------------------------------------------------------------------------
+# Settings
+# ------------------------------------------------------------------------------
+# Compile and register the natvis files when lldb_formatters is imported.
+NATVIS = True
+# Directories searched for *.natvis files.
+NATVIS_DIRS = [os.path.dirname(HERE)]
+# Where generated modules are kept between sessions.
+NATVIS_CACHE = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+                            "lldb-visualizers", "natvis")
+
+class NatvisError(Exception):
+    """An expression or element the compiler does not support."""
+
+# ------------------------------------------------------------------------------
+# Expressions
+# ------------------------------------------------------------------------------
+TOKEN_RE = re.compile(r"""\s*(?:
+    (?P<number>0[xX][0-9a-fA-F]+[uUlL]*|(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?[uUlLfF]*)
+  | (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<param>\$T\d+|\$i)
+  | (?P<name>[A-Za-z_]\w*(?:::[A-Za-z_]\w*)*)
+  | (?P<op>->|<<|>>|<=|>=|==|!=|&&|\|\||[-+*/%&|^~!<>?:()\[\].,])
+)""", re.VERBOSE)
+
+TYPE_WORDS = {"bool", "char", "short", "int", "long", "float", "double", "unsigned", "signed", "const",
+              "void", "size_t", "int8_t", "uint8_t", "int16_t", "uint16_t", "int32_t", "uint32_t",
+              "int64_t", "uint64_t", "uchar", "ushort", "uint"}
+
+# Binary operators: precedence (higher binds tighter), code template, and
+# whether the operands are converted to Python numbers first
+BINARY = {
+    "||": (1, "(truth({a}) or truth({b}))", False),
+    "&&": (2, "(truth({a}) and truth({b}))", False),
+    "|": (3, "({a} | {b})", True),
+    "^": (4, "({a} ^ {b})", True),
+    "&": (5, "({a} & {b})", True),
+    "==": (6, "eq({a}, {b})", False),
+    "!=": (6, "(not eq({a}, {b}))", False),
+    "<": (7, "({a} < {b})", True),
+    ">": (7, "({a} > {b})", True),
+    "<=": (7, "({a} <= {b})", True),
+    ">=": (7, "({a} >= {b})", True),
+    "<<": (8, "({a} << {b})", True),
+    ">>": (8, "({a} >> {b})", True),
+    "+": (9, "add({a}, {b})", False),
+    "-": (9, "sub({a}, {b})", False),
+    "*": (10, "({a} * {b})", True),
+    "/": (10, "div({a}, {b})", False),
+    "%": (10, "mod({a}, {b})", False),
+}
+
+class Number(str):
+    """Code of a subexpression that evaluates to a Python number."""
+
+def tokenize(source):
+    tokens = []
+    pos = 0
+    source = source.rstrip()
+    while pos < len(source):
+        match = TOKEN_RE.match(source, pos)
+        if match is None or match.end() == pos:
+            raise NatvisError(f"cannot parse '{source[pos:]}'")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        pos = match.end()
+    return tokens
+
+class Parser:
+    """C++ expression subset of natvis, compiled to a Python expression over
+    the natvis_runtime helpers. Nodes are kept as (root code, path) while
+    they are member paths, so 'a.b->c[2]' becomes a single
+    GetValueForExpressionPath('.a.b->c[2]') call."""
+    def __init__(self, source, loop=False):
+        self.source = source
+        self.tokens = tokenize(source)
+        self.pos = 0
+        self.loop = loop
+
+    def peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def take(self, value=None):
+        token = self.peek()
+        if value is not None and token[1] != value:
+            raise NatvisError(f"expected '{value}' in '{self.source}'")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.ternary()
+        if self.pos != len(self.tokens):
+            raise NatvisError(f"unexpected '{self.peek()[1]}' in '{self.source}'")
+        return code(node)
+
+    def ternary(self):
+        condition = self.binary(1)
+        if self.peek()[1] == "?":
+            self.take()
+            yes = self.ternary()
+            self.take(":")
+            no = self.ternary()
+            return f"({code(yes)} if truth({code(condition)}) else {code(no)})"
+        return condition
+
+    def binary(self, level):
+        left = self.unary()
+        while True:
+            kind, value = self.peek()
+            if kind != "op" or value not in BINARY or BINARY[value][0] < level:
+                return left
+            self.take()
+            right = self.binary(BINARY[value][0] + 1)
+            _, template, numeric = BINARY[value]
+            convert = number if numeric else code
+            left = Number(template.format(a=convert(left), b=convert(right)))
+
+    def cast_type(self):
+        """Type name of a C cast starting at the current '(', or None."""
+        end = self.pos + 1
+        words = []
+        while end < len(self.tokens) and self.tokens[end][1] != ")":
+            kind, value = self.tokens[end]
+            if kind not in ("name", "param") and value != "*":
+                return None
+            words.append(value)
+            end += 1
+        if not words or end + 1 >= len(self.tokens):
+            return None
+        follower = self.tokens[end + 1]
+        if follower[0] == "op" and follower[1] not in ("(", "*", "-", "!", "~", "&"):
+            return None
+        if words[-1] != "*" and not all(word in TYPE_WORDS or word.startswith("$T") for word in words):
+            return None
+        self.pos = end + 1
+        return " ".join(words).replace(" *", "*")
+
+    def unary(self):
+        kind, value = self.peek()
+        if value == "(":
+            name = self.cast_type()
+            if name is not None:
+                return f"cast(v, T, {code(self.unary())}, {name!r})"
+        if kind == "op" and value in ("-", "+", "!", "~", "*", "&"):
+            self.take()
+            operand = self.unary()
+            if value == "-":
+                return Number(f"(-{number(operand)})")
+            if value == "+":
+                return Number(number(operand))
+            if value == "!":
+                return Number(f"(not truth({code(operand)}))")
+            if value == "~":
+                return Number(f"(~{number(operand)})")
+            if value == "*":
+                return f"dr({code(operand)})"
+            raise NatvisError(f"address-of in '{self.source}'")
+        return self.postfix(self.primary())
+
+    def postfix(self, node):
+        while True:
+            value = self.peek()[1]
+            if value in (".", "->"):
+                self.take()
+                kind, member = self.take()
+                if kind != "name":
+                    raise NatvisError(f"expected a member name in '{self.source}'")
+                node = extend(node, value + member)
+            elif value == "[":
+                self.take()
+                index = self.ternary()
+                self.take("]")
+                if isinstance(index, Number) and index.isdigit():
+                    node = extend(node, f"[{index}]")
+                else:
+                    node = f"ix({code(node)}, {code(index)})"
+            elif value == "(":
+                raise NatvisError(f"function call in '{self.source}'")
+            else:
+                return node
+
+    def primary(self):
+        kind, value = self.take()
+        if kind == "number":
+            if value[:2].lower() == "0x":
+                return Number(repr(int(value.rstrip("uUlL"), 16)))
+            text = value.rstrip("uUlLfF")
+            return Number(repr(float(text) if re.search(r"[.eE]", text) else int(text)))
+        if kind == "string":
+            literal = value[1:-1].encode().decode("unicode_escape")
+            return f"subst(T, {literal!r})" if "$T" in literal else repr(literal)
+        if kind == "param":
+            if value == "$i":
+                if not self.loop:
+                    raise NatvisError(f"$i outside of a Size in '{self.source}'")
+                return Number("i")
+            return f"targ(T, {int(value[2:])})"
+        if kind == "name":
+            if value in ("true", "false"):
+                return Number(repr(value == "true"))
+            if value in ("nullptr", "NULL"):
+                return Number("0")
+            if value == "this":
+                return "this(v)"
+            if value == "sizeof":
+                self.take("(")
+                words = []
+                while self.peek()[1] not in (")", None):
+                    words.append(self.take()[1])
+                self.take(")")
+                return Number(f"sizeof(v, T, {' '.join(words).replace(' *', '*')!r})")
+            if "::" in value:
+                raise NatvisError(f"qualified name '{value}' in '{self.source}'")
+            return ("v", "." + value)
+        if value == "(":
+            node = self.ternary()
+            self.take(")")
+            return node
+        raise NatvisError(f"unexpected '{value}' in '{self.source}'")
+
+def extend(node, step):
+    """Append `.member`, `->member` or `[index]` to a member path node."""
+    if isinstance(node, tuple):
+        return (node[0], node[1] + step)
+    return (node, step)
+
+def code(node):
+    if isinstance(node, tuple):
+        return f"p({node[0]}, {node[1]!r})"
+    return node
+
+def number(node):
+    return node if isinstance(node, Number) else f"n({code(node)})"
+
+def compile_expression(source, loop=False):
+    """Python source of `lambda v, T: <source>` (with `i` for Size elements)."""
+    body = Parser(source.strip(), loop).parse()
+    return f"lambda v, T, i=0: {body}" if loop else f"lambda v, T: {body}"
+
+def split_spec(hole):
+    """(expression, format specifier) of a {expression,spec} hole."""
+    depth = 0
+    quoted = False
+    for i in range(len(hole) - 1, -1, -1):
+        ch = hole[i]
+        if ch == '"':
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif ch in ")]":
+            depth += 1
+        elif ch in "([":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            return hole[:i].strip(), hole[i + 1:].strip()
+    return hole.strip(), None
+
+def compile_display(text):
+    """Python source of a function rendering a DisplayString."""
+    parts = []
+    pos = 0
+    literal = []
+    text = text or ""
+    while pos < len(text):
+        ch = text[pos]
+        if text.startswith("{{", pos) or text.startswith("}}", pos):
+            literal.append(ch)
+            pos += 2
+        elif ch == "{":
+            end = text.find("}", pos)
+            if end < 0:
+                raise NatvisError(f"unterminated '{{' in '{text}'")
+            if literal:
+                parts.append(repr("".join(literal)))
+                literal = []
+            expression, spec = split_spec(text[pos + 1:end])
+            body = Parser(expression).parse()
+            length = "None"
+            if spec:
+                match = re.fullmatch(r"\[(.+)\](\w*)", spec)
+                if match:
+                    length = Parser(match.group(1)).parse()
+                    spec = match.group(2) or None
+                elif spec.startswith("view(") or spec.startswith("na") or spec in ("nr", "nd", "nvo", "en", "e", "g"):
+                    spec = None
+            parts.append(f"text({body}, {spec!r}, {length})")
+            pos = end + 1
+        else:
+            literal.append(ch)
+            pos += 1
+    if literal:
+        parts.append(repr("".join(literal)))
+    if not parts:
+        return "lambda v, T: ''"
+    return f"lambda v, T: {' + '.join(parts)}"
+
+# ------------------------------------------------------------------------------
+# Natvis files
+# ------------------------------------------------------------------------------
+def local(element):
+    return element.tag.rsplit("}", 1)[-1]
+
+def children(element, tag):
+    return [child for child in element if local(child) == tag]
+
+def child_text(element, tag):
+    found = children(element, tag)
+    return found[0].text.strip() if found and found[0].text else None
+
+class Compiled:
+    """What was compiled from one natvis file, and what was skipped."""
+    def __init__(self, path):
+        self.path = path
+        self.types = []     # (names, displays, expand) with Python sources
+        self.skipped = []   # (type name, reason)
+
+def tuple_source(items):
+    return "(" + "".join(f"{item}, " for item in items).rstrip() + ")"
+
+def compile_condition(element):
+    condition = element.get("Condition")
+    return compile_expression(condition) if condition else "None"
+
+def compile_displays(element, type_name, compiled):
+    displays = []
+    for display in children(element, "DisplayString"):
+        try:
+            displays.append(f"({compile_condition(display)}, {compile_display(display.text)})")
+        except NatvisError as e:
+            compiled.skipped.append((type_name, f"DisplayString: {e}"))
+    return displays
+
+def compile_expand(expand, type_name, compiled):
+    rows = []
+    for element in expand:
+        if not isinstance(element.tag, str):
+            continue
+        tag = local(element)
+        name = element.get("Name")
+        try:
+            condition = compile_condition(element)
+            if tag == "Item":
+                rows.append(f"('item', {name!r}, {condition}, {compile_expression(element.text or '')})")
+            elif tag == "Synthetic":
+                displays = compile_displays(element, type_name, compiled)
+                rows.append(f"('synthetic', {name!r}, {condition}, {tuple_source(displays)})")
+            elif tag == "ExpandedItem":
+                rows.append(f"('expanded', None, {condition}, {compile_expression(element.text or '')})")
+            elif tag == "ArrayItems":
+                rank = int(child_text(element, "Rank") or 1)
+                backward = (child_text(element, "Direction") or "Forward") == "Backward"
+                size = child_text(element, "Size")
+                pointer = child_text(element, "ValuePointer")
+                if size is None or pointer is None:
+                    raise NatvisError("ArrayItems needs Size and ValuePointer")
+                rows.append(f"('array', None, {condition}, ({rank}, {backward}, "
+                            f"{compile_expression(size, loop=True)}, {compile_expression(pointer)}))")
+            elif tag == "LinkedListItems":
+                size = child_text(element, "Size")
+                head = child_text(element, "HeadPointer")
+                next_node = child_text(element, "NextPointer")
+                value = child_text(element, "ValueNode")
+                if head is None or next_node is None or value is None:
+                    raise NatvisError("LinkedListItems needs HeadPointer, NextPointer and ValueNode")
+                rows.append(f"('list', None, {condition}, ({compile_expression(size) if size else None}, "
+                            f"{compile_expression(head)}, {compile_expression(next_node)}, "
+                            f"{compile_expression(value)}))")
+            else:
+                raise NatvisError(f"<{tag}> is not supported")
+        except (NatvisError, ValueError) as e:
+            compiled.skipped.append((type_name, f"{tag} {name or ''}: {e}".replace(" :", ":")))
+    return rows
+
+def compile_file(path):
+    """Parse the natvis file `path` into a Compiled."""
+    import xml.etree.ElementTree as ET
+    compiled = Compiled(path)
+    root = ET.parse(path).getroot()
+    for element in root:
+        if local(element) != "Type":
+            continue
+        type_name = element.get("Name")
+        names = [type_name] + [alternative.get("Name") for alternative in children(element, "AlternativeType")]
+        displays = compile_displays(element, type_name, compiled)
+        expand = children(element, "Expand")
+        rows = compile_expand(expand[0], type_name, compiled) if expand else []
+        if not displays and not rows:
+            continue # e.g. only a UIVisualizer
+        compiled.types.append((names, displays, rows, bool(expand)))
+    return compiled
+
+def family_regex(name):
+    """Anchored LLDB regex of the natvis types sharing the template of `name`."""
+    base = name.split("<", 1)[0].strip()
+    return "^" + re.escape(base).replace("\\:", ":") + ("<.+>$" if "<" in name else "$")
+
+def generate(compiled, digest):
+    """Python source of the formatter module of a Compiled."""
+    families = {}   # regex -> [type indices]
+    expands = {}
+    for index, (names, displays, rows, expand) in enumerate(compiled.types):
+        for regex in dict.fromkeys(family_regex(name) for name in names):
+            families.setdefault(regex, []).append(index)
+        expands[index] = expand
+    lines = [
+        f"# Generated by natvis_compiler.py from {os.path.basename(compiled.path)}; do not edit.",
+        f"DIGEST = {digest!r}",
+        "from natvis_runtime import *",
+        "",
+        "VISUALIZERS = [",
+    ]
+    for names, displays, rows, _ in compiled.types:
+        lines.append(f"    Visualizer({tuple(names)!r},")
+        lines.append("        (" + "".join(f"\n            {display}," for display in displays) + "),")
+        lines.append("        (" + "".join(f"\n            {row}," for row in rows) + ")),")
+    lines += ["]", "", "# (kind, regex, attribute, expand) rows registered by natvis_compiler.register", "FORMATTERS = ["]
+    definitions = []
+    for number, (regex, indices) in enumerate(families.items()):
+        members = ", ".join(f"VISUALIZERS[{index}]" for index in indices)
+        definitions += [
+            f"family{number} = Family([{members}])",
+            "",
+            f"def summary{number}(valobj, internal_dict):",
+            f"    return summary(family{number}, valobj)",
+            "",
+            f"class Synthetic{number}(Provider):",
+            f"    FAMILY = family{number}",
+            "",
+        ]
+        has_display = any(compiled.types[index][1] for index in indices)
+        has_rows = any(compiled.types[index][2] for index in indices)
+        expand = not any(expands[index] for index in indices)
+        if has_display:
+            lines.append(f"    ('summary', {regex!r}, 'summary{number}', {expand}),")
+        if has_rows:
+            lines.append(f"    ('synthetic', {regex!r}, 'Synthetic{number}', False),")
+    lines += ["]", ""] + definitions
+    lines.append("FAMILIES = {" + ", ".join(f"{regex!r}: family{number}"
+                                           for number, regex in enumerate(families)) + "}")
+    return "\n".join(lines) + "\n"
+
+# ------------------------------------------------------------------------------
+# Cache
+# ------------------------------------------------------------------------------
+def module_name(path):
+    return "natvis_" + re.sub(r"\W", "_", os.path.splitext(os.path.basename(path))[0]).lower()
+
+def source_digest(path):
+    digest = hashlib.sha1()
+    with open(__file__, "rb") as f:
+        digest.update(f.read())
+    with open(path, "rb") as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+def cached_digest(path):
+    """Digest recorded in a generated module, or None."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            f.readline()
+            line = f.readline()
+    except OSError:
+        return None
+    match = re.match(r"DIGEST = '(\w+)'", line)
+    return match.group(1) if match else None
+
+def build(path, cache=None):
+    """Path of the generated module of the natvis file `path`, compiled again
+    only if the natvis file (or this compiler) changed since it was cached."""
+    cache = cache or NATVIS_CACHE
+    digest = source_digest(path)
+    output = os.path.join(cache, module_name(path) + ".py")
+    if cached_digest(output) != digest:
+        source = generate(compile_file(path), digest)
+        os.makedirs(cache, exist_ok=True)
+        # Write then rename, so a concurrent session never imports half a file
+        temporary = f"{output}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(source)
+        os.replace(temporary, output)
+    return output
+
+def load(path, cache=None):
+    """The generated module of the natvis file `path`, built if needed."""
+    output = build(path, cache)
+    name = module_name(path)
+    module = sys.modules.get(name)
+    if module is not None and module.DIGEST == cached_digest(output):
+        return module
+    spec = importlib.util.spec_from_file_location(name, output)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    # lldb_formatters.resolve finds the formatters by module name
+    sys.modules[name] = module
+    return module
+
+def natvis_files():
+    paths = []
+    for directory in NATVIS_DIRS:
+        paths += sorted(glob.glob(os.path.join(directory, "*.natvis")))
+    return paths
+
+# ------------------------------------------------------------------------------
+# Registration
+# ------------------------------------------------------------------------------
+def sample_names(module, regex):
+    """A concrete type name for each natvis type pattern registered under `regex`."""
+    return [pattern.replace("*", "int") for visualizer in module.FAMILIES[regex].visualizers
+            for pattern in visualizer.names if family_regex(pattern) == regex]
+
+def register(debugger, paths=None):
+    """Register the formatters generated from the natvis files into the
+    lldb_formatters category, except for types a hand-written formatter
+    handles. Returns the number of formatters added."""
+    import lldb_formatters
+    category = lldb_formatters.get_category(debugger)
+    added = 0
+    for path in natvis_files() if paths is None else paths:
+        try:
+            module = load(path)
+        except Exception as e:
+            print(f"natvis: cannot compile {os.path.basename(path)}: {e}")
+            continue
+        for kind, regex, attribute, expand in module.FORMATTERS:
+            covered = [lldb_formatters.lookup(name)[0 if kind == "summary" else 1]
+                       for name in sample_names(module, regex)]
+            if any(name is not None and not name.startswith("natvis_") for name in covered):
+                continue
+            # LLDB resolves the name in the lldb_formatters module it imported
+            name = f"{module.__name__}_{attribute}"
+            setattr(lldb_formatters, name, getattr(module, attribute))
+            lldb_formatters.add_formatter(category, kind, regex, f"lldb_formatters.{name}", expand,
+                                          f"{module.__name__}.{attribute}")
+            added += 1
+    return added
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Compile .natvis files into LLDB formatter modules.")
+    parser.add_argument("files", nargs="*", help="natvis files (default: the ones of this repository)")
+    parser.add_argument("-o", "--output", help=f"cache directory (default: {NATVIS_CACHE})")
+    parser.add_argument("-v", "--verbose", action="store_true", help="list the elements that were skipped")
+    args = parser.parse_args(argv)
+    status = 0
+    for path in args.files or natvis_files():
+        try:
+            compiled = compile_file(path)
+            output = build(path, args.output)
+        except Exception as e:
+            print(f"{path}: {e}", file=sys.stderr)
+            status = 1
+            continue
+        print(f"{os.path.basename(path)}: {len(compiled.types)} type(s), "
+              f"{len(compiled.skipped)} element(s) skipped -> {output}")
+        if args.verbose:
+            for type_name, reason in compiled.skipped:
+                print(f"    {type_name}: {reason}")
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
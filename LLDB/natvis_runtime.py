@@ -0,0 +1,559 @@
+# natvis_runtime.py
+# Helpers called by the formatter modules that natvis_compiler.py generates
+# from the .natvis files. Natvis expressions are compiled to Python calls of
+# the small functions below, which navigate SBValues directly (member paths,
+# dereference, indexing, casts) and compute on Python numbers, so showing a
+# value never runs the expression evaluator.
+#
+# Compiled expressions are called as f(v, T), `v` being the object the natvis
+# expression is evaluated on and `T` the list of its template arguments ($T1
+# is T[0]). formatter_utils is only imported once a value is shown: loading
+# the generated modules at startup stays cheap.
+import re
+import struct
+
+import lldb
+
+class EvalError(Exception):
+    """A natvis expression cannot be evaluated on this value."""
+
+# Type names of casts and sizeof that LLDB may not know under that name
+BASIC_TYPES = {
+    "bool": lldb.eBasicTypeBool, "char": lldb.eBasicTypeChar,
+    "signed char": lldb.eBasicTypeSignedChar, "unsigned char": lldb.eBasicTypeUnsignedChar,
+    "short": lldb.eBasicTypeShort, "unsigned short": lldb.eBasicTypeUnsignedShort,
+    "int": lldb.eBasicTypeInt, "unsigned int": lldb.eBasicTypeUnsignedInt, "unsigned": lldb.eBasicTypeUnsignedInt,
+    "long": lldb.eBasicTypeLong, "unsigned long": lldb.eBasicTypeUnsignedLong,
+    "long long": lldb.eBasicTypeLongLong, "unsigned long long": lldb.eBasicTypeUnsignedLongLong,
+    "float": lldb.eBasicTypeFloat, "double": lldb.eBasicTypeDouble,
+    "int8_t": lldb.eBasicTypeSignedChar, "uint8_t": lldb.eBasicTypeUnsignedChar,
+    "int16_t": lldb.eBasicTypeShort, "uint16_t": lldb.eBasicTypeUnsignedShort,
+    "int32_t": lldb.eBasicTypeInt, "uint32_t": lldb.eBasicTypeUnsignedInt,
+    "int64_t": lldb.eBasicTypeLongLong, "uint64_t": lldb.eBasicTypeUnsignedLongLong,
+}
+# Longest string read for the s/sb format specifiers
+MAX_STRING = 1024
+
+# ------------------------------------------------------------------------------
+# Type names
+# ------------------------------------------------------------------------------
+def split_name(type_name):
+    """(template name, top level arguments or None), e.g.
+    'cv::Vec<float, 3>' -> ('cv::Vec', ['float', '3'])."""
+    start = type_name.find("<")
+    if start < 0 or not type_name.endswith(">"):
+        return type_name.strip(), None
+    args = []
+    depth = 0
+    first = start + 1
+    for i in range(start + 1, len(type_name) - 1):
+        ch = type_name[i]
+        if ch in "<(":
+            depth += 1
+        elif ch in ">)":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            args.append(type_name[first:i].strip())
+            first = i + 1
+    args.append(type_name[first:-1].strip())
+    return type_name[:start].strip(), args
+
+def name_matches(pattern, type_name):
+    """Whether `type_name` matches the natvis type `pattern`, where `*` stands
+    for one template argument (or all the remaining ones, when last)."""
+    base, args = split_name(pattern)
+    name_base, name_args = split_name(type_name)
+    if base != name_base or (args is None) != (name_args is None):
+        return False
+    if args is None:
+        return True
+    if len(name_args) != len(args) and not (args[-1] == "*" and len(name_args) >= len(args)):
+        return False
+    for arg, name_arg in zip(args, name_args):
+        if arg != "*" and not name_matches(arg, name_arg) and arg.replace(" ", "") != name_arg.replace(" ", ""):
+            return False
+    return True
+
+def wildcards(pattern):
+    return pattern.count("*")
+
+def targ(T, index):
+    """$T<index>: a template argument, as written in the type name."""
+    if index > len(T):
+        raise EvalError(f"no template argument $T{index}")
+    return T[index - 1]
+
+def subst(T, text):
+    """`text` with $T1, $T2... replaced by the template arguments."""
+    return re.sub(r"\$T(\d+)", lambda m: targ(T, int(m.group(1))), text)
+
+def find_type(v, T, name):
+    """SBType named `name` (may use $Tn and end with '*'s)."""
+    import formatter_utils
+    name = subst(T, name).strip()
+    stars = len(name) - len(name.rstrip("*"))
+    name = name.rstrip("*").strip()
+    if name.startswith("const "):
+        name = name[6:]
+    target = v.GetTarget()
+    basic = BASIC_TYPES.get(name)
+    if basic is not None:
+        sbtype = formatter_utils.basic_type(target, basic)
+    else:
+        sbtype = formatter_utils.find_type(target, name)
+    if not sbtype.IsValid():
+        raise EvalError(f"unknown type {name}")
+    for _ in range(stars):
+        sbtype = sbtype.GetPointerType()
+    return sbtype
+
+# ------------------------------------------------------------------------------
+# Values
+# ------------------------------------------------------------------------------
+def valid(value):
+    if not value.IsValid():
+        raise EvalError("invalid value")
+    return value
+
+def p(value, path):
+    """Member path such as '.m_storage.m_data.array[2]' or '->val'."""
+    if not isinstance(value, lldb.SBValue):
+        raise EvalError(f"{path} of a number")
+    return valid(value.GetValueForExpressionPath(path))
+
+def this(v):
+    return valid(v.AddressOf())
+
+def element(value):
+    """(address, element type) of a pointer or array value."""
+    if not isinstance(value, lldb.SBValue):
+        raise EvalError("not a pointer")
+    sbtype = value.GetType().GetCanonicalType()
+    if sbtype.IsPointerType():
+        return value.GetValueAsUnsigned(), sbtype.GetPointeeType()
+    if sbtype.IsArrayType():
+        return value.GetLoadAddress(), sbtype.GetArrayElementType()
+    raise EvalError("not a pointer")
+
+def ix(value, index):
+    """value[index] of a pointer or array."""
+    address, sbtype = element(value)
+    index = int(n(index))
+    return valid(value.CreateValueFromAddress(f"[{index}]", address + index * sbtype.GetByteSize(), sbtype))
+
+def dr(value):
+    """*value"""
+    address, sbtype = element(value)
+    if not address:
+        raise EvalError("null pointer")
+    return valid(value.CreateValueFromAddress("*" + (value.GetName() or ""), address, sbtype))
+
+def cast(v, T, value, name):
+    """(name)value"""
+    sbtype = find_type(v, T, name)
+    if sbtype.IsPointerType():
+        if isinstance(value, lldb.SBValue) and value.GetType().GetCanonicalType().IsPointerType():
+            return valid(value.Cast(sbtype))
+        import formatter_utils
+        address = int(n(value))
+        target = v.GetTarget()
+        raw = address.to_bytes(target.GetAddressByteSize(),
+                               "big" if target.GetByteOrder() == lldb.eByteOrderBig else "little")
+        return valid(formatter_utils.create_value_from_bytes(v, "", raw, sbtype))
+    number = n(value)
+    return float(number) if sbtype.GetTypeFlags() & lldb.eTypeIsFloat else int(number)
+
+def sizeof(v, T, name):
+    return find_type(v, T, name).GetByteSize()
+
+def n(value):
+    """Python number of a value: SBValue scalars, pointers (their address),
+    template arguments and constants."""
+    if isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        text = value.strip()
+        if text in ("true", "false"):
+            return text == "true"
+        try:
+            return int(text.rstrip("uUlL"), 0)
+        except ValueError:
+            try:
+                return float(text.rstrip("fF"))
+            except ValueError:
+                raise EvalError(f"{value} is not a number")
+    sbtype = value.GetType().GetCanonicalType()
+    flags = sbtype.GetTypeFlags()
+    if flags & lldb.eTypeIsFloat:
+        import formatter_utils
+        fmt = formatter_utils.scalar_format(sbtype)
+        raw = formatter_utils.read_value_bytes(value, sbtype.GetByteSize())
+        if fmt is None or raw is None:
+            raise EvalError("unreadable float")
+        prefix = ">" if value.GetTarget().GetByteOrder() == lldb.eByteOrderBig else "<"
+        return struct.unpack(prefix + fmt, raw)[0]
+    if sbtype.IsPointerType():
+        return value.GetValueAsUnsigned()
+    if sbtype.IsArrayType():
+        return value.GetLoadAddress()
+    if not flags & (lldb.eTypeIsScalar | lldb.eTypeIsEnumeration | lldb.eTypeIsInteger):
+        raise EvalError(f"{value.GetName()} is not a number")
+    if flags & lldb.eTypeIsSigned:
+        return value.GetValueAsSigned()
+    return value.GetValueAsUnsigned()
+
+def eq(a, b):
+    """a == b; a negative int equals the unsigned constant with the same bits,
+    as in C (e.g. depth == 0x80000008 with an int depth)."""
+    a, b = n(a), n(b)
+    if a == b:
+        return True
+    if isinstance(a, int) and isinstance(b, int) and (a < 0) != (b < 0):
+        bits = 32 if max(a, b) < 1 << 32 else 64
+        return (a - b) % (1 << bits) == 0
+    return False
+
+def truth(value):
+    return bool(n(value))
+
+def pointer(value):
+    """Element size if `value` is a pointer (or array) SBValue, else 0."""
+    if isinstance(value, lldb.SBValue):
+        sbtype = value.GetType().GetCanonicalType()
+        if sbtype.IsPointerType():
+            return max(1, sbtype.GetPointeeType().GetByteSize())
+        if sbtype.IsArrayType():
+            return max(1, sbtype.GetArrayElementType().GetByteSize())
+    return 0
+
+def add(a, b):
+    """a + b, scaled like C pointer arithmetic (the result is an address)."""
+    size = pointer(a)
+    if size:
+        return n(a) + n(b) * size
+    size = pointer(b)
+    if size:
+        return n(a) * size + n(b)
+    return n(a) + n(b)
+
+def sub(a, b):
+    size = pointer(a)
+    if size and pointer(b):
+        return (n(a) - n(b)) // size
+    if size:
+        return n(a) - n(b) * size
+    return n(a) - n(b)
+
+def div(a, b):
+    a, b = n(a), n(b)
+    if b == 0:
+        raise EvalError("division by zero")
+    if isinstance(a, float) or isinstance(b, float):
+        return a / b
+    quotient = abs(a) // abs(b)
+    return quotient if (a < 0) == (b < 0) else -quotient
+
+def mod(a, b):
+    a, b = n(a), n(b)
+    if b == 0:
+        raise EvalError("division by zero")
+    if isinstance(a, float) or isinstance(b, float):
+        import math
+        return math.fmod(a, b)
+    return a - div(a, b) * b
+
+# ------------------------------------------------------------------------------
+# Text
+# ------------------------------------------------------------------------------
+def read_string(value, length=None):
+    """Characters a char pointer or array points to: `length` of them, or up
+    to the first NUL."""
+    import formatter_utils
+    address, sbtype = element(value)
+    if not address:
+        return ""
+    process = value.GetProcess()
+    if length is not None:
+        length = max(0, min(int(n(length)), MAX_STRING))
+        raw = formatter_utils.read_memory(process, address, length) if length else b""
+        if raw is None:
+            raise EvalError("unreadable string")
+    else:
+        error = lldb.SBError()
+        raw = process.ReadCStringFromMemory(address, MAX_STRING, error)
+        if not error.Success():
+            raise EvalError("unreadable string")
+        if isinstance(raw, str):
+            return raw
+    return raw.split(b"\0", 1)[0].decode("utf-8", "replace")
+
+def text(value, spec=None, length=None):
+    """`value` as a natvis display string shows it, with format specifier `spec`."""
+    if isinstance(value, str):
+        # Template arguments and string literals
+        return value if spec in ("sb", "s8b", "sub") or spec is None else f'"{value}"'
+    if spec in ("s", "sb", "s8", "s8b", "su", "sub"):
+        string = read_string(value, length)
+        return string if spec.endswith("b") else f'"{string}"'
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        return f"{value:.9g}"
+    if isinstance(value, int):
+        return hex(value) if spec in ("x", "h", "X", "H") else str(value)
+    if spec in ("x", "h", "X", "H"):
+        return hex(n(value))
+    summary = value.GetSummary()
+    if summary:
+        return summary
+    shown = value.GetValue()
+    if shown is not None:
+        return shown
+    return "{...}"
+
+def display(displays, v, T):
+    """First display string whose condition holds and that evaluates, or None."""
+    for condition, render in displays:
+        try:
+            if condition is None or truth(condition(v, T)):
+                return render(v, T)
+        except EvalError:
+            continue
+    return None
+
+# ------------------------------------------------------------------------------
+# Visualizers
+# ------------------------------------------------------------------------------
+class Visualizer:
+    """One natvis <Type>: its names, display strings and <Expand> elements.
+
+    `displays` holds (condition, render) pairs and `expand` tuples of
+        ("item", name, condition, expression)
+        ("synthetic", name, condition, displays)
+        ("array", None, condition, (rank, backward, size, value pointer))
+        ("list", None, condition, (size, head, next, value node))
+        ("expanded", None, condition, expression)
+    with compiled expressions (None for a missing condition or size).
+    """
+    def __init__(self, names, displays, expand):
+        self.names = names
+        self.displays = displays
+        self.expand = expand
+
+class Family:
+    """The natvis types registered under one LLDB regex. For each type name
+    the most specific matching visualizer (fewest wildcards, then file order)
+    is chosen, as Visual Studio does."""
+    def __init__(self, visualizers):
+        self.visualizers = visualizers
+        self.chosen = {}
+
+    def choose(self, valobj):
+        """(visualizer, template arguments) for `valobj`, or (None, None)."""
+        sbtype = valobj.GetType()
+        type_name = sbtype.GetCanonicalType().GetName()
+        chosen = self.chosen.get(type_name)
+        if chosen is None:
+            best = None
+            for name in (type_name, sbtype.GetUnqualifiedType().GetName()):
+                for visualizer in self.visualizers:
+                    for pattern in visualizer.names:
+                        if name_matches(pattern, name):
+                            rank = wildcards(pattern)
+                            if best is None or rank < best[0]:
+                                best = (rank, visualizer, split_name(name)[1] or [])
+                if best is not None:
+                    break
+            chosen = self.chosen[type_name] = (best[1], best[2]) if best else (None, None)
+        return chosen
+
+def summary(family, valobj):
+    valobj = valobj.GetNonSyntheticValue()
+    visualizer, T = family.choose(valobj)
+    if visualizer is None:
+        return None
+    return display(visualizer.displays, valobj, T)
+
+def clone(valobj, name, value):
+    """Child `name` showing the result of an <Item> expression."""
+    import formatter_utils
+    if isinstance(value, bool):
+        return formatter_utils.create_scalar(valobj, name, value, lldb.eBasicTypeBool)
+    if isinstance(value, int):
+        basic = lldb.eBasicTypeLongLong if value < 1 << 63 else lldb.eBasicTypeUnsignedLongLong
+        return formatter_utils.create_scalar(valobj, name, value, basic)
+    if isinstance(value, float):
+        return formatter_utils.create_scalar(valobj, name, value, lldb.eBasicTypeDouble)
+    if isinstance(value, str):
+        return formatter_utils.create_string(valobj, name, value)
+    address = value.GetLoadAddress()
+    if address != lldb.LLDB_INVALID_ADDRESS:
+        return valobj.CreateValueFromAddress(name, address, value.GetType())
+    return valobj.CreateValueFromData(name, value.GetData(), value.GetType())
+
+class Provider:
+    """Synthetic children of a Family: the <Expand> elements of the chosen
+    visualizer whose condition holds, in order. Arrays are read in bulk
+    windows and linked lists are walked once per update."""
+    FAMILY = None
+
+    def __init__(self, valobj, internal_dict):
+        self.valobj = valobj
+        self.segments = []  # (first child index, kind, data)
+        self.count = 0
+        self.spans = {}  # first child index of an array -> ShownSpan of its buffer
+        self.fingerprint = None
+
+    def add(self, kind, count, data):
+        self.segments.append((self.count, kind, data))
+        self.count += count
+
+    def update(self):
+        import formatter_utils
+        self.segments = []
+        self.count = 0
+        valobj = self.valobj
+        visualizer, T = self.FAMILY.choose(valobj)
+        if visualizer is None:
+            return False
+        regions = []
+        for kind, name, condition, data in visualizer.expand:
+            try:
+                if condition is not None and not truth(condition(valobj, T)):
+                    continue
+                if kind == "item":
+                    self.add(kind, 1, (name, data, T))
+                elif kind == "synthetic":
+                    self.add(kind, 1, (name, data, T))
+                elif kind == "expanded":
+                    value = data(valobj, T)
+                    if isinstance(value, lldb.SBValue) and value.GetType().GetCanonicalType().IsPointerType():
+                        value = dr(value)
+                    count = value.GetNumChildren() if isinstance(value, lldb.SBValue) else 0
+                    self.add(kind, count, value)
+                elif kind == "array":
+                    regions.append(self.add_array(valobj, T, *data))
+                elif kind == "list":
+                    self.add_list(valobj, T, *data)
+            except EvalError:
+                continue
+        raw = formatter_utils.read_value_bytes(valobj, valobj.GetByteSize()) or b""
+        header = (valobj.GetType().GetCanonicalType().GetName(), self.count, formatter_utils.MAX_CHILDREN)
+        return formatter_utils.unchanged(self, formatter_utils.fingerprint(
+            valobj.GetProcess(), header, [raw] + regions), self.spans.values())
+
+    def add_array(self, valobj, T, rank, backward, size, pointer):
+        import formatter_utils
+        sizes = [max(0, int(n(size(valobj, T, i)))) for i in range(rank)]
+        total = 1
+        for extent in sizes:
+            total *= extent
+        address, sbtype = element(pointer(valobj, T))
+        elem_size = sbtype.GetByteSize()
+        shown = min(total, formatter_utils.MAX_CHILDREN)
+        reader = formatter_utils.BulkReader(valobj.GetProcess(), address, elem_size, shown)
+        span = self.spans.setdefault(self.count, formatter_utils.ShownSpan())
+        self.add("array", shown, (sizes, backward, address, sbtype, reader, span))
+        if shown < total:
+            self.add("more", 1, f"... {total - shown} more elements")
+        return span.region(address)
+
+    def add_list(self, valobj, T, size, head, next_node, value_node):
+        import formatter_utils
+        limit = formatter_utils.MAX_CHILDREN
+        if size is not None:
+            limit = min(limit, max(0, int(n(size(valobj, T)))))
+        node = head(valobj, T)
+        address, sbtype = element(node)
+        nodes = []
+        seen = set()
+        while address and address not in seen and len(nodes) < limit:
+            seen.add(address)
+            nodes.append(address)
+            try:
+                address = int(n(next_node(valobj.CreateValueFromAddress("", address, sbtype), T)))
+            except EvalError:
+                break
+        self.add("list", len(nodes), (nodes, sbtype, value_node, T))
+        if address and address not in seen and len(nodes) == formatter_utils.MAX_CHILDREN:
+            self.add("more", 1, "... more elements")
+
+    def num_children(self, max_count=None):
+        count = self.count
+        if max_count is not None:
+            count = min(count, max_count)
+        return count
+
+    def segment(self, index):
+        """(segment, offset in it) of child `index`."""
+        for first, kind, data in reversed(self.segments):
+            if index >= first:
+                return kind, data, index - first
+        return None, None, 0
+
+    def get_child_at_index(self, index):
+        import formatter_utils
+        if index < 0 or index >= self.count:
+            return None
+        kind, data, offset = self.segment(index)
+        valobj = self.valobj
+        try:
+            if kind == "item":
+                name, expression, T = data
+                return clone(valobj, name, expression(valobj, T))
+            if kind == "synthetic":
+                name, displays, T = data
+                shown = display(displays, valobj, T)
+                return formatter_utils.create_string(valobj, name, shown if shown is not None else "")
+            if kind == "expanded":
+                return data.GetChildAtIndex(offset)
+            if kind == "more":
+                return formatter_utils.create_string(valobj, "[more]", data)
+            if kind == "array":
+                sizes, backward, address, sbtype, reader, span = data
+                name = self.array_name(sizes, backward, offset)
+                raw = reader.element_bytes(offset) if formatter_utils.BULK_READ else None
+                if raw is not None:
+                    child = formatter_utils.create_value_from_bytes(valobj, name, raw, sbtype)
+                    if child is not None and child.IsValid():
+                        span.add(offset * len(raw), len(raw))
+                        return child
+                return valobj.CreateValueFromAddress(name, address + offset * sbtype.GetByteSize(), sbtype)
+            if kind == "list":
+                nodes, sbtype, value_node, T = data
+                node = valobj.CreateValueFromAddress("", nodes[offset], sbtype)
+                value = value_node(node, T)
+                if isinstance(value, lldb.SBValue) and value.GetType().GetCanonicalType().IsPointerType():
+                    value = dr(value)
+                return clone(valobj, f"[{offset}]", value)
+        except EvalError:
+            return None
+        return None
+
+    @staticmethod
+    def array_name(sizes, backward, offset):
+        if len(sizes) == 1:
+            return f"[{offset}]"
+        indices = []
+        # Forward: the last index varies fastest (row major); Backward: the first
+        order = range(len(sizes) - 1, -1, -1) if not backward else range(len(sizes))
+        for dim in order:
+            offset, index = divmod(offset, sizes[dim]) if sizes[dim] else (0, 0)
+            indices.append((dim, index))
+        indices.sort()
+        return "[" + ",".join(str(index) for _, index in indices) + "]"
+
+    def get_child_index(self, name):
+        for first, kind, data in self.segments:
+            if kind in ("item", "synthetic") and data[0] == name:
+                return first
+            if kind == "more" and name == "[more]":
+                return first
+        # "[i]" of the first array or list
+        for first, kind, data in self.segments:
+            if kind in ("array", "list"):
+                try:
+                    return first + int(name.strip("[]"))
+                except ValueError:
+                    return -1
+        return -1
@@ -1,55 +1,17 @@
 import lldb
+import os
+import re
+import shlex
 
-def __lldb_init_module(debugger, internal_dict):
-    # cv::Mat
-    debugger.HandleCommand('type synthetic add -x "^cv::Mat$" --python-class opencv_formatters.CVMatSyntheticProvider')
-    debugger.HandleCommand('type summary add -x "^cv::Mat$" --python-function opencv_formatters.CVMatSummaryProvider')
-    
-    # cv::Point, cv::Point3
-    debugger.HandleCommand('type summary add -x "^cv::Point_<.>$" --python-function opencv_formatters.PointSummary')
-    debugger.HandleCommand('type summary add -x "^cv::Point3_<.>$" --python-function opencv_formatters.Point3Summary')
-    # Matches "TPoint2", "SEACAVE::TPoint2", "TPoint2<double>", etc.
-    debugger.HandleCommand('type summary add -x "^.*TPoint2(<.+>)?$" --python-function opencv_formatters.PointSummary')
-    # Matches "TPoint3", "SEACAVE::TPoint3", "TPoint3<double>", etc.
-    debugger.HandleCommand('type summary add -x "^.*TPoint3(<.+>)?$" --python-function opencv_formatters.Point3Summary')
-
-    # cv::Size
-    debugger.HandleCommand('type summary add -x "^cv::Size_<.>$" --python-function opencv_formatters.SizeSummary')
-    
-    # cv::Rect
-    debugger.HandleCommand('type summary add -x "^cv::Rect_<.>$" --python-function opencv_formatters.RectSummary')
-    
-    # cv::RotatedRect
-    debugger.HandleCommand('type summary add -x "^cv::RotatedRect$" --python-function opencv_formatters.RotatedRectSummary')
-    
-    # cv::Range
-    debugger.HandleCommand('type summary add -x "^cv::Range$" --python-function opencv_formatters.RangeSummary')
-
-    # cv::Scalar, cv::Vec
-    debugger.HandleCommand('type synthetic add -x "^cv::Scalar_<.>$" --python-class opencv_formatters.VecSyntheticProvider')
-    debugger.HandleCommand('type synthetic add -x "^cv::Vec<.+>$" --python-class opencv_formatters.VecSyntheticProvider')
-    
-    # cv::Matx (Small fixed matrices)
-    debugger.HandleCommand('type synthetic add -x "^cv::Matx<.+>$" --python-class opencv_formatters.MatxSyntheticProvider')
-    debugger.HandleCommand('type summary add -x "^cv::Matx<.+>$" --python-function opencv_formatters.MatxSummary')
-    # Matches "TMatrix", "SEACAVE::TMatrix", "TMatrix<double, 3, 3>", etc.
-    debugger.HandleCommand('type synthetic add -x "^.*TMatrix<.+>$" --python-class opencv_formatters.MatxSyntheticProvider')
-    debugger.HandleCommand('type summary add -x "^.*TMatrix<.+>$" --python-function opencv_formatters.MatxSummary')
-    
-    # cv::Ptr
-    debugger.HandleCommand('type synthetic add -x "^cv::Ptr<.+>$" --python-class opencv_formatters.PtrSyntheticProvider')
-    debugger.HandleCommand('type summary add -x "^cv::Ptr<.+>$" --python-function opencv_formatters.PtrSummary')
-
-    # cv::AutoBuffer
-    debugger.HandleCommand('type summary add -x "^cv::AutoBuffer<.+>$" --python-function opencv_formatters.AutoBufferSummary')
-    debugger.HandleCommand('type synthetic add -x "^cv::AutoBuffer<.+>$" --python-class opencv_formatters.AutoBufferSyntheticProvider')
-
-    # cv::Complex
-    debugger.HandleCommand('type summary add -x "^cv::Complex<.+>$" --python-function opencv_formatters.ComplexSummary')
-
-    # cv::Exception
-    debugger.HandleCommand('type summary add -x "^cv::Exception$" --summary-string "${var.msg}"')
+import buffer_io
+import formatter_async
+import formatter_profiling
+import formatter_utils
+import lldb_formatters
 
+def __lldb_init_module(debugger, internal_dict):
+    # Formatters and the cvdump / bufdiff commands are listed in lldb_formatters
+    lldb_formatters.register(debugger, __name__)
     print("OpenCV LLDB Formatters loaded.")
 
 # ------------------------------------------------------------------------------
@@ -70,100 +32,217 @@ def get_member_str(valobj, name):
 # ------------------------------------------------------------------------------
 # cv::Mat
 # ------------------------------------------------------------------------------
+# Mat depth (flags & 7) -> (summary name, element C type, element size, struct format)
+MAT_DEPTHS = {
+    0: ("UINT8", "uint8_t", 1, "B"),
+    1: ("INT8", "int8_t", 1, "b"),
+    2: ("UINT16", "uint16_t", 2, "H"),
+    3: ("INT16", "int16_t", 2, "h"),
+    4: ("INT32", "int32_t", 4, "i"),
+    5: ("FLOAT32", "float", 4, "f"),
+    6: ("FLOAT64", "double", 8, "d"),
+    7: ("USER", "uint16_t", 2, "e"), # CV_16F in OpenCV 4
+}
+
+class MatHeader:
+    """Decoded cv::Mat header at one stop, shared by the summary and synthetic providers."""
+    def __init__(self):
+        self.rows = 0
+        self.cols = 0
+        self.flags = 0
+        self.depth = 0
+        self.channels = 1
+        self.depth_name = "UINT8"
+        self.type_name = "uint8_t"
+        self.elem_size = 1
+        self.fmt = "B"
+        self.data_addr = 0
+        self.step = 0       # bytes between the starts of two rows (step[0])
+        self.row_bytes = 0  # bytes of pixel data in one row
+        self.pager = None
+
+    def row(self, process, r):
+        """Raw pixel bytes of row `r`, read a page of rows at a time."""
+        if not self.data_addr:
+            return None
+        if self.pager is None:
+            self.pager = formatter_utils.RowPager(process, self.data_addr, self.rows, self.row_bytes, self.step)
+        return self.pager.row(r)
+
+def decode_mat(valobj):
+    mat = MatHeader()
+    # n-dimensional Mats store rows = cols = -1
+    mat.rows = max(0, valobj.GetChildMemberWithName("rows").GetValueAsSigned(0))
+    mat.cols = max(0, valobj.GetChildMemberWithName("cols").GetValueAsSigned(0))
+    mat.flags = get_member_val(valobj, "flags")
+    mat.data_addr = get_member_val(valobj, "data")
+
+    # Decode flags
+    # Depth: flags & 7
+    mat.depth = mat.flags & 7
+    # Channels: ((flags & 0xfff) >> 3) + 1
+    mat.channels = ((mat.flags & 0xfff) >> 3) + 1
+    mat.depth_name, mat.type_name, mat.elem_size, mat.fmt = MAT_DEPTHS[mat.depth]
+    mat.row_bytes = mat.cols * mat.channels * mat.elem_size
+
+    # Row stride: step.p[0] (step.p points to step.buf for 2D Mats)
+    # (read through the page cache, which already holds the header)
+    step_p = valobj.GetChildMemberWithName("step").GetChildMemberWithName("p")
+    if step_p.IsValid() and step_p.GetValueAsUnsigned(0) != 0:
+        mat.step = formatter_utils.read_unsigned(
+            valobj.GetProcess(), step_p.GetValueAsUnsigned(0), step_p.GetType().GetPointeeType().GetByteSize(),
+            valobj.GetTarget().GetByteOrder()) or 0
+    if mat.step < mat.row_bytes:
+        mat.step = mat.row_bytes
+    return mat
+
+def get_mat_header(valobj):
+    return formatter_utils.get_value_state(valobj.GetNonSyntheticValue(), "cv.mat", decode_mat)
+
+# Fixed children shown before the pixel rows
+MAT_FIELDS = ["rows", "cols", "channels", "type", "step", "data"]
+
 class CVMatSyntheticProvider:
     def __init__(self, valobj, internal_dict):
         self.valobj = valobj
+        self.mat = MatHeader()
         self.rows = 0
         self.cols = 0
         self.flags = 0
         self.channels = 1
-        self.depth_type = None
-        self.data_ptr = None
+        self.type_name = "uint8_t"
+        self.row_type = None
+        self.span = formatter_utils.ShownSpan()
+        self.fingerprint = None
+
+    def get_header(self):
+        """Decoded MatHeader of the value, cached for the stop."""
+        return get_mat_header(self.valobj)
 
     def update(self):
-        self.rows = get_member_val(self.valobj, "rows")
-        self.cols = get_member_val(self.valobj, "cols")
-        self.flags = get_member_val(self.valobj, "flags")
-        self.data_ptr = self.valobj.GetChildMemberWithName("data")
-        
-        # Decode flags
-        # Depth: flags & 7
-        depth = self.flags & 7
-        # Channels: ((flags & 0xfff) >> 3) + 1
-        self.channels = ((self.flags & 0xfff) >> 3) + 1
-
-        types = {
-            0: "uint8_t", 1: "int8_t", 2: "uint16_t", 3: "int16_t",
-            4: "int32_t", 5: "float", 6: "double"
-        }
-        self.type_name = types.get(depth, "uint8_t") # default to uchar
+        self.mat = self.get_header()
+        self.rows = self.mat.rows
+        self.cols = self.mat.cols
+        self.flags = self.mat.flags
+        self.channels = self.mat.channels
+        self.type_name = self.mat.type_name
+        self.row_type = None
+        mat = self.mat
+        header = (mat.flags, mat.rows, mat.cols, mat.data_addr, mat.step)
+        return formatter_utils.unchanged(self, formatter_utils.fingerprint(
+            self.valobj.GetProcess(), header, [self.span.region(mat.data_addr)]), [self.span])
 
     def num_children(self):
-        return 5 # rows, cols, channels, type, data_view
+        # rows, cols, channels, type, step, data, then one child per pixel row [r]
+        rows = self.rows if self.mat.data_addr and self.mat.row_bytes else 0
+        return len(MAT_FIELDS) + rows
 
     def get_child_index(self, name):
-        if name == "rows": return 0
-        if name == "cols": return 1
-        if name == "channels": return 2
-        if name == "type": return 3
-        if name == "data": return 4
-        return -1
+        if name in MAT_FIELDS:
+            return MAT_FIELDS.index(name)
+        try:
+            return len(MAT_FIELDS) + int(name.strip("[]"))
+        except:
+            return -1
 
     def get_child_at_index(self, index):
         if index == 0:
-            return self.valobj.CreateValueFromExpression("rows", str(self.rows))
+            return formatter_utils.create_scalar(self.valobj, "rows", self.rows)
         if index == 1:
-            return self.valobj.CreateValueFromExpression("cols", str(self.cols))
+            return formatter_utils.create_scalar(self.valobj, "cols", self.cols)
         if index == 2:
-            return self.valobj.CreateValueFromExpression("channels", str(self.channels))
+            return formatter_utils.create_scalar(self.valobj, "channels", self.channels)
         if index == 3:
-            return self.valobj.CreateValueFromExpression("type", f'"{self.type_name}"')
+            return formatter_utils.create_string(self.valobj, "type", self.type_name)
         if index == 4:
-            # Create a typed array view of the data
-            # We calculate total elements: rows * cols * channels
-            count = self.rows * self.cols * self.channels
-            if self.data_ptr.IsValid() and self.data_ptr.GetValueAsUnsigned(0) != 0:
-                # Cast 'data' (usually uchar*) to the actual type pointer
-                target = self.valobj.GetTarget()
-                type_obj = target.FindFirstType(self.type_name)
-                if type_obj.IsValid():
-                     typed_ptr = self.data_ptr.Cast(type_obj.GetPointerType())
-                     return typed_ptr
-            return self.data_ptr
-        return None
+            return formatter_utils.create_scalar(self.valobj, "step", self.mat.step, lldb.eBasicTypeUnsignedLongLong)
+        if index == 5:
+            return self.get_data()
+        return self.get_row(index - len(MAT_FIELDS))
+
+    def get_data(self):
+        """The data pointer, typed with the element type."""
+        data_ptr = self.valobj.GetChildMemberWithName("data")
+        if data_ptr.IsValid() and data_ptr.GetValueAsUnsigned(0) != 0:
+            # Cast 'data' (usually uchar*) to the actual type pointer
+            type_obj = formatter_utils.find_type(self.valobj.GetTarget(), self.type_name)
+            if type_obj.IsValid():
+                 typed_ptr = data_ptr.Cast(type_obj.GetPointerType())
+                 return typed_ptr
+        return data_ptr
+
+    def get_row_type(self):
+        """Type of one row child: an array of cols * channels scalars."""
+        type_obj = formatter_utils.find_type(self.valobj.GetTarget(), self.type_name)
+        if not type_obj.IsValid():
+            return None
+        return type_obj.GetArrayType(self.cols * self.channels)
 
+    def get_row(self, r):
+        """Row `r` as an array of pixels, decoded through step[0]."""
+        if r < 0 or r >= self.rows:
+            return None
+        if self.row_type is None:
+            self.row_type = self.get_row_type()
+            if self.row_type is None:
+                return None
+        name = f"[{r}]"
+        raw = self.mat.row(self.valobj.GetProcess(), r)
+        if raw is not None:
+            child = formatter_utils.create_value_from_bytes(self.valobj, name, raw, self.row_type)
+            if child is not None and child.IsValid():
+                self.span.add(r * self.mat.step, len(raw))
+                return child
+        return self.valobj.CreateValueFromAddress(name, self.mat.data_addr + r * self.mat.step, self.row_type)
+
+def get_mat_stats(valobj, mat):
+    """Pixel statistics text of a Mat, computed once per stop in the background
+    (see formatter_utils.STATS_SUMMARY), a placeholder while it runs, or None."""
+    process = valobj.GetProcess()
+    byte_order = valobj.GetTarget().GetByteOrder()
+    def compute(job):
+        return formatter_utils.buffer_stats(
+            process, mat.data_addr, mat.rows, mat.row_bytes, mat.step, mat.fmt, mat.channels, byte_order,
+            formatter_utils.ASYNC_TIME_LIMIT if formatter_utils.ASYNC_SUMMARY else None, job.cancelled)
+    header = (mat.flags, mat.rows, mat.cols, mat.data_addr, mat.step)
+    stats = formatter_async.result(valobj, "cv.mat.stats", header, compute)
+    if stats is formatter_async.PENDING:
+        return formatter_async.PLACEHOLDER
+    return stats.summary() if stats is not None else None
+
+@formatter_profiling.summary
 def CVMatSummaryProvider(valobj, internal_dict):
-    rows = get_member_val(valobj, "rows")
-    cols = get_member_val(valobj, "cols")
-    flags = get_member_val(valobj, "flags")
-    
-    depth = flags & 7
-    channels = ((flags & 0xfff) >> 3) + 1
-    
-    type_names = ["UINT8", "INT8", "UINT16", "INT16", "INT32", "FLOAT32", "FLOAT64", "USER"]
-    t_name = type_names[depth] if depth < 8 else "USER"
-    
-    return f"{{{t_name}, {channels} x {cols} x {rows}}}"
+    mat = get_mat_header(valobj)
+    summary = f"{{{mat.depth_name}, {mat.channels} x {mat.cols} x {mat.rows}}}"
+    if formatter_utils.STATS_SUMMARY and mat.data_addr and mat.row_bytes:
+        stats = get_mat_stats(valobj, mat)
+        if stats is not None:
+            summary += " " + stats
+    return summary
 
 # ------------------------------------------------------------------------------
 # Geometry (Point, Rect, Size)
 # ------------------------------------------------------------------------------
+@formatter_profiling.summary
 def PointSummary(valobj, internal_dict):
     x = get_member_str(valobj, "x")
     y = get_member_str(valobj, "y")
     return f"{x} {y}"
 
+@formatter_profiling.summary
 def Point3Summary(valobj, internal_dict):
     x = get_member_str(valobj, "x")
     y = get_member_str(valobj, "y")
     z = get_member_str(valobj, "z")
     return f"{x} {y} {z}"
 
+@formatter_profiling.summary
 def SizeSummary(valobj, internal_dict):
     w = get_member_str(valobj, "width")
     h = get_member_str(valobj, "height")
     return f"{w}x{h}"
 
+@formatter_profiling.summary
 def RectSummary(valobj, internal_dict):
     x = get_member_val(valobj, "x")
     y = get_member_val(valobj, "y")
@@ -171,6 +250,7 @@ def RectSummary(valobj, internal_dict):
     h = get_member_val(valobj, "height")
     return f"{x} {y} {x+w} {y+h} [{w}x{h}]"
 
+@formatter_profiling.summary
 def RotatedRectSummary(valobj, internal_dict):
     center = valobj.GetChildMemberWithName("center")
     size = valobj.GetChildMemberWithName("size")
@@ -183,6 +263,7 @@ def RotatedRectSummary(valobj, internal_dict):
     
     return f"center={c_sum} size={s_sum} angle={angle} deg"
 
+@formatter_profiling.summary
 def RangeSummary(valobj, internal_dict):
     start = get_member_val(valobj, "start")
     end = get_member_val(valobj, "end")
@@ -197,9 +278,13 @@ class VecSyntheticProvider:
     def __init__(self, valobj, internal_dict):
         self.valobj = valobj
         self.val = None
+        self.fingerprint = None
 
     def update(self):
         self.val = self.valobj.GetChildMemberWithName("val")
+        # Children are the members of val, which LLDB refreshes itself
+        header = (self.val.GetLoadAddress(), self.val.GetType().GetName())
+        return formatter_utils.unchanged(self, formatter_utils.fingerprint(None, header))
 
     def num_children(self):
         if self.val.IsValid():
@@ -221,9 +306,13 @@ class MatxSyntheticProvider:
     def __init__(self, valobj, internal_dict):
         self.valobj = valobj
         self.val = None
+        self.fingerprint = None
 
     def update(self):
         self.val = self.valobj.GetChildMemberWithName("val")
+        # Children are the members of val, which LLDB refreshes itself
+        header = (self.val.GetLoadAddress(), self.val.GetType().GetName())
+        return formatter_utils.unchanged(self, formatter_utils.fingerprint(None, header))
 
     def num_children(self):
         if self.val.IsValid():
@@ -239,21 +328,24 @@ class MatxSyntheticProvider:
     def get_child_at_index(self, index):
         return self.val.GetChildAtIndex(index)
 
+# Regex to find the last two numeric template arguments (rows, cols)
+# This handles complex types like TMatrix<float, 3, 3> genericly
+# It looks for: comma, space(opt), digits, comma, space(opt), digits, closing angle bracket
+MATX_SHAPE_RE = re.compile(r",\s*(\d+),\s*(\d+)\s*>$")
+
+@formatter_profiling.summary
 def MatxSummary(valobj, internal_dict):
     # Get the full type name, e.g., "TMatrix<double, 3, 3>" or "cv::Matx<float, 4, 4>"
     t_name = valobj.GetType().GetName()
-    
-    import re
-    # Regex to find the last two numeric template arguments (rows, cols)
-    # This handles complex types like TMatrix<float, 3, 3> genericly
-    # It looks for: comma, space(opt), digits, comma, space(opt), digits, closing angle bracket
-    match = re.search(r",\s*(\d+),\s*(\d+)\s*>$", t_name)
-    if match:
-        rows = match.group(1)
-        cols = match.group(2)
-        return f"[{rows}, {cols}]"
-    
-    return "Matrix"
+
+    # The summary depends only on the type, so parse each type name once
+    key = ("matx.summary", t_name)
+    summary = formatter_utils.layout_cache.get(key)
+    if summary is None:
+        match = MATX_SHAPE_RE.search(t_name)
+        summary = f"[{match.group(1)}, {match.group(2)}]" if match else "Matrix"
+        formatter_utils.layout_cache.put(key, summary)
+    return summary
 
 # ------------------------------------------------------------------------------
 # cv::Ptr (Smart Pointer)
@@ -262,9 +354,13 @@ class PtrSyntheticProvider:
     def __init__(self, valobj, internal_dict):
         self.valobj = valobj
         self.obj = None
+        self.fingerprint = None
 
     def update(self):
         self.obj = self.valobj.GetChildMemberWithName("obj")
+        # The pointee is a live value: only a new pointer needs a new child
+        header = (self.obj.GetValueAsUnsigned(0), self.obj.GetType().GetName())
+        return formatter_utils.unchanged(self, formatter_utils.fingerprint(None, header))
 
     def num_children(self):
         return 1
@@ -279,6 +375,7 @@ class PtrSyntheticProvider:
             return self.obj.Dereference()
         return None
 
+@formatter_profiling.summary
 def PtrSummary(valobj, internal_dict):
     obj = valobj.GetChildMemberWithName("obj")
     refcount = valobj.GetChildMemberWithName("refcount")
@@ -295,6 +392,7 @@ def PtrSummary(valobj, internal_dict):
 # ------------------------------------------------------------------------------
 # cv::AutoBuffer
 # ------------------------------------------------------------------------------
+@formatter_profiling.summary
 def AutoBufferSummary(valobj, internal_dict):
     sz = get_member_val(valobj, "size")
     return f"{{size = {sz}}}"
@@ -305,12 +403,16 @@ class AutoBufferSyntheticProvider:
         self.ptr = None
         self.size = 0
         self.item_type = None
+        self.fingerprint = None
 
     def update(self):
         self.ptr = self.valobj.GetChildMemberWithName("ptr")
         self.size = get_member_val(self.valobj, "size")
         if self.ptr.IsValid():
             self.item_type = self.ptr.GetType().GetPointeeType()
+        # Items are address backed children that LLDB refreshes itself
+        header = (self.ptr.GetValueAsUnsigned(0), self.size, self.ptr.GetType().GetName())
+        return formatter_utils.unchanged(self, formatter_utils.fingerprint(None, header))
 
     def num_children(self):
         return self.size
@@ -330,6 +432,7 @@ class AutoBufferSyntheticProvider:
 # ------------------------------------------------------------------------------
 # cv::Complex
 # ------------------------------------------------------------------------------
+@formatter_profiling.summary
 def ComplexSummary(valobj, internal_dict):
     re = valobj.GetChildMemberWithName("re")
     im = valobj.GetChildMemberWithName("im")
@@ -344,3 +447,166 @@ def ComplexSummary(valobj, internal_dict):
     
     sign = "+" if i_val >= 0 else ""
     return f"{r_val}{sign}i*{i_val}"
+
+# ------------------------------------------------------------------------------
+# cvdump / bufdiff: export or compare Mat / Eigen / TImage / cList buffers
+# ------------------------------------------------------------------------------
+def get_buffer_view(valobj):
+    """Describe the pixel/coefficient buffer of a cv::Mat (or derived type such as
+    SEACAVE::TImage), of an Eigen dense matrix, of an mve or Open3D image or of
+    the elements of a SEACAVE::cList; returns None for other types."""
+    valobj = valobj.GetNonSyntheticValue()
+    if valobj.GetType().IsPointerType() or valobj.GetType().IsReferenceType():
+        valobj = valobj.Dereference()
+    if valobj.GetChildMemberWithName("flags").IsValid() and valobj.GetChildMemberWithName("step").IsValid():
+        mat = decode_mat(valobj)
+        return buffer_io.BufferView(mat.data_addr, mat.rows, mat.cols, mat.channels, mat.fmt,
+                                    step=mat.step, bgr=True)
+    import eigen_formatters
+    if eigen_formatters.TEMPLATE_PREFIX_RE.match(valobj.GetType().GetCanonicalType().GetName()):
+        state = eigen_formatters.decode_matrix(valobj)
+        fmt = formatter_utils.scalar_format(state.scalar_type) if state.scalar_type else None
+        lines = state.packed_lines()
+        if fmt is None or lines is None:
+            return None # strided inner dimension (e.g. a row of a column-major matrix)
+        if state.is_row_major:
+            return buffer_io.BufferView(state.data_addr, state.rows, state.cols, 1, fmt, step=lines[2])
+        return buffer_io.BufferView(state.data_addr, state.rows, state.cols, 1, fmt,
+                                    col_major=True, col_step=lines[2])
+    import image_formatters
+    image = image_formatters.decode_image(valobj)
+    if image is not None:
+        return buffer_io.BufferView(image.data_addr, image.rows, image.cols, image.channels, image.fmt,
+                                    step=image.step)
+    vector = valobj.GetChildMemberWithName("_vector")
+    if vector.IsValid() and valobj.GetChildMemberWithName("_size").IsValid():
+        # cList elements: scalars or packed structs such as Point3f, else raw bytes
+        elem_type = vector.GetType().GetPointeeType()
+        fmt, channels = formatter_utils.homogeneous_format(elem_type) or ("B", elem_type.GetByteSize())
+        return buffer_io.BufferView(vector.GetValueAsUnsigned(0), get_member_val(valobj, "_size"), 1,
+                                    channels, fmt)
+    return None
+
+def find_value(exe_ctx, expr):
+    """Variable (or, failing that, expression result) `expr` in the selected frame."""
+    frame = exe_ctx.GetFrame()
+    valobj = frame.GetValueForVariablePath(expr)
+    if not valobj.IsValid():
+        valobj = frame.EvaluateExpression(expr)
+    return valobj
+
+def cvdump_command(debugger, command, exe_ctx, result, internal_dict):
+    """Write a cv::Mat, Eigen matrix, SEACAVE::TImage, mve or Open3D image buffer to a .npy, .pfm or .png file.
+    Usage: cvdump <variable> <file.npy|file.pfm|file.png>"""
+    try:
+        args = shlex.split(command)
+    except ValueError as e:
+        result.SetError(str(e))
+        return
+    if len(args) != 2:
+        result.SetError("usage: cvdump <variable> <file.npy|file.pfm|file.png>")
+        return
+    expr, path = args
+    writer = buffer_io.WRITERS.get(os.path.splitext(path)[1].lower())
+    if writer is None:
+        result.SetError("unsupported file type, use .npy, .pfm or .png")
+        return
+
+    valobj = find_value(exe_ctx, expr)
+    if not valobj.IsValid():
+        result.SetError(f"cannot find variable '{expr}'")
+        return
+    view = get_buffer_view(valobj)
+    if view is None:
+        result.SetError(f"'{expr}' is not a cv::Mat, TImage, cList or Eigen dense matrix")
+        return
+    if not view.address or not view.nbytes:
+        result.SetError(f"'{expr}' is empty")
+        return
+
+    try:
+        writer(exe_ctx.GetProcess(), view, os.path.expanduser(path), exe_ctx.GetTarget().GetByteOrder())
+    except (buffer_io.ExportError, OSError) as e:
+        result.SetError(f"cvdump: {e}")
+        return
+    result.AppendMessage(f"Wrote {view.rows} x {view.cols} x {view.channels} ({view.nbytes} bytes) to {path}")
+
+# Tile snapshots taken by bufdiff, by variable expression
+bufdiff_snapshots = {}
+
+def format_range(stats):
+    if stats is None:
+        return "-"
+    lo, hi, mean = stats
+    return f"[{lo:g}, {hi:g}] mean {mean:g}"
+
+def format_delta(before, after):
+    """Change of the min, max and mean of a tile between two snapshots."""
+    if before is None or after is None:
+        return ""
+    deltas = ", ".join(f"{name} {b - a:+g}" for name, a, b in zip(("min", "max", "mean"), before, after))
+    return f" ({deltas})"
+
+def bufdiff_command(debugger, command, exe_ctx, result, internal_dict):
+    """Report which tiles of a cv::Mat, Eigen matrix or cList buffer changed since
+    the previous call, comparing per-tile hashes (no copy of the data is kept),
+    with the change of their min, max and mean.
+    Usage: bufdiff [--keep] <variable>   first call snapshots, later calls compare
+           bufdiff --clear [<variable>]  forget snapshots
+           bufdiff --list                list snapshots"""
+    try:
+        args = shlex.split(command)
+    except ValueError as e:
+        result.SetError(str(e))
+        return
+    if args[:1] == ["--list"]:
+        for expr, snap in bufdiff_snapshots.items():
+            view = snap.view
+            result.AppendMessage(f"{expr}: {view.rows} x {view.cols} x {view.channels}, {len(snap.digests)} tiles")
+        return
+    if args[:1] == ["--clear"]:
+        for expr in args[1:] or list(bufdiff_snapshots):
+            bufdiff_snapshots.pop(expr, None)
+        return
+    keep = "--keep" in args
+    args = [a for a in args if a != "--keep"]
+    if len(args) != 1:
+        result.SetError("usage: bufdiff [--keep] <variable> | --clear [<variable>] | --list")
+        return
+    expr = args[0]
+    valobj = find_value(exe_ctx, expr)
+    if not valobj.IsValid():
+        result.SetError(f"cannot find variable '{expr}'")
+        return
+    view = get_buffer_view(valobj)
+    if view is None:
+        result.SetError(f"'{expr}' is not a cv::Mat, TImage, cList or Eigen dense matrix")
+        return
+    if not view.address or not view.nbytes:
+        result.SetError(f"'{expr}' is empty")
+        return
+
+    old = bufdiff_snapshots.get(expr)
+    try:
+        snap = buffer_io.snapshot(exe_ctx.GetProcess(), view, formatter_utils.DIFF_TILE_BYTES,
+                                  exe_ctx.GetTarget().GetByteOrder(), old)
+    except buffer_io.ExportError as e:
+        result.SetError(f"bufdiff: {e}")
+        return
+    if old is None or not keep:
+        bufdiff_snapshots[expr] = snap
+    if old is None:
+        result.AppendMessage(f"{expr}: snapshot of {len(snap.digests)} tiles ({view.nbytes} bytes)")
+        return
+    if not old.same_layout(snap):
+        result.AppendMessage(f"{expr}: buffer was reallocated or reshaped, new snapshot taken")
+        bufdiff_snapshots[expr] = snap
+        return
+
+    changed = old.changed(snap)
+    result.AppendMessage(f"{expr}: {len(changed)} of {len(snap.digests)} tiles changed")
+    for tile in changed:
+        label, begin, end = snap.span(tile)
+        before, after = old.ranges[tile], snap.ranges[tile]
+        result.AppendMessage(f"  tile {tile}, {label} {begin}-{end}: {format_range(before)} -> "
+                             f"{format_range(after)}{format_delta(before, after)}")
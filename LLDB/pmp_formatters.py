@@ -0,0 +1,378 @@
+# pmp_formatters.py
+# pmp::Vertex, Halfedge, Edge and Face handles, resolved through the
+# pmp::SurfaceMesh they index: vertex position and one-ring, halfedge
+# connectivity (to/from/next/prev/opposite/face) and face valence.
+#
+# A handle does not know its mesh: the mesh bound with `pmp-mesh <variable>`
+# is used, else the first pmp::SurfaceMesh (or pointer/reference to one,
+# `this` included) among the variables of the selected frame.
+#
+# The base addresses of the connectivity and position property arrays are
+# decoded once per stop and shared by all handles, so one handle costs a few
+# reads of 4 bytes through the page cache. One-rings hop around the halfedge
+# connectivity with one page-cached read of each halfedge they visit.
+import lldb
+import shlex
+import struct
+
+import formatter_profiling
+import formatter_utils
+import lldb_formatters
+
+def __lldb_init_module(debugger, internal_dict):
+    lldb_formatters.register(debugger, __name__)
+    print("pmp LLDB Formatters loaded.")
+
+MESH_TYPE = "pmp::SurfaceMesh"
+
+# handle type -> kind, also the summary prefix
+HANDLES = {
+    "pmp::Vertex": "v",
+    "pmp::Halfedge": "h",
+    "pmp::Edge": "e",
+    "pmp::Face": "f",
+}
+HANDLE_TYPES = dict((kind, name) for name, kind in HANDLES.items())
+
+# SurfaceMesh member -> connectivity fields read from its elements
+PROPERTIES = {
+    "vconn_": ["halfedge_"],
+    "hconn_": ["face_", "vertex_", "next_", "prev_"],
+    "fconn_": ["halfedge_"],
+    "vpoint_": [],
+}
+
+# target key -> (load address, SBType) of the mesh bound with pmp-mesh
+bound_meshes = {}
+
+# (thread, frame) -> mesh found among the frame variables, for one stop
+frame_meshes = formatter_utils.StopCache(64)
+
+# ------------------------------------------------------------------------------
+# Mesh
+# ------------------------------------------------------------------------------
+class PropertyArray:
+    """Elements of one SurfaceMesh property: the std::vector of its PropertyArray."""
+    def __init__(self, process, address, count, elem_type):
+        self.process = process
+        self.address = address
+        self.count = count
+        self.elem_type = elem_type
+        self.elem_size = elem_type.GetByteSize()
+        self.offsets = {}
+
+    def element(self, index):
+        """Raw bytes of element `index` through the page cache, or None."""
+        if index >= self.count:
+            return None
+        return formatter_utils.read_memory(self.process, self.address + index * self.elem_size, self.elem_size)
+
+def decode_property(mesh, name, fields):
+    parray = mesh.GetChildMemberWithName(name).GetChildMemberWithName("parray_")
+    if parray.GetType().IsPointerType():
+        parray = parray.Dereference()
+    if not parray.IsValid():
+        return None
+    elem_type = parray.GetType().GetCanonicalType().GetTemplateArgumentType(0)
+    span = formatter_utils.vector_range(parray.GetChildMemberWithName("data_"))
+    if span is None or not elem_type.IsValid() or not elem_type.GetByteSize():
+        return None
+    array = PropertyArray(mesh.GetProcess(), span[0], (span[1] - span[0]) // elem_type.GetByteSize(), elem_type)
+    for field in fields:
+        offset = formatter_utils.member_offset(elem_type, (field,))
+        if offset is None:
+            return None
+        array.offsets[field] = offset
+    return array
+
+class MeshState:
+    """Connectivity and position arrays of a SurfaceMesh at one stop."""
+    def __init__(self, process, byte_order, arrays):
+        self.process = process
+        self.byte_order = byte_order
+        self.vconn = arrays["vconn_"]
+        self.hconn = arrays["hconn_"]
+        self.fconn = arrays["fconn_"]
+        self.vpoint = arrays["vpoint_"]
+        # HalfedgeConnectivity holds four handles
+        self.index_size = self.hconn.elem_size // 4
+        self.index_fmt = (">" if byte_order == lldb.eByteOrderBig else "<") + \
+            {4: "I", 8: "Q"}.get(self.index_size, "I")
+        self.invalid = (1 << (8 * self.index_size)) - 1
+        self.point_format = formatter_utils.homogeneous_format(self.vpoint.elem_type)
+
+    def read_handle(self, array, index, field):
+        """Handle stored in `field` of element `index` of `array`, or `invalid`."""
+        if index >= array.count:
+            return self.invalid
+        offset = array.offsets[field]
+        value = formatter_utils.read_unsigned(self.process, array.address + index * array.elem_size + offset,
+                                              self.index_size, self.byte_order)
+        return self.invalid if value is None else value
+
+    def halfedge(self, v):
+        return self.read_handle(self.vconn, v, "halfedge_")
+
+    def face_halfedge(self, f):
+        return self.read_handle(self.fconn, f, "halfedge_")
+
+    def to_vertex(self, h):
+        return self.read_handle(self.hconn, h, "vertex_")
+
+    def from_vertex(self, h):
+        return self.to_vertex(h ^ 1)
+
+    def next(self, h):
+        return self.read_handle(self.hconn, h, "next_")
+
+    def prev(self, h):
+        return self.read_handle(self.hconn, h, "prev_")
+
+    def face(self, h):
+        return self.read_handle(self.hconn, h, "face_")
+
+    def point_bytes(self, v):
+        if v >= self.vpoint.count:
+            return None
+        return formatter_utils.read_memory(self.process, self.vpoint.address + v * self.vpoint.elem_size,
+                                           self.vpoint.elem_size)
+
+    def point(self, v):
+        """Coordinates of vertex `v`, or None."""
+        raw = self.point_bytes(v)
+        if raw is None or self.point_format is None:
+            return None
+        return formatter_utils.decode_scalars(raw, self.point_format[0], self.byte_order)
+
+    def valence(self, f):
+        """Number of halfedges around face `f`, or None for a broken cycle."""
+        start = h = self.face_halfedge(f)
+        count = 0
+        while h != self.invalid and count < formatter_utils.MAX_CHILDREN:
+            count += 1
+            h = self.next(h)
+            if h == start:
+                return count
+        return None
+
+    def one_ring(self, v):
+        """(neighbour vertices of `v` in pmp's circulation order, truncated).
+        Halfedges are scattered over the connectivity array, so each one is
+        read alone (through the page cache) for both its vertex and prev."""
+        to_offset, prev_offset = self.hconn.offsets["vertex_"], self.hconn.offsets["prev_"]
+        ring = []
+        start = h = self.halfedge(v)
+        while h != self.invalid:
+            if len(ring) == formatter_utils.MAX_CHILDREN:
+                return ring, True
+            raw = self.hconn.element(h)
+            if raw is None:
+                break
+            ring.append(struct.unpack_from(self.index_fmt, raw, to_offset)[0])
+            h = struct.unpack_from(self.index_fmt, raw, prev_offset)[0]
+            if h == self.invalid:
+                break
+            h ^= 1 # ccw_rotated_halfedge: opposite(prev(h))
+            if h == start:
+                break
+        return ring, False
+
+def decode_mesh(mesh):
+    arrays = {}
+    for name, fields in PROPERTIES.items():
+        arrays[name] = decode_property(mesh, name, fields)
+        if arrays[name] is None:
+            return None
+    return MeshState(mesh.GetProcess(), mesh.GetTarget().GetByteOrder(), arrays)
+
+def is_mesh(sbtype):
+    sbtype = sbtype.GetCanonicalType()
+    if sbtype.GetName() == MESH_TYPE:
+        return True
+    return any(is_mesh(sbtype.GetDirectBaseClassAtIndex(i).GetType())
+               for i in range(sbtype.GetNumberOfDirectBaseClasses()))
+
+def frame_mesh(valobj):
+    """First SurfaceMesh among the variables of the frame showing `valobj`."""
+    frame = valobj.GetFrame()
+    if not frame.IsValid():
+        frame = valobj.GetProcess().GetSelectedThread().GetSelectedFrame()
+        if not frame.IsValid():
+            return None
+    frame_meshes.sync(valobj.GetProcess())
+    key = (frame.GetThread().GetThreadID(), frame.GetFrameID())
+    found = frame_meshes.entries.get(key)
+    if found is None:
+        found = False
+        for variable in frame.GetVariables(True, True, False, True):
+            variable = variable.GetNonSyntheticValue()
+            if variable.GetType().IsPointerType() or variable.GetType().IsReferenceType():
+                variable = variable.Dereference()
+            if variable.IsValid() and is_mesh(variable.GetType()):
+                found = variable
+                break
+        frame_meshes.entries.put(key, found)
+    return found or None
+
+def get_mesh(valobj):
+    """MeshState of the mesh `valobj` is resolved through, or None."""
+    target = valobj.GetTarget()
+    bound = bound_meshes.get(formatter_utils.target_key(target))
+    if bound is not None:
+        address, sbtype = bound
+        mesh = target.CreateValueFromAddress("mesh", lldb.SBAddress(address, target), sbtype)
+    else:
+        mesh = frame_mesh(valobj)
+    if mesh is None:
+        return None
+    return formatter_utils.get_value_state(mesh, "pmp.mesh", decode_mesh)
+
+# ------------------------------------------------------------------------------
+# Handles
+# Summaries: "v5 (0, 1, 2)", "h7 v2 -> v5", "e3 v2 - v5", "f4 valence=3";
+# the index alone without a mesh
+# ------------------------------------------------------------------------------
+def get_handle(valobj):
+    """(kind, index, invalid) of a handle."""
+    valobj = valobj.GetNonSyntheticValue()
+    kind = HANDLES.get(valobj.GetType().GetCanonicalType().GetName(), "v")
+    idx = valobj.GetChildMemberWithName("idx_")
+    invalid = (1 << (8 * (idx.GetByteSize() or 4))) - 1
+    return kind, idx.GetValueAsUnsigned(invalid), invalid
+
+def vertex_name(mesh, v):
+    return "invalid" if v == mesh.invalid else f"v{v}"
+
+@formatter_profiling.summary
+def HandleSummary(valobj, internal_dict):
+    kind, index, invalid = get_handle(valobj)
+    if index == invalid:
+        return f"{kind}(invalid)"
+    summary = f"{kind}{index}"
+    mesh = get_mesh(valobj)
+    if mesh is None:
+        return summary
+    if kind == "v":
+        point = mesh.point(index)
+        if point is not None:
+            summary += " (%s)" % ", ".join(formatter_utils.format_scalar(x, mesh.point_format[0]) for x in point)
+    elif kind == "h":
+        summary += f" {vertex_name(mesh, mesh.from_vertex(index))} -> {vertex_name(mesh, mesh.to_vertex(index))}"
+    elif kind == "e":
+        summary += f" {vertex_name(mesh, mesh.to_vertex(2 * index))} - {vertex_name(mesh, mesh.to_vertex(2 * index + 1))}"
+    else:
+        valence = mesh.valence(index)
+        summary += f" valence={valence if valence is not None else '?'}"
+    return summary
+
+class HandleSyntheticProvider:
+    """idx, then what the mesh knows of the handle: position, outgoing halfedge
+    and one-ring [0], [1], ... of a vertex; to, from, next, prev, opposite and
+    face of a halfedge; halfedges and vertices of an edge; halfedge and valence
+    of a face."""
+    def __init__(self, valobj, internal_dict):
+        self.valobj = valobj
+        self.mesh = None
+        self.children = []  # (name, kind, value)
+        self.fingerprint = None
+
+    def update(self):
+        kind, index, invalid = get_handle(self.valobj)
+        self.mesh = get_mesh(self.valobj) if index != invalid else None
+        children = [("idx", "idx", index)]
+        mesh = self.mesh
+        if mesh is not None:
+            if kind == "v":
+                children += [("position", "position", index), ("halfedge", "h", mesh.halfedge(index))]
+                ring, truncated = mesh.one_ring(index)
+                children += [(f"[{i}]", "v", v) for i, v in enumerate(ring)]
+                if truncated:
+                    children.append(("[more]", "more", "... more vertices"))
+            elif kind == "h":
+                children += [("to", "v", mesh.to_vertex(index)), ("from", "v", mesh.from_vertex(index)),
+                             ("next", "h", mesh.next(index)), ("prev", "h", mesh.prev(index)),
+                             ("opposite", "h", index ^ 1), ("face", "f", mesh.face(index)),
+                             ("edge", "e", index >> 1)]
+            elif kind == "e":
+                children += [("h0", "h", 2 * index), ("h1", "h", 2 * index + 1),
+                             ("v0", "v", mesh.to_vertex(2 * index)), ("v1", "v", mesh.to_vertex(2 * index + 1))]
+            else:
+                valence = mesh.valence(index)
+                children += [("halfedge", "h", mesh.face_halfedge(index))]
+                if valence is not None:
+                    children.append(("valence", "valence", valence))
+        self.children = children
+        return formatter_utils.unchanged(self, formatter_utils.fingerprint(
+            self.valobj.GetProcess(), tuple(children)))
+
+    def num_children(self, max_count=None):
+        count = len(self.children)
+        if max_count is not None:
+            count = min(count, max_count)
+        return count
+
+    def get_child_index(self, name):
+        for index, child in enumerate(self.children):
+            if child[0] == name:
+                return index
+        return -1
+
+    def get_child_at_index(self, index):
+        if index < 0 or index >= len(self.children):
+            return None
+        name, kind, value = self.children[index]
+        if kind == "more":
+            return formatter_utils.create_string(self.valobj, name, value)
+        if kind == "position":
+            raw = self.mesh.point_bytes(value)
+            if raw is None:
+                return None
+            return formatter_utils.create_value_from_bytes(self.valobj, name, raw, self.mesh.vpoint.elem_type)
+        if kind in HANDLE_TYPES:
+            sbtype = formatter_utils.find_type(self.valobj.GetTarget(), HANDLE_TYPES[kind])
+            if sbtype.IsValid() and self.mesh is not None:
+                raw = struct.pack(self.mesh.index_fmt, value)
+                return formatter_utils.create_value_from_bytes(self.valobj, name, raw, sbtype)
+        return formatter_utils.create_scalar(self.valobj, name, value, lldb.eBasicTypeUnsignedInt)
+
+# ------------------------------------------------------------------------------
+# Command
+# ------------------------------------------------------------------------------
+def pmp_mesh_command(debugger, command, exe_ctx, result, internal_dict):
+    """Bind the pmp::SurfaceMesh that pmp handles are resolved through.
+    Usage: pmp-mesh <variable>   resolve handles through this mesh
+           pmp-mesh --clear      back to the first mesh of the selected frame
+           pmp-mesh              show the bound mesh"""
+    try:
+        args = shlex.split(command)
+    except ValueError as e:
+        result.SetError(str(e))
+        return
+    key = formatter_utils.target_key(exe_ctx.GetTarget())
+    if not args:
+        bound = bound_meshes.get(key)
+        if bound is None:
+            result.AppendMessage("no mesh bound, using the first pmp::SurfaceMesh of the selected frame")
+        else:
+            result.AppendMessage(f"{bound[1].GetName()} at 0x{bound[0]:x}")
+        return
+    if args == ["--clear"]:
+        bound_meshes.pop(key, None)
+        return
+    if len(args) != 1:
+        result.SetError("usage: pmp-mesh [<variable> | --clear]")
+        return
+    import opencv_formatters
+    valobj = opencv_formatters.find_value(exe_ctx, args[0])
+    if not valobj.IsValid():
+        result.SetError(f"cannot find variable '{args[0]}'")
+        return
+    valobj = valobj.GetNonSyntheticValue()
+    if valobj.GetType().IsPointerType() or valobj.GetType().IsReferenceType():
+        valobj = valobj.Dereference()
+    address = valobj.GetLoadAddress()
+    if not is_mesh(valobj.GetType()) or address == lldb.LLDB_INVALID_ADDRESS:
+        result.SetError(f"'{args[0]}' is not a {MESH_TYPE} in memory")
+        return
+    bound_meshes[key] = (address, valobj.GetType())
+    result.AppendMessage(f"pmp handles now resolve through '{args[0]}'")
@@ -1,14 +1,54 @@
 # seacave_formatters.py
 import lldb
+import struct
+
+import eigen_formatters
+import formatter_async
+import formatter_profiling
+import formatter_utils
+import lldb_formatters
+import opencv_formatters
 
 # ---------------------------------------------------
-# Summary: "{{size=X capacity=Y}}"
+# Summary: "{{size=X capacity=Y}}", followed for lists of points by
+# "aabb=(...)-(...) centroid=(...) invalid=N degenerate=N"
+# (see formatter_utils.POINT_SUMMARY)
 # ---------------------------------------------------
+def get_point_stats(valobj, size, vector):
+    """Point cloud statistics text of a cList whose elements are 2D-4D points
+    (TPoint3f, Eigen::Vector3d, ...), a placeholder while they are computed in
+    the background, or None for other element types."""
+    elem_type = vector.GetType().GetPointeeType()
+    layout = formatter_utils.homogeneous_format(elem_type)
+    if layout is None or not 2 <= layout[1] <= 4:
+        return None
+    fmt, channels = layout
+    address = vector.GetValueAsUnsigned(0)
+    if not address:
+        return None
+    process = valobj.GetProcess()
+    byte_order = valobj.GetTarget().GetByteOrder()
+    def compute(job):
+        return formatter_utils.point_stats(
+            process, address, size, fmt, channels, byte_order,
+            formatter_utils.ASYNC_TIME_LIMIT if formatter_utils.ASYNC_SUMMARY else None, job.cancelled)
+    header = (size, address, elem_type.GetName())
+    stats = formatter_async.result(valobj, "seacave.clist.points", header, compute)
+    if stats is formatter_async.PENDING:
+        return formatter_async.PLACEHOLDER
+    return stats.summary() if stats is not None else None
+
+@formatter_profiling.summary
 def cList_summary(valobj, internal_dict):
     raw = valobj.GetNonSyntheticValue()
     size = raw.GetChildMemberWithName("_size").GetValueAsUnsigned()
     cap = raw.GetChildMemberWithName("_vectorSize").GetValueAsUnsigned()
-    return f"{{size={size} capacity={cap}}}"
+    summary = f"{{size={size} capacity={cap}}}"
+    if formatter_utils.POINT_SUMMARY and size:
+        stats = get_point_stats(raw, size, raw.GetChildMemberWithName("_vector"))
+        if stats is not None:
+            summary += " " + stats
+    return summary
 
 # ---------------------------------------------------
 # Synthetic children: elements from _vector[0.._size)
@@ -16,7 +56,13 @@ def cList_summary(valobj, internal_dict):
 class cListSyntheticProvider:
     def __init__(self, valobj, internal_dict):
         self.valobj = valobj
-        self.update()
+        self.size = 0
+        self.elem_type = None
+        self.elem_size = 0
+        self.vector_addr = 0
+        self.reader = None
+        self.span = formatter_utils.ShownSpan()
+        self.fingerprint = None
 
     def update(self):
         # extract members once
@@ -25,17 +71,45 @@ class cListSyntheticProvider:
         self.size = self.size_obj.GetValueAsUnsigned()
         self.elem_type = self.vector_obj.GetType().GetPointeeType()
         self.elem_size = self.elem_type.GetByteSize()
+        self.vector_addr = self.vector_obj.GetValueAsUnsigned(0)
+        # elements are fetched in contiguous blocks, cached per list
+        self.reader = formatter_utils.BulkReader(
+            self.valobj.GetProcess(), self.vector_addr, self.elem_size, self.size)
+        header = (self.size, self.vector_addr, self.elem_type.GetName(), formatter_utils.MAX_CHILDREN)
+        return formatter_utils.unchanged(self, formatter_utils.fingerprint(
+            self.valobj.GetProcess(), header, [self.span.region(self.vector_addr)]), [self.span])
 
-    def num_children(self):
-        return int(self.size)
+    def shown(self):
+        """Number of elements exposed as children (at most MAX_CHILDREN)."""
+        return min(self.size, formatter_utils.MAX_CHILDREN)
+
+    def num_children(self, max_count=None):
+        count = self.shown()
+        if count < self.size:
+            count += 1 # "[more]" marker
+        if max_count is not None:
+            count = min(count, max_count)
+        return int(count)
 
     def get_child_at_index(self, index):
-        if index < 0 or index >= self.size:
+        shown = self.shown()
+        if index == shown and shown < self.size:
+            return formatter_utils.create_string(
+                self.valobj, "[more]", f"... {self.size - shown} more elements")
+        if index < 0 or index >= shown:
             return None
+        name = f"[{index}]"
+        if formatter_utils.BULK_READ and self.elem_size:
+            raw = self.reader.element_bytes(index)
+            if raw is not None:
+                child = formatter_utils.create_value_from_bytes(self.valobj, name, raw, self.elem_type)
+                if child is not None and child.IsValid():
+                    self.span.add(index * self.elem_size, self.elem_size)
+                    return child
         # Create a synthetic element at offset = index * sizeof(T)
         try:
             return self.vector_obj.CreateChildAtOffset(
-                f"[{index}]",
+                name,
                 index * self.elem_size,
                 self.elem_type
             )
@@ -43,19 +117,122 @@ class cListSyntheticProvider:
             return None
 
     def get_child_index(self, name):
+        if name == "[more]":
+            return self.shown()
         try:
-            # LLDB calls children “0”, “1”, ...
-            return int(name)
+            # LLDB calls children "[0]", "[1]", ...
+            return int(name.strip("[]"))
         except:
             return -1
 
+# ---------------------------------------------------
+# TDMatrix / TImage / TImageX (cv::Mat_ based images)
+# Summary: "{FLOAT32, 1 x 640 x 480}", same as cv::Mat
+# ---------------------------------------------------
+def TDMatrix_summary(valobj, internal_dict):
+    # Not decorated: CVMatSummaryProvider is already profiled
+    return opencv_formatters.CVMatSummaryProvider(valobj, internal_dict)
+
+class TDMatrixSyntheticProvider(opencv_formatters.CVMatSyntheticProvider):
+    """cv::Mat view (shared flag/depth decoding and paged rows) whose rows are
+    typed with the pixel template argument when it matches the Mat layout."""
+    def get_row_type(self):
+        pixel_type = self.valobj.GetType().GetCanonicalType().GetTemplateArgumentType(0)
+        if pixel_type.IsValid() and pixel_type.GetByteSize() == self.channels * self.mat.elem_size:
+            return pixel_type.GetArrayType(self.cols)
+        return opencv_formatters.CVMatSyntheticProvider.get_row_type(self)
+
+# ---------------------------------------------------
+# TAABB: axis aligned box of two Eigen points
+# Summary: "{min=(0, 0, 0) max=(1, 2, 3)}"
+# Children: [min], [max], [width], [height], [depth]
+# ---------------------------------------------------
+AABB_EXTENTS = ["[width]", "[height]", "[depth]"]
+
+def get_aabb_corners(valobj):
+    """(scalar type, format, min coordinates, max coordinates) of a TAABB, or None."""
+    raw = valobj.GetNonSyntheticValue()
+    corners = []
+    for name in ("ptMin", "ptMax"):
+        state = eigen_formatters.get_matrix_state(raw.GetChildMemberWithName(name))
+        fmt = formatter_utils.scalar_format(state.scalar_type) if state.scalar_type else None
+        if fmt is None:
+            return None
+        process = valobj.GetProcess()
+        coords = []
+        for index in range(state.size):
+            data = state.element_bytes(process, index)
+            if data is None:
+                return None
+            coords.append(formatter_utils.decode_scalars(data, fmt, valobj.GetTarget().GetByteOrder())[0])
+        corners.append(coords)
+    return state.scalar_type, fmt, corners[0], corners[1]
+
+@formatter_profiling.summary
+def TAABB_summary(valobj, internal_dict):
+    corners = get_aabb_corners(valobj)
+    if corners is None:
+        return "{invalid}"
+    _, fmt, lo, hi = corners
+    def point(values):
+        return "(" + ", ".join(formatter_utils.format_scalar(v, fmt) for v in values) + ")"
+    return f"{{min={point(lo)} max={point(hi)}}}"
+
+class TAABBSyntheticProvider:
+    def __init__(self, valobj, internal_dict):
+        self.valobj = valobj
+        self.corners = None
+
+    def update(self):
+        self.corners = get_aabb_corners(self.valobj)
+        return False
+
+    def num_children(self):
+        if self.corners is None:
+            return 2
+        return 2 + min(len(self.corners[2]), len(AABB_EXTENTS))
+
+    def get_child_index(self, name):
+        if name == "[min]":
+            return 0
+        if name == "[max]":
+            return 1
+        try:
+            return 2 + AABB_EXTENTS.index(name)
+        except ValueError:
+            return -1
+
+    def get_corner(self, name, member):
+        corner = self.valobj.GetNonSyntheticValue().GetChildMemberWithName(member)
+        address = corner.GetLoadAddress()
+        if address != lldb.LLDB_INVALID_ADDRESS:
+            return self.valobj.CreateValueFromAddress(name, address, corner.GetType())
+        data = formatter_utils.read_value_bytes(corner, corner.GetType().GetByteSize())
+        if data is None:
+            return corner
+        return formatter_utils.create_value_from_bytes(self.valobj, name, data, corner.GetType())
+
+    def get_child_at_index(self, index):
+        if index == 0:
+            return self.get_corner("[min]", "ptMin")
+        if index == 1:
+            return self.get_corner("[max]", "ptMax")
+        if self.corners is None or index < 0 or index >= self.num_children():
+            return None
+        # Extents are computed on the host, in the coordinate type
+        scalar_type, fmt, lo, hi = self.corners
+        axis = index - 2
+        value = hi[axis] - lo[axis]
+        prefix = ">" if self.valobj.GetTarget().GetByteOrder() == lldb.eByteOrderBig else "<"
+        try:
+            data = struct.pack(prefix + fmt, value)
+        except struct.error:
+            return None
+        return formatter_utils.create_value_from_bytes(self.valobj, AABB_EXTENTS[axis], data, scalar_type)
+
 # ---------------------------------------------------
 # Registration (handles template types)
 # ---------------------------------------------------
 def __lldb_init_module(debugger, internal_dict):
-    debugger.HandleCommand(
-        'type summary add -F seacave_formatters.cList_summary -e -x "^SEACAVE::cList<.*>$"'
-    )
-    debugger.HandleCommand(
-        'type synthetic add -l seacave_formatters.cListSyntheticProvider -x "^SEACAVE::cList<.*>$"'
-    )
+    # Formatters are listed in lldb_formatters.FORMATTERS
+    lldb_formatters.register(debugger, __name__)
@@ -0,0 +1,236 @@
+# tinyxml2_formatters.py
+# tinyxml2 documents: StrPair text, nodes, elements and attributes.
+#
+# Child nodes and attributes are singly linked lists (firstChild / next). The
+# chain is walked once per stop, reading only the `next` pointers through the
+# page cache (nodes come from tinyxml2's memory pools, so a page holds many of
+# them), and the node addresses are kept in an array('Q'): the n-th child is
+# then created without walking the list again. Walks stop at MAX_CHILDREN
+# nodes or when a node comes back (corrupted document).
+#
+# Member names of tinyxml2 >= 2.0 (_value, _firstChild, ...) and of the older
+# ones used by TinyXML2.natvis (value, firstChild, ...) are both recognized.
+import lldb
+import re
+from array import array
+
+import formatter_profiling
+import formatter_utils
+import lldb_formatters
+
+def __lldb_init_module(debugger, internal_dict):
+    lldb_formatters.register(debugger, __name__)
+    print("tinyxml2 LLDB Formatters loaded.")
+
+# Longest text shown in a summary, in bytes
+MAX_TEXT = 1024
+
+# StrPair flags
+NEEDS_ENTITY_PROCESSING = 0x01
+NEEDS_NEWLINE_NORMALIZATION = 0x02
+
+# Entities tinyxml2 decodes: the five predefined XML ones and character references
+XML_ENTITIES = {"lt": "<", "gt": ">", "amp": "&", "quot": '"', "apos": "'"}
+XML_ENTITY_RE = re.compile(r"&(?:(lt|gt|amp|quot|apos)|#([0-9]+)|#[xX]([0-9a-fA-F]+));")
+
+# XMLElement::ElementClosingType
+CLOSING_TYPES = {0: "[OPEN]", 1: "[CLOSED]", 2: "[CLOSING]"}
+
+def get_member(valobj, name):
+    """Member `name` of a tinyxml2 object, under its current or its old name."""
+    member = valobj.GetChildMemberWithName("_" + name)
+    if not member.IsValid():
+        member = valobj.GetChildMemberWithName(name)
+    return member
+
+def member_offset(sbtype, name):
+    """Offset of the member `name` (current or old name) in `sbtype`; None if
+    there is none."""
+    return formatter_utils.member_offset(sbtype, ("_" + name, name))
+
+# ------------------------------------------------------------------------------
+# StrPair
+# Summary: "text" (entities and newlines decoded as tinyxml2 would)
+# ------------------------------------------------------------------------------
+def decode_entity(match):
+    name, decimal, hexadecimal = match.groups()
+    if name:
+        return XML_ENTITIES[name]
+    code = int(decimal) if decimal else int(hexadecimal, 16)
+    if code > 0x10FFFF:
+        return match.group(0) # not a character: left as is
+    return chr(code)
+
+def read_str_pair(str_pair):
+    """(text, truncated) of a StrPair, read with one bulk read of [start, end);
+    None if it cannot be read."""
+    start = get_member(str_pair, "start").GetValueAsUnsigned(0)
+    end = get_member(str_pair, "end").GetValueAsUnsigned(0)
+    if not start:
+        return "", False
+    process = str_pair.GetProcess()
+    if end >= start:
+        size = end - start
+        raw = formatter_utils.read_memory(process, start, min(size, MAX_TEXT)) if size else b""
+        truncated = size > MAX_TEXT
+    else:
+        # No end yet (the pair was set from a C string): up to the first NUL
+        raw = formatter_utils.read_memory(process, start, MAX_TEXT)
+        truncated = raw is not None and b"\0" not in raw
+    if raw is None:
+        return None
+    text = raw.split(b"\0", 1)[0].decode("utf-8", "replace")
+    flags = get_member(str_pair, "flags").GetValueAsUnsigned(0)
+    if flags & NEEDS_NEWLINE_NORMALIZATION:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    if flags & NEEDS_ENTITY_PROCESSING:
+        text = XML_ENTITY_RE.sub(decode_entity, text)
+    return text, truncated
+
+def str_pair_text(str_pair):
+    decoded = read_str_pair(str_pair)
+    if decoded is None:
+        return "<unreadable>"
+    text, truncated = decoded
+    return '"%s"%s' % (text, "..." if truncated else "")
+
+@formatter_profiling.summary
+def StrPairSummary(valobj, internal_dict):
+    return str_pair_text(valobj.GetNonSyntheticValue())
+
+# ------------------------------------------------------------------------------
+# XMLNode (and XMLDocument, XMLText, ...), XMLElement, XMLAttribute
+# Summaries: "value", "[OPEN] name", "name" = "value"
+# ------------------------------------------------------------------------------
+@formatter_profiling.summary
+def XMLNodeSummary(valobj, internal_dict):
+    return str_pair_text(get_member(valobj.GetNonSyntheticValue(), "value"))
+
+@formatter_profiling.summary
+def XMLElementSummary(valobj, internal_dict):
+    raw = valobj.GetNonSyntheticValue()
+    closing = get_member(raw, "closingType").GetValueAsUnsigned(0)
+    return "%s %s" % (CLOSING_TYPES.get(closing, "[OPEN]"), str_pair_text(get_member(raw, "value")))
+
+@formatter_profiling.summary
+def XMLAttributeSummary(valobj, internal_dict):
+    raw = valobj.GetNonSyntheticValue()
+    return "%s = %s" % (str_pair_text(get_member(raw, "name")), str_pair_text(get_member(raw, "value")))
+
+class ChainLayout:
+    """Where a list starts and how its nodes link, for one type."""
+    def __init__(self, node_type, next_offset, head_offset=None):
+        self.node_type = node_type
+        self.next_offset = next_offset
+        self.head_offset = head_offset  # None: the list starts at the value itself
+        self.pointer_size = node_type.GetPointerType().GetByteSize() or 8
+
+def build_child_layout(valobj, type_name):
+    """Children of a node: the list starting at firstChild."""
+    head_offset = member_offset(valobj.GetType(), "firstChild")
+    if head_offset is None:
+        return None
+    node_type = get_member(valobj, "firstChild").GetType().GetPointeeType()
+    next_offset = member_offset(node_type, "next")
+    if next_offset is None:
+        return None
+    return ChainLayout(node_type, next_offset, head_offset)
+
+def build_attribute_layout(valobj, type_name):
+    """Attributes: the list starting at this attribute, as in TinyXML2.natvis."""
+    next_offset = member_offset(valobj.GetType(), "next")
+    if next_offset is None:
+        return None
+    return ChainLayout(valobj.GetType().GetCanonicalType(), next_offset)
+
+class Chain:
+    """Node addresses of one list at one stop."""
+    def __init__(self):
+        self.nodes = array("Q")
+        self.truncated = False  # more nodes after MAX_CHILDREN
+
+def walk_chain(valobj, layout):
+    chain = Chain()
+    process = valobj.GetProcess()
+    byte_order = valobj.GetTarget().GetByteOrder()
+    address = valobj.GetLoadAddress()
+    if address == lldb.LLDB_INVALID_ADDRESS:
+        return chain
+    if layout.head_offset is not None:
+        address = formatter_utils.read_unsigned(process, address + layout.head_offset, layout.pointer_size,
+                                                byte_order) or 0
+    seen = set()
+    limit = formatter_utils.MAX_CHILDREN
+    while address and address not in seen:
+        if len(chain.nodes) == limit:
+            chain.truncated = True
+            break
+        seen.add(address)
+        chain.nodes.append(address)
+        address = formatter_utils.read_unsigned(process, address + layout.next_offset, layout.pointer_size,
+                                                byte_order) or 0
+    return chain
+
+class ChainSyntheticProvider:
+    """Children [0], [1], ... of a linked list, created in O(1) from the node
+    addresses collected by one walk per stop, after the FIELDS children
+    ((child name, member name) pairs)."""
+    FIELDS = []
+    LAYOUT = ("tinyxml2.children", build_child_layout)
+
+    def __init__(self, valobj, internal_dict):
+        self.valobj = valobj
+        self.layout = None
+        self.chain = Chain()
+        self.fingerprint = None
+
+    def update(self):
+        kind, build = self.LAYOUT
+        self.layout = formatter_utils.get_layout(self.valobj, kind, build)
+        if self.layout is None:
+            self.chain = Chain()
+        else:
+            self.chain = formatter_utils.get_value_state(
+                self.valobj, kind, lambda valobj: walk_chain(valobj, self.layout))
+        header = (self.valobj.GetLoadAddress(), len(self.chain.nodes), self.chain.truncated)
+        return formatter_utils.unchanged(self, formatter_utils.fingerprint(
+            self.valobj.GetProcess(), header, [self.chain.nodes.tobytes()]))
+
+    def num_children(self, max_count=None):
+        count = len(self.FIELDS) + len(self.chain.nodes) + (1 if self.chain.truncated else 0)
+        if max_count is not None:
+            count = min(count, max_count)
+        return count
+
+    def get_child_index(self, name):
+        for index, (field, _) in enumerate(self.FIELDS):
+            if name == field:
+                return index
+        if name == "[more]":
+            return len(self.FIELDS) + len(self.chain.nodes)
+        try:
+            return len(self.FIELDS) + int(name.strip("[]"))
+        except:
+            return -1
+
+    def get_child_at_index(self, index):
+        if 0 <= index < len(self.FIELDS):
+            name, member = self.FIELDS[index]
+            member = get_member(self.valobj, member)
+            return self.valobj.CreateValueFromAddress(name, member.GetLoadAddress(), member.GetType())
+        index -= len(self.FIELDS)
+        nodes = self.chain.nodes
+        if index == len(nodes) and self.chain.truncated:
+            return formatter_utils.create_string(self.valobj, "[more]", "... more nodes")
+        if index < 0 or index >= len(nodes):
+            return None
+        return self.valobj.CreateValueFromAddress(f"[{index}]", nodes[index], self.layout.node_type)
+
+class XMLNodeSyntheticProvider(ChainSyntheticProvider):
+    pass
+
+class XMLElementSyntheticProvider(ChainSyntheticProvider):
+    FIELDS = [("attributes", "rootAttribute")]
+
+class XMLAttributeSyntheticProvider(ChainSyntheticProvider):
+    LAYOUT = ("tinyxml2.attributes", build_attribute_layout)